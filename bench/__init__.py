@@ -0,0 +1,17 @@
+"""
+SAMSA - Benchmarks
+Offline benchmark suite for the LMSR engine, datastore and API hot paths
+
+Run with ``python -m bench`` from the repository root.
+"""
+
+from .harness import measure, Result
+from .synthetic import generate_markets, generate_predictions, write_dataset
+
+__all__ = [
+    'measure',
+    'Result',
+    'generate_markets',
+    'generate_predictions',
+    'write_dataset'
+]
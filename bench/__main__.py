@@ -0,0 +1,154 @@
+"""
+SAMSA - Benchmark CLI
+    
+    python -m bench [run] [--sizes 1000,10000,100000] [--suites lmsr,datastore] [--out FILE]
+    python -m bench compare BASE.json HEAD.json [--threshold 0.10]
+
+``run`` writes bench/results/<commit>.json by default; ``compare`` prints
+per-benchmark changes between two result files and exits non-zero when any
+benchmark lost more than ``threshold`` of its throughput.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime
+from typing import Dict, List
+
+import numpy as np
+
+from .harness import Result
+from .suites import RUNNERS, SUITES
+from .synthetic import write_dataset
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+CACHE_DIR = os.path.join(BENCH_DIR, '.cache')
+DEFAULT_SIZES = '1000,10000,100000'
+
+
+def git_revision() -> Dict[str, object]:
+    """Current commit and whether the tree has uncommitted changes"""
+    def git(*args: str) -> str:
+        return subprocess.run(['git', *args], cwd=ROOT_DIR, capture_output=True, text=True).stdout.strip()
+    try:
+        return {'commit': git('rev-parse', '--short', 'HEAD') or 'unknown', 'dirty': bool(git('status', '--porcelain', '--untracked-files=no'))}
+    except OSError:
+        return {'commit': 'unknown', 'dirty': False}
+
+
+def dataset_dir(size: int, seed: int) -> str:
+    """Synthetic data directory for a size, generated once and cached"""
+    directory = os.path.join(CACHE_DIR, f'{size}-{seed}')
+    marker = os.path.join(directory, '.complete')
+    if not os.path.exists(marker):
+        print(f'  generating {size:,} predictions...', flush=True)
+        write_dataset(directory, size, seed)
+        open(marker, 'w').close()
+    return directory
+
+
+def print_result(result: Result) -> None:
+    print(f'  {result.key:<48} {result.ops_per_sec:>14,.1f} ops/s   '
+          f'p50 {result.p50_ms:>10.4f} ms   p99 {result.p99_ms:>10.4f} ms', flush=True)
+
+
+def run(args: argparse.Namespace) -> int:
+    sizes = [int(s) for s in args.sizes.split(',') if s]
+    suites = [s for s in args.suites.split(',') if s]
+    unknown = set(suites) - set(SUITES)
+    if unknown:
+        print(f"Unknown suites: {', '.join(sorted(unknown))} (available: {', '.join(SUITES)})", file=sys.stderr)
+        return 2
+    
+    results: List[Result] = []
+    # Size 0 runs the size-independent single-operation benchmarks
+    for size in [0] + sizes:
+        print(f'size {size:,}' if size else 'single operations', flush=True)
+        data_dir = dataset_dir(size, args.seed) if size else ''
+        for suite in suites:
+            for result in RUNNERS[suite](size, data_dir):
+                print_result(result)
+                results.append(result)
+    
+    revision = git_revision()
+    report = {
+        'meta': {
+            **revision,
+            'timestamp': datetime.utcnow().isoformat() + 'Z',
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'sizes': sizes,
+            'seed': args.seed
+        },
+        'results': [r.to_dict() for r in results]
+    }
+    
+    out_path = args.out
+    if not out_path:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        suffix = '-dirty' if revision['dirty'] else ''
+        out_path = os.path.join(RESULTS_DIR, f"{revision['commit']}{suffix}.json")
+    with open(out_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'Results written to {out_path}')
+    return 0
+
+
+def compare(args: argparse.Namespace) -> int:
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.head) as f:
+        head = json.load(f)
+    
+    base_results = {Result(**r).key: r for r in base['results']}
+    regressions = 0
+    print(f"{'benchmark':<48} {'base ops/s':>14} {'head ops/s':>14} {'change':>8}   p99 base -> head (ms)")
+    for r in head['results']:
+        key = Result(**r).key
+        old = base_results.get(key)
+        if old is None or not old['ops_per_sec']:
+            continue
+        change = r['ops_per_sec'] / old['ops_per_sec'] - 1
+        flag = ''
+        if change < -args.threshold:
+            flag = '  REGRESSION'
+            regressions += 1
+        print(f"{key:<48} {old['ops_per_sec']:>14,.1f} {r['ops_per_sec']:>14,.1f} {change:>+8.1%}   "
+              f"{old['p99_ms']:.4f} -> {r['p99_ms']:.4f}{flag}")
+    
+    print(f"\n{base['meta']['commit']} -> {head['meta']['commit']}: {regressions} regression(s) beyond {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(prog='python -m bench', description='SAMSA benchmark suite')
+    commands = parser.add_subparsers(dest='command')
+    
+    run_parser = commands.add_parser('run', help='Run benchmarks and write a results file')
+    run_parser.add_argument('--sizes', default=DEFAULT_SIZES,
+                            help=f'Comma-separated prediction counts (default {DEFAULT_SIZES}; e.g. add 1000000)')
+    run_parser.add_argument('--suites', default=','.join(SUITES), help='Comma-separated suites to run')
+    run_parser.add_argument('--seed', type=int, default=0, help='Dataset seed')
+    run_parser.add_argument('--out', help='Results file (default bench/results/<commit>.json)')
+    
+    compare_parser = commands.add_parser('compare', help='Compare two results files')
+    compare_parser.add_argument('base')
+    compare_parser.add_argument('head')
+    compare_parser.add_argument('--threshold', type=float, default=0.10,
+                                help='Throughput loss that counts as a regression (default 0.10)')
+    
+    if not argv or argv[0].startswith('-'):
+        argv = ['run', *argv]
+    args = parser.parse_args(argv)
+    return compare(args) if args.command == 'compare' else run(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
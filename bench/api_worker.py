@@ -0,0 +1,52 @@
+"""
+SAMSA - API Benchmark Worker
+Benchmarks server routes against the dataset in SAMSA_DATA_DIR
+
+Usage: python -m bench.api_worker <size> <results.json>
+"""
+
+import json
+import logging
+import sys
+
+import numpy as np
+
+
+def main(size: int, out_path: str) -> None:
+    import server
+    
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    client = server.app.test_client()
+    markets = server.markets_store.all()
+    rng = np.random.default_rng(size)
+    busiest = max(markets, key=lambda m: m.get('total_volume', 0))
+    
+    def place_trade():
+        market = markets[int(rng.integers(len(markets)))]
+        outcome = market['outcomes'][int(rng.integers(len(market['outcomes'])))]
+        response = client.post('/api/predictions', json={
+            'market_id': market['id'],
+            'outcome_id': outcome['id'],
+            'stake_amount': 10,
+            'odds_at_prediction': outcome.get('probability') or 50
+        })
+        assert response.status_code == 201, response.get_json()
+    
+    from bench.harness import measure
+    results = [
+        measure('api', 'create_prediction', place_trade, size=size, iterations=2000, warmup=20),
+        measure('api', 'get_markets', lambda: client.get('/api/markets'), size=size, iterations=500),
+        measure('api', 'get_market', lambda: client.get(f"/api/markets/{busiest['id']}"), size=size, iterations=2000),
+        measure('api', 'get_market_predictions', lambda: client.get(f"/api/predictions?market_id={busiest['id']}"),
+                size=size, iterations=50, warmup=2),
+        measure('api', 'lmsr_calculate', lambda: client.post('/api/lmsr/calculate', json={'stake': 25, 'probability': 40}),
+                size=size, iterations=2000)
+    ]
+    server.close_stores()
+    
+    with open(out_path, 'w') as f:
+        json.dump([r.to_dict() for r in results], f)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]), sys.argv[2])
@@ -0,0 +1,94 @@
+"""
+SAMSA - Benchmark Harness
+Timing loop, latency percentiles and result records
+"""
+
+import time
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+
+
+@dataclass
+class Result:
+    """Throughput and latency of one benchmark at one dataset size"""
+    suite: str
+    name: str
+    size: int
+    iterations: int
+    ops_per_iteration: int
+    ops_per_sec: float
+    mean_ms: float
+    p50_ms: float
+    p90_ms: float
+    p99_ms: float
+    min_ms: float
+    max_ms: float
+    
+    @property
+    def key(self) -> str:
+        return f"{self.suite}.{self.name}[{self.size}]"
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def measure(suite: str, name: str, fn: Callable[[], Any], size: int = 0,
+            iterations: int = 1000, warmup: int = 10, ops_per_iteration: int = 1,
+            setup: Optional[Callable[[], None]] = None) -> Result:
+    """
+    Time repeated calls of ``fn``
+    
+    Each iteration is timed on its own so latency percentiles are reported
+    alongside throughput. ``setup`` runs before every iteration (including
+    warmup) outside the timed region.
+    
+    Args:
+        suite: Suite name (e.g. 'lmsr')
+        name: Benchmark name within the suite
+        fn: Callable under test
+        size: Dataset size (predictions) the benchmark ran against, 0 if size-independent
+        iterations: Timed iterations
+        warmup: Untimed iterations run first
+        ops_per_iteration: Operations performed by one call (for batch APIs)
+        setup: Optional untimed callable run before each iteration
+    
+    Returns:
+        Result with throughput and latency percentiles
+    """
+    for _ in range(warmup):
+        if setup is not None:
+            setup()
+        fn()
+    
+    samples = np.empty(iterations, dtype=np.int64)
+    for i in range(iterations):
+        if setup is not None:
+            setup()
+        start = time.perf_counter_ns()
+        fn()
+        samples[i] = time.perf_counter_ns() - start
+    
+    ms = samples / 1e6
+    total_seconds = samples.sum() / 1e9
+    p50, p90, p99 = np.percentile(ms, [50, 90, 99])
+    return Result(
+        suite=suite,
+        name=name,
+        size=size,
+        iterations=iterations,
+        ops_per_iteration=ops_per_iteration,
+        ops_per_sec=round(iterations * ops_per_iteration / total_seconds, 2) if total_seconds else 0.0,
+        mean_ms=round(float(ms.mean()), 6),
+        p50_ms=round(float(p50), 6),
+        p90_ms=round(float(p90), 6),
+        p99_ms=round(float(p99), 6),
+        min_ms=round(float(ms.min()), 6),
+        max_ms=round(float(ms.max()), 6)
+    )
+
+
+def iterations_for(size: int, budget: int = 2_000_000, low: int = 3, high: int = 200) -> int:
+    """Iterations for an O(size) benchmark so each one takes roughly the same time"""
+    return max(low, min(high, budget // max(size, 1)))
@@ -0,0 +1,158 @@
+"""
+SAMSA - Benchmark Suites
+Hot-path benchmarks for the LMSR engine, datastore, settlement and API
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from typing import List
+
+import numpy as np
+
+from lib.datastore import read_json, write_json, JSONStore
+from lib.lmsr import LMSR, LMSRMarket, MultiOutcomeLMSRMarket
+from lib.settlement import settle_market
+
+from .harness import Result, measure, iterations_for
+
+SUITES = ('lmsr', 'datastore', 'settlement', 'api')
+
+
+def run_lmsr(size: int, data_dir: str) -> List[Result]:
+    """
+    LMSR pricing: single trades (size-independent, only at size 0) and
+    vectorized breakdown/settlement over ``size`` trades
+    """
+    results = []
+    rng = np.random.default_rng(size)
+    
+    if size == 0:
+        binary = LMSRMarket(b=100)
+        sides = ['YES', 'NO']
+        counter = iter(range(10 ** 9))
+        results.append(measure('lmsr', 'invest.binary', lambda: binary.invest(sides[next(counter) & 1], 10),
+                               iterations=50000))
+        
+        multi = MultiOutcomeLMSRMarket(['a', 'b', 'c', 'd'], b=100)
+        results.append(measure('lmsr', 'invest.multi', lambda: multi.invest(next(counter) & 3, 10),
+                               iterations=20000))
+        results.append(measure('lmsr', 'trade_breakdown', lambda: LMSR.get_trade_breakdown(25.0, 40),
+                               iterations=50000))
+        results.append(measure('lmsr', 'settle_trade', lambda: LMSR.settle_trade(25.0, 40, True),
+                               iterations=50000))
+        return results
+    
+    stakes = rng.lognormal(3.0, 1.0, size=size)
+    probabilities = rng.integers(5, 96, size=size)
+    did_win = rng.random(size) < 0.5
+    iterations = iterations_for(size, budget=50_000_000)
+    results.append(measure('lmsr', 'trade_breakdown_batch', lambda: LMSR.get_trade_breakdown_batch(stakes, probabilities),
+                           size=size, iterations=iterations, warmup=2, ops_per_iteration=size))
+    results.append(measure('lmsr', 'settle_trades_batch', lambda: LMSR.settle_trades_batch(stakes, probabilities, did_win),
+                           size=size, iterations=iterations, warmup=2, ops_per_iteration=size))
+    return results
+
+
+def run_datastore(size: int, data_dir: str) -> List[Result]:
+    """read_json / write_json of the full prediction file and JSONStore operations"""
+    if size == 0:
+        return []
+    results = []
+    path = os.path.join(data_dir, 'predictions.json')
+    iterations = iterations_for(size, budget=500_000, high=50)
+    predictions = read_json(path)
+    
+    results.append(measure('datastore', 'read_json', lambda: read_json(path),
+                           size=size, iterations=iterations, warmup=1))
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        out_path = os.path.join(tmp, 'predictions.json')
+        results.append(measure('datastore', 'write_json', lambda: write_json(out_path, predictions),
+                               size=size, iterations=iterations, warmup=1))
+        
+        store_path = os.path.join(tmp, 'store.json')
+        write_json(store_path, predictions)
+        
+        def load_store():
+            JSONStore(store_path, index_fields=('market_id',), flush_interval=0, journal=True).close()
+        results.append(measure('datastore', 'store.load', load_store, size=size, iterations=iterations, warmup=1))
+        
+        store = JSONStore(store_path, index_fields=('market_id',), flush_interval=0, journal=True,
+                          compact_threshold=10 ** 9)
+        template = dict(predictions[0])
+        counter = iter(range(10 ** 9))
+        
+        def save_prediction():
+            store.save({**template, 'id': f'bench_{next(counter)}'})
+        results.append(measure('datastore', 'store.save', save_prediction, size=size, iterations=2000))
+        
+        market_id = template['market_id']
+        results.append(measure('datastore', 'store.find_by', lambda: store.find_by('market_id', market_id),
+                               size=size, iterations=200))
+        results.append(measure('datastore', 'store.compact', store.compact, size=size,
+                               iterations=max(3, iterations // 4), warmup=1))
+        store.close()
+    return results
+
+
+def run_settlement(size: int, data_dir: str) -> List[Result]:
+    """Resolving the busiest market of the synthetic catalog"""
+    if size == 0:
+        return []
+    predictions = read_json(os.path.join(data_dir, 'predictions.json'))
+    counts = {}
+    for p in predictions:
+        counts[p['market_id']] = counts.get(p['market_id'], 0) + 1
+    market_id = max(counts, key=counts.get)
+    winner = next(p['outcome_id'] for p in predictions if p['market_id'] == market_id)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        state = {'round': 0}
+        
+        def setup():
+            # Every iteration settles a freshly loaded copy of the file
+            if 'store' in state:
+                state['store'].close()
+            state['round'] += 1
+            path = os.path.join(tmp, f"predictions_{state['round']}.json")
+            write_json(path, predictions)
+            state['store'] = JSONStore(path, index_fields=('market_id',), flush_interval=0, journal=True,
+                                       compact_threshold=10 ** 9)
+        
+        result = measure('settlement', 'settle_market', lambda: settle_market(state['store'], market_id, winner),
+                         size=size, iterations=iterations_for(size, budget=200_000, high=20), warmup=1,
+                         ops_per_iteration=counts[market_id], setup=setup)
+        state['store'].close()
+    return [result]
+
+
+def run_api(size: int, data_dir: str) -> List[Result]:
+    """
+    Flask routes via the test client, in a fresh interpreter per size
+    
+    ``server`` opens its stores at import time, so each size is benchmarked
+    in a subprocess pointed at a scratch copy of the dataset.
+    """
+    if size == 0:
+        return []
+    with tempfile.TemporaryDirectory() as tmp:
+        scratch = os.path.join(tmp, 'data')
+        shutil.copytree(data_dir, scratch)
+        out_path = os.path.join(tmp, 'results.json')
+        env = dict(os.environ, SAMSA_DATA_DIR=scratch)
+        subprocess.run([sys.executable, '-m', 'bench.api_worker', str(size), out_path],
+                       env=env, check=True, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        with open(out_path) as f:
+            return [Result(**r) for r in json.load(f)]
+
+
+RUNNERS = {
+    'lmsr': run_lmsr,
+    'datastore': run_datastore,
+    'settlement': run_settlement,
+    'api': run_api
+}
@@ -0,0 +1,140 @@
+"""
+SAMSA - Synthetic Datasets
+Deterministic market catalogs and prediction histories for benchmarks
+"""
+
+import json
+import os
+from datetime import datetime, timedelta
+from typing import List
+
+import numpy as np
+
+from lib.lmsr import LMSR
+
+CATEGORIES = ['politics', 'sports', 'crypto', 'technology', 'finance', 'entertainment', 'climate', 'science']
+WORDS = ['election', 'championship', 'bitcoin', 'launch', 'rate', 'award', 'record', 'summit',
+         'merger', 'playoffs', 'approval', 'inflation', 'release', 'season', 'treaty', 'index']
+BASE_TIME = datetime(2025, 1, 1)
+
+
+def markets_for(size: int) -> int:
+    """Number of markets in a catalog backing ``size`` predictions"""
+    return max(20, min(5000, size // 100))
+
+
+def generate_markets(count: int, seed: int = 0) -> List[dict]:
+    """
+    Generate a market catalog in the ``data/markets.json`` format
+    
+    Roughly a third of the markets are multi-outcome; the rest are yes/no.
+    
+    Args:
+        count: Number of markets
+        seed: RNG seed (same seed, same catalog)
+    
+    Returns:
+        List of market dicts
+    """
+    rng = np.random.default_rng(seed)
+    markets = []
+    for i in range(count):
+        n_outcomes = int(rng.choice([2, 2, 3, 4, 6]))
+        if n_outcomes == 2:
+            outcomes = [{'id': 'yes', 'title': 'Yes'}, {'id': 'no', 'title': 'No'}]
+        else:
+            outcomes = [{'id': f'opt_{j}', 'title': f'Option {j + 1}'} for j in range(n_outcomes)]
+        for outcome in outcomes:
+            outcome.update({'probability': round(100 / n_outcomes), 'total_stake': 0})
+        
+        words = [str(w) for w in rng.choice(WORDS, size=3, replace=False)]
+        close = BASE_TIME + timedelta(days=int(rng.integers(1, 720)))
+        markets.append({
+            'id': f'mkt_bench_{i:05d}',
+            'title': f"Will the {' '.join(words)} happen by {close.year}?",
+            'description': f"Synthetic benchmark market {i} about {words[0]}",
+            'category': CATEGORIES[i % len(CATEGORIES)],
+            'status': 'active',
+            'close_date': close.isoformat() + '.000Z',
+            'resolution_date': None,
+            'outcomes': outcomes,
+            'total_volume': 0,
+            'image_url': '',
+            'winning_outcome_id': None,
+            'search_keywords': ' '.join(words)
+        })
+    return markets
+
+
+def generate_predictions(markets: List[dict], count: int, seed: int = 0) -> List[dict]:
+    """
+    Generate a prediction history in the format written by ``create_prediction``
+    
+    Market popularity is Zipf-distributed so a few markets carry most of the
+    volume, as on the live platform. The markets' stakes and volume are
+    updated to match.
+    
+    Args:
+        markets: Catalog from ``generate_markets`` (modified in place)
+        count: Number of predictions
+        seed: RNG seed
+    
+    Returns:
+        List of prediction dicts
+    """
+    rng = np.random.default_rng(seed + 1)
+    market_idx = (rng.zipf(1.3, size=count) - 1) % len(markets)
+    stakes = np.round(rng.lognormal(3.0, 1.0, size=count), 2)
+    odds = rng.integers(5, 96, size=count)
+    picks = rng.random(count)
+    users = rng.integers(0, max(10, count // 20), size=count)
+    seconds = np.sort(rng.integers(0, 365 * 86400, size=count))
+    
+    predictions = []
+    for i in range(count):
+        market = markets[market_idx[i]]
+        outcome = market['outcomes'][int(picks[i] * len(market['outcomes']))]
+        stake = float(stakes[i])
+        probability = int(odds[i])
+        breakdown = LMSR.get_trade_breakdown(stake, probability).to_dict()
+        outcome['total_stake'] = round(outcome['total_stake'] + stake, 2)
+        market['total_volume'] = round(market['total_volume'] + stake, 2)
+        predictions.append({
+            'id': f'pred_{i:08d}',
+            'market_id': market['id'],
+            'outcome_id': outcome['id'],
+            'stake_amount': stake,
+            'odds_at_prediction': probability,
+            'potential_return': breakdown['win']['total_return'],
+            'potential_profit': breakdown['win']['profit'],
+            'potential_refund': breakdown['lose']['refund'],
+            'status': 'active',
+            'actual_return': 0,
+            'user_id': f'user_{users[i]:06d}',
+            'created_at': (BASE_TIME + timedelta(seconds=int(seconds[i]))).isoformat() + 'Z',
+            'lmsr_breakdown': breakdown
+        })
+    return predictions
+
+
+def write_dataset(directory: str, size: int, seed: int = 0) -> dict:
+    """
+    Write a complete synthetic data directory (usable as ``SAMSA_DATA_DIR``)
+    
+    Args:
+        directory: Target directory (created if needed)
+        size: Number of predictions
+        seed: RNG seed
+    
+    Returns:
+        Dict with the 'markets' and 'predictions' lists written
+    """
+    os.makedirs(directory, exist_ok=True)
+    markets = generate_markets(markets_for(size), seed)
+    predictions = generate_predictions(markets, size, seed)
+    
+    for name, data in (('markets', markets), ('predictions', predictions), ('transactions', []), ('users', [])):
+        with open(os.path.join(directory, f'{name}.json'), 'w') as f:
+            json.dump(data, f, indent=2)
+    
+    return {'markets': markets, 'predictions': predictions}
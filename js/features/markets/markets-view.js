@@ -310,6 +310,7 @@ async function renderMarkets() {
         const uniqueSampleMarkets = markets.filter(m => !apiIds.has(m.id));
         markets = [...normalizedApiMarkets, ...uniqueSampleMarkets];
         console.log(`✅ Loaded ${apiMarkets.length} markets from API`);
+        subscribeToMarketUpdates();
       }
     }
   } catch (error) {
@@ -341,6 +342,56 @@ async function renderMarkets() {
   renderSuggestedInterests();
 }
 
+// Live price stream (Server-Sent Events)
+let marketStream = null;
+let marketStreamRenderPending = false;
+
+/**
+ * Subscribe to pushed market price updates instead of polling
+ * Each event is a list of {id, outcomes: {outcomeId: probability}, total_volume, status}
+ */
+function subscribeToMarketUpdates() {
+  if (marketStream || typeof EventSource === 'undefined') return;
+
+  marketStream = new EventSource('http://localhost:3001/api/stream/markets');
+  marketStream.onmessage = (event) => {
+    JSON.parse(event.data).forEach(applyMarketDelta);
+    if (!marketStreamRenderPending) {
+      marketStreamRenderPending = true;
+      requestAnimationFrame(() => {
+        marketStreamRenderPending = false;
+        const grid = document.getElementById('marketsGrid');
+        if (grid) {
+          grid.innerHTML = markets.map(market => createMarketCardHTML(normalizeMarket(market))).join('');
+        }
+      });
+    }
+  };
+  marketStream.onerror = () => {
+    // Servers without the stream endpoint: fall back to fetch-on-render
+    if (marketStream.readyState === EventSource.CLOSED) {
+      marketStream = null;
+    }
+  };
+}
+
+/**
+ * Apply one streamed market delta to the in-memory markets list
+ */
+function applyMarketDelta(delta) {
+  const market = markets.find(m => m.id === delta.id);
+  if (!market) return;
+
+  market.total_volume = delta.total_volume;
+  market.volume = delta.total_volume;
+  market.status = delta.status;
+  (market.outcomes || []).forEach(outcome => {
+    if (outcome.id in delta.outcomes) {
+      outcome.probability = delta.outcomes[outcome.id];
+    }
+  });
+}
+
 /**
  * Fetch current event markets from the API
  * These are timely markets closing soon with high relevance
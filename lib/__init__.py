@@ -3,10 +3,32 @@ SAMSA - Library Package
 Backend utilities and LMSR engine
 """
 
-from .datastore import read_json, write_json, append_to_json, update_in_json, delete_from_json, find_in_json
-from .lmsr import LMSR, LMSRMarket, LMSRMarketManager, TradeBreakdown, SettlementResult, market_manager
+from .asgi import ASGIApp
+from .datastore import read_json, write_json, append_to_json, update_in_json, delete_from_json, find_in_json, JSONStore
+from .journal import Journal
+from .sqlite_store import SQLiteBackend, SQLiteTable, migrate_json
+from .locks import LockStripes
+from .lmsr import LMSR, LMSRMarket, MultiOutcomeLMSRMarket, LMSRMarketManager, TradeBreakdown, SettlementResult, market_manager
+from .lmsr_store import LMSRStateStore
+from .settlement import settle_market
+from .backtest import OrderFlow, BacktestResult, read_order_flow, run_backtest
+from .trade_queue import TradeQueue, NotDurableError
+from .response_cache import ResponseCache, CachedResponse
+from .market_index import MarketIndex
+from .rollups import StatsRollup, league_slug, market_groups
+from .search import SearchIndex
+from .query import QueryIndex
+from .wallet import Wallet, Account
+from .positions import PositionBook, Position, Holding
+from .price_history import PriceHistory, PriceSeries
+from .streaming import PriceBroadcaster, Subscription, market_delta
+from .metrics import Metrics, Histogram, SamplingProfiler, metrics
+from .risk import RiskEngine
+from .market_stats import apply_trade, compute_stats, verify_stats
 
 __all__ = [
+    # Serving
+    'ASGIApp',
     # Datastore
     'read_json',
     'write_json', 
@@ -14,12 +36,67 @@ __all__ = [
     'update_in_json',
     'delete_from_json',
     'find_in_json',
+    'JSONStore',
+    'Journal',
+    'SQLiteBackend',
+    'SQLiteTable',
+    'migrate_json',
+    'LockStripes',
     # LMSR
     'LMSR',
     'LMSRMarket',
+    'MultiOutcomeLMSRMarket',
     'LMSRMarketManager',
     'TradeBreakdown',
     'SettlementResult',
-    'market_manager'
+    'market_manager',
+    'LMSRStateStore',
+    'TradeQueue',
+    'NotDurableError',
+    # Settlement
+    'settle_market',
+    # Backtesting
+    'OrderFlow',
+    'BacktestResult',
+    'read_order_flow',
+    'run_backtest',
+    # Response cache
+    'ResponseCache',
+    'CachedResponse',
+    # Market index
+    'MarketIndex',
+    # Stats rollups
+    'StatsRollup',
+    'league_slug',
+    'market_groups',
+    # Search
+    'SearchIndex',
+    # Paginated queries
+    'QueryIndex',
+    # Wallet
+    'Wallet',
+    'Account',
+    # Positions
+    'PositionBook',
+    'Position',
+    'Holding',
+    # Price history
+    'PriceHistory',
+    'PriceSeries',
+    # Streaming
+    'PriceBroadcaster',
+    'Subscription',
+    'market_delta',
+    # Risk
+    'RiskEngine',
+    # Metrics
+    'Metrics',
+    'Histogram',
+    'SamplingProfiler',
+    'metrics',
+    # Market stats
+    'apply_trade',
+    'compute_stats',
+    'verify_stats'
 ]
 
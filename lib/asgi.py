@@ -0,0 +1,205 @@
+"""
+SAMSA - ASGI Serving Mode
+Asyncio front end that runs the Flask (WSGI) app off the event loop
+"""
+
+import asyncio
+import io
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+
+Scope = Dict[str, Any]
+Receive = Callable[[], Awaitable[Dict[str, Any]]]
+Send = Callable[[Dict[str, Any]], Awaitable[None]]
+AsyncHandler = Callable[[Scope, Receive, Send], Awaitable[None]]
+
+READ_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class ASGIApp:
+    """
+    ASGI application wrapping a WSGI app
+    
+    The event loop only parses requests and writes responses, so it can hold
+    many concurrent keep-alive connections. Every WSGI call runs on a thread
+    pool: GET/HEAD/OPTIONS go to ``read_workers`` threads and everything else
+    to a separate ``write_workers`` pool, so read-heavy polling never queues
+    behind a slow write such as a market resolution. Paths registered with
+    ``route`` are served by native async handlers instead.
+    """
+    
+    def __init__(self, wsgi_app: Callable, read_workers: int = 32, write_workers: int = 8):
+        """
+        Initialize the ASGI wrapper
+        
+        Args:
+            wsgi_app: WSGI callable (e.g. ``flask_app.wsgi_app`` or the Flask app)
+            read_workers: Threads serving read-only requests
+            write_workers: Threads serving mutating requests
+        """
+        self.wsgi_app = wsgi_app
+        self.read_pool = ThreadPoolExecutor(read_workers, thread_name_prefix='samsa-read')
+        self.write_pool = ThreadPoolExecutor(write_workers, thread_name_prefix='samsa-write')
+        self.routes: Dict[str, AsyncHandler] = {}
+    
+    def route(self, path: str) -> Callable[[AsyncHandler], AsyncHandler]:
+        """Register a native async handler for an exact path"""
+        def decorator(handler: AsyncHandler) -> AsyncHandler:
+            self.routes[path] = handler
+            return handler
+        return decorator
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+        
+        handler = self.routes.get(scope['path'])
+        if handler is not None:
+            await handler(scope, receive, send)
+            return
+        
+        body = await read_body(receive)
+        environ = build_environ(scope, body)
+        pool = self.read_pool if scope['method'] in READ_METHODS else self.write_pool
+        loop = asyncio.get_running_loop()
+        
+        status, headers, chunks = await loop.run_in_executor(pool, run_wsgi, self.wsgi_app, environ)
+        await send({
+            'type': 'http.response.start',
+            'status': int(status.split(' ', 1)[0]),
+            'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers]
+        })
+        
+        # Pull the body off the pool one chunk at a time so streamed
+        # responses do not block the loop between chunks
+        disconnected = asyncio.ensure_future(wait_for_disconnect(receive))
+        try:
+            while not disconnected.done():
+                chunk = await loop.run_in_executor(pool, next, chunks, None)
+                if chunk is None:
+                    break
+                if chunk:
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+        finally:
+            disconnected.cancel()
+            close = getattr(chunks, 'close', None)
+            if close is not None:
+                await loop.run_in_executor(pool, close)
+    
+    async def _lifespan(self, receive: Receive, send: Send) -> None:
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.read_pool.shutdown(wait=False)
+                self.write_pool.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+async def read_body(receive: Receive) -> bytes:
+    """Collect the full request body from ASGI receive events"""
+    parts: List[bytes] = []
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            break
+        parts.append(message.get('body', b''))
+        if not message.get('more_body', False):
+            break
+    return b''.join(parts)
+
+
+async def wait_for_disconnect(receive: Receive) -> None:
+    """Resolve once the client has gone away"""
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+def build_environ(scope: Scope, body: bytes) -> Dict[str, Any]:
+    """
+    Translate an ASGI HTTP scope into a PEP 3333 WSGI environ
+    
+    Args:
+        scope: ASGI connection scope
+        body: Complete request body
+    
+    Returns:
+        WSGI environ dict
+    """
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': 'HTTP/' + scope.get('http_version', '1.1'),
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False
+    }
+    
+    for raw_name, raw_value in scope.get('headers', []):
+        name = raw_name.decode('latin-1').upper().replace('-', '_')
+        value = raw_value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+            continue
+        if name == 'CONTENT_LENGTH':
+            continue
+        key = 'HTTP_' + name
+        environ[key] = environ[key] + ',' + value if key in environ else value
+    
+    return environ
+
+
+def run_wsgi(wsgi_app: Callable, environ: Dict[str, Any]) -> Tuple[str, List[Tuple[str, str]], Iterator[bytes]]:
+    """
+    Call a WSGI app (on a worker thread)
+    
+    Returns:
+        (status line, response headers, body chunk iterator)
+    """
+    response: Dict[str, Any] = {}
+    written: List[bytes] = []
+    
+    def start_response(status: str, headers: List[Tuple[str, str]], exc_info: Optional[Any] = None):
+        if exc_info is not None and response:
+            raise exc_info[1].with_traceback(exc_info[2])
+        response['status'] = status
+        response['headers'] = headers
+        return written.append
+    
+    result = wsgi_app(environ, start_response)
+    chunks = iter(result)
+    # Run the app up to its first chunk so start_response has been called
+    first = next(chunks, None)
+    
+    def body() -> Iterator[bytes]:
+        try:
+            yield from written
+            if first is not None:
+                yield first
+            yield from chunks
+        finally:
+            close = getattr(result, 'close', None)
+            if close is not None:
+                close()
+    
+    return response['status'], response['headers'], body()
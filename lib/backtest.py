@@ -0,0 +1,448 @@
+"""
+SAMSA - Backtesting
+Offline replay of historical order flow through the LMSR engine
+
+Usage: python -m lib.backtest [data_dir] [--b 50,100,200] [--risk-exponent 1] [--fee 0.01]
+                              [--source FILE ...] [--seed-from-catalog] [--price-path MARKET_ID] [--out FILE]
+"""
+
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from .datastore import read_json
+from .lmsr import LMSR
+
+
+def iter_json_array(file_path: str, chunk_size: int = 1 << 20) -> Iterator[Any]:
+    """
+    Stream the elements of a top-level JSON array without loading the file
+    
+    Elements are decoded one at a time from a rolling buffer, so memory
+    stays at one chunk plus one element however large the snapshot is.
+    """
+    decoder = json.JSONDecoder()
+    with open(file_path, 'r', encoding='utf-8') as f:
+        buffer = f.read(chunk_size).lstrip()
+        if not buffer:
+            return
+        if not buffer.startswith('['):
+            raise ValueError(f"{file_path} is not a JSON array")
+        index = 1
+        eof = False
+        while True:
+            while index < len(buffer) and buffer[index] in ' \t\r\n,':
+                index += 1
+            if index < len(buffer) and buffer[index] == ']':
+                return
+            try:
+                if index == len(buffer):
+                    raise json.JSONDecodeError('Buffer exhausted', buffer, index)
+                item, index = decoder.raw_decode(buffer, index)
+            except json.JSONDecodeError:
+                if eof:
+                    raise ValueError(f"{file_path} ends inside an element")
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buffer = buffer[index:] + chunk
+                index = 0
+                continue
+            yield item
+
+
+def iter_journal(file_path: str) -> Iterator[Dict[str, Any]]:
+    """Entries of a ``JSONStore`` journal (``put`` / ``del``), skipping a torn final line"""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.endswith('\n'):
+                yield json.loads(line)
+
+
+@dataclass
+class OrderFlow:
+    """
+    Historical trades in time order, as columns
+    
+    ``market`` and ``outcome`` are positions in ``market_ids`` and in that
+    market's ``outcome_ids``. ``winners`` holds the winning outcome's
+    position for resolved markets and -1 elsewhere.
+    """
+    market_ids: List[str]
+    outcome_ids: List[List[str]]
+    listed_probabilities: np.ndarray
+    winners: np.ndarray
+    market: np.ndarray
+    outcome: np.ndarray
+    stake: np.ndarray
+    created_at: np.ndarray
+    skipped: int = 0
+    
+    def __len__(self) -> int:
+        return len(self.stake)
+
+
+def read_order_flow(markets: Sequence[dict], sources: Sequence[str]) -> OrderFlow:
+    """
+    Collect the trades of a prediction history in time order
+    
+    Sources are read in the order given: ``.json`` snapshots (streamed) and
+    ``.jsonl`` store journals (puts and deletes applied), so a data
+    directory's ``predictions.json`` followed by its
+    ``predictions.journal.jsonl`` gives the store's current contents. Only
+    the columns the replay needs are kept.
+    
+    Args:
+        markets: Market catalog (``markets.json``)
+        sources: Prediction snapshot and journal paths
+    
+    Returns:
+        OrderFlow sorted by ``created_at`` (ties keep source order)
+    """
+    market_ids = [m['id'] for m in markets]
+    outcome_ids = [[o['id'] for o in m['outcomes']] for m in markets]
+    market_index = {market_id: i for i, market_id in enumerate(market_ids)}
+    outcome_index = [{outcome_id: j for j, outcome_id in enumerate(ids)} for ids in outcome_ids]
+    width = max((len(ids) for ids in outcome_ids), default=2)
+    
+    listed = np.zeros((len(markets), width))
+    winners = np.full(len(markets), -1, dtype=np.int64)
+    for i, m in enumerate(markets):
+        listed[i, :len(m['outcomes'])] = [o.get('probability') or 0 for o in m['outcomes']]
+        if m.get('status') == 'resolved' and m.get('winning_outcome_id') in outcome_index[i]:
+            winners[i] = outcome_index[i][m['winning_outcome_id']]
+    
+    rows: Dict[str, int] = {}
+    market_col: List[int] = []
+    outcome_col: List[int] = []
+    stake_col: List[float] = []
+    created_col: List[str] = []
+    live: List[bool] = []
+    
+    def put(p: dict) -> None:
+        i = market_index.get(p.get('market_id'), -1)
+        j = outcome_index[i].get(p.get('outcome_id'), -1) if i >= 0 else -1
+        row = rows.get(p['id'])
+        if row is None:
+            rows[p['id']] = len(live)
+            market_col.append(i)
+            outcome_col.append(j)
+            stake_col.append(float(p.get('stake_amount') or 0))
+            created_col.append(p.get('created_at') or '')
+            live.append(True)
+        else:
+            market_col[row], outcome_col[row] = i, j
+            stake_col[row] = float(p.get('stake_amount') or 0)
+            created_col[row] = p.get('created_at') or ''
+            live[row] = True
+    
+    for source in sources:
+        if source.endswith('.jsonl'):
+            for entry in iter_journal(source):
+                if entry['op'] == 'put':
+                    put(entry['item'])
+                elif entry['op'] == 'del' and entry['id'] in rows:
+                    live[rows[entry['id']]] = False
+        else:
+            for p in iter_json_array(source):
+                put(p)
+    
+    market = np.asarray(market_col, dtype=np.int64)
+    outcome = np.asarray(outcome_col, dtype=np.int64)
+    keep = np.asarray(live, dtype=bool) & (market >= 0) & (outcome >= 0)
+    created = np.asarray(created_col, dtype=str)[keep]
+    order = np.argsort(created, kind='stable')
+    return OrderFlow(
+        market_ids=market_ids,
+        outcome_ids=outcome_ids,
+        listed_probabilities=listed,
+        winners=winners,
+        market=market[keep][order],
+        outcome=outcome[keep][order],
+        stake=np.asarray(stake_col, dtype=float)[keep][order],
+        created_at=created[order],
+        skipped=int(np.count_nonzero(np.asarray(live, dtype=bool) & ~keep))
+    )
+
+
+def load_data_dir(data_dir: str, sources: Optional[Sequence[str]] = None) -> OrderFlow:
+    """Order flow of a data directory (its snapshot and journal unless ``sources`` is given)"""
+    if sources is None:
+        sources = [path for path in (os.path.join(data_dir, 'predictions.json'),
+                                     os.path.join(data_dir, 'predictions.journal.jsonl'))
+                   if os.path.exists(path)]
+    return read_order_flow(read_json(os.path.join(data_dir, 'markets.json')), sources)
+
+
+@dataclass
+class BacktestResult:
+    """
+    Outcome of replaying one order flow under every configuration
+    
+    Arrays with a K axis hold one column per entry of ``configs``.
+    ``fills`` is the price each trade executed at (the traded outcome's
+    pre-trade probability, which sets its shares, payout and fee).
+    """
+    flow: OrderFlow
+    configs: List[Dict[str, float]]
+    fee: float
+    initial_q: np.ndarray
+    final_q: np.ndarray
+    fills: np.ndarray
+    seconds: float
+    b: np.ndarray
+    risk_exponents: np.ndarray
+    
+    def shares(self) -> np.ndarray:
+        """q added by each trade under each configuration, shape (T, K)"""
+        return self.flow.stake[:, None] * (1 - self.fills) ** self.risk_exponents
+    
+    def summary(self) -> List[Dict[str, Any]]:
+        """
+        Per-configuration totals
+        
+        Price impact is the move of the traded outcome's price caused by each
+        trade. Settlement totals cover trades on resolved markets, priced
+        with ``LMSR.settle_trades_batch`` at each configuration's fills;
+        trades on open markets are reported as open stake.
+        """
+        flow = self.flow
+        stake = flow.stake
+        p = self.fills
+        # Post-trade price of the traded outcome from its pre-trade price:
+        # raising q_i by d scales its softmax weight by e^(d/b)
+        with np.errstate(over='ignore', divide='ignore', invalid='ignore'):
+            after = p / (p + (1 - p) * np.exp(-self.shares() / self.b))
+        impact = after - p
+        
+        winners = flow.winners[flow.market]
+        settled = winners >= 0
+        result = LMSR.settle_trades_batch(stake[settled, None], p[settled],
+                                          (flow.outcome == winners)[settled, None], self.fee)
+        volume = float(stake.sum())
+        
+        rows = []
+        for k, config in enumerate(self.configs):
+            rows.append({
+                **config,
+                'trades': len(flow),
+                'volume': round(volume, 2),
+                'avg_fill_probability': float(p[:, k] @ stake / volume) if volume else 0.0,
+                'mean_price_impact': float(impact[:, k].mean()) if len(flow) else 0.0,
+                'max_price_impact': float(impact[:, k].max()) if len(flow) else 0.0,
+                'settled_trades': int(settled.sum()),
+                'settled_stake': round(float(stake[settled].sum()), 2),
+                'total_payout': round(float(result['total_return'][:, k].sum()), 2),
+                'platform_revenue': round(float(result['platform_revenue'][:, k].sum()), 2),
+                'user_net': round(float(result['user_net'][:, k].sum()), 2),
+                'open_trades': int((~settled).sum()),
+                'open_stake': round(float(stake[~settled].sum()), 2)
+            })
+        return rows
+    
+    def final_probabilities(self, market_id: str) -> np.ndarray:
+        """A market's closing prices, shape (K, outcomes)"""
+        i = self.flow.market_ids.index(market_id)
+        return _softmax(self.final_q[i] / self.b[:, None])[:, :len(self.flow.outcome_ids[i])]
+    
+    def price_path(self, market_id: str) -> Dict[str, Any]:
+        """
+        A market's full price history under every configuration
+        
+        Rebuilt from the fills without replaying: each trade adds its shares
+        to one outcome, so the q vectors are a cumulative sum.
+        
+        Returns:
+            Dict with ``created_at`` (one per trade) and ``probabilities`` of
+            shape (trades + 1, K, outcomes), starting with the opening prices
+        """
+        i = self.flow.market_ids.index(market_id)
+        n = len(self.flow.outcome_ids[i])
+        rows = np.flatnonzero(self.flow.market == i)
+        steps = np.zeros((len(rows) + 1,) + self.initial_q[i].shape)
+        steps[np.arange(1, len(rows) + 1), :, self.flow.outcome[rows]] = self.shares()[rows]
+        q = self.initial_q[i] + np.cumsum(steps, axis=0)
+        return {
+            'created_at': self.flow.created_at[rows].tolist(),
+            'probabilities': _softmax(q / self.b[:, None])[..., :n]
+        }
+
+
+def _softmax(x: np.ndarray) -> np.ndarray:
+    e = np.exp(x - x.max(axis=-1, keepdims=True))
+    return e / e.sum(axis=-1, keepdims=True)
+
+
+def _initial_q(flow: OrderFlow, b: np.ndarray, seed_from_catalog: bool) -> np.ndarray:
+    """
+    Opening q of every market under every configuration, shape (M, K, width)
+    
+    Matches ``MultiOutcomeLMSRMarket``: uniform prices, or the listed ones
+    clipped and normalized. Slots past a market's last outcome are -inf so
+    they carry no probability.
+    """
+    counts = np.array([len(ids) for ids in flow.outcome_ids], dtype=np.int64)
+    width = flow.listed_probabilities.shape[1]
+    valid = np.arange(width) < counts[:, None]
+    q = np.zeros((len(counts), len(b), width))
+    if seed_from_catalog:
+        listed = np.where(valid, flow.listed_probabilities, 0.0)
+        total = listed.sum(axis=1, keepdims=True)
+        seeded = total[:, 0] > 0
+        p = np.where(valid[seeded], np.clip(listed[seeded] / total[seeded], 0.01, 0.99), 0.0)
+        with np.errstate(divide='ignore'):
+            log_p = np.where(valid[seeded], np.log(p / p.sum(axis=1, keepdims=True)), 0.0)
+        seeded_q = b[None, :, None] * log_p[:, None, :]
+        q[seeded] = seeded_q - seeded_q.max(axis=2, keepdims=True)
+    q[~np.broadcast_to(valid[:, None, :], q.shape)] = -np.inf
+    return q
+
+
+def run_backtest(flow: OrderFlow, b_values: Sequence[float] = (100,), risk_exponents: Sequence[float] = (1.0,),
+                 fee: float = LMSR.PLATFORM_FEE, seed_from_catalog: bool = False) -> BacktestResult:
+    """
+    Replay an order flow under every (b, risk exponent) configuration at once
+    
+    Each trade moves its outcome's q by ``stake * (1 - p) ** risk_exponent``
+    at the pre-trade price p. An exponent of 1 is the rule
+    ``MultiOutcomeLMSRMarket.invest`` applies live. Prices are held as a
+    (markets, configs, outcomes) array. Trades are replayed in rounds: round
+    r applies the r-th trade of every market that has one, which touches
+    each market at most once. A round therefore costs a handful of NumPy
+    operations for all its markets and configurations together, and every
+    market still sees its own trades strictly in time order.
+    
+    Args:
+        flow: Trades from ``read_order_flow``
+        b_values: Liquidity parameters to test
+        risk_exponents: Exponents of the (1 - p) risk weight to test
+        fee: Platform fee used for settlement
+        seed_from_catalog: Open markets at the catalog's listed prices
+            instead of uniform ones (the catalog holds current prices, so
+            this only matches history for markets seeded at creation)
+    
+    Returns:
+        BacktestResult covering the product of ``b_values`` and ``risk_exponents``
+    
+    Raises:
+        ValueError: If a b value is not positive
+    """
+    configs = [{'b': float(b), 'risk_exponent': float(e)} for b, e in itertools.product(b_values, risk_exponents)]
+    if not configs:
+        raise ValueError("At least one configuration is required")
+    b = np.array([c['b'] for c in configs])
+    if (b <= 0).any():
+        raise ValueError("b must be positive")
+    exponent = np.array([c['risk_exponent'] for c in configs])
+    linear = bool((exponent == 1).all())
+    
+    started = time.perf_counter()
+    initial_q = _initial_q(flow, b, seed_from_catalog)
+    q = initial_q.copy()
+    
+    market, outcome, stake = flow.market, flow.outcome, flow.stake
+    # Position of every trade within its market's history
+    counts = np.bincount(market, minlength=len(flow.market_ids))
+    by_market = np.argsort(market, kind='stable')
+    rank = np.empty(len(market), dtype=np.int64)
+    rank[by_market] = np.arange(len(market)) - np.repeat(np.cumsum(counts) - counts, counts)
+    order = np.argsort(rank, kind='stable')
+    bounds = np.concatenate(([0], np.cumsum(np.bincount(rank)))) if len(rank) else np.zeros(1, dtype=np.int64)
+    
+    round_market = market[order]
+    round_outcome = outcome[order][:, None]
+    round_stake = stake[order][:, None]
+    round_fills = np.empty((len(order), len(configs)))
+    inv_b = (1 / b)[:, None]
+    configs_axis = np.arange(len(configs))
+    # A round holds at most one trade per market
+    lanes = np.arange(len(counts))[:, None]
+    
+    for lo, hi in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+        mk = round_market[lo:hi]
+        o = round_outcome[lo:hi]
+        x = q[mk] * inv_b
+        x -= x.max(axis=2, keepdims=True)
+        np.exp(x, out=x)
+        lane = lanes[:hi - lo]
+        p = x[lane, configs_axis, o] / x.sum(axis=2)
+        weight = 1 - p if linear else (1 - p) ** exponent
+        q[mk[:, None], configs_axis, o] += round_stake[lo:hi] * weight
+        round_fills[lo:hi] = p
+    
+    fills = np.empty_like(round_fills)
+    fills[order] = round_fills
+    return BacktestResult(flow=flow, configs=configs, fee=fee, initial_q=initial_q, final_q=q, fills=fills,
+                          seconds=time.perf_counter() - started, b=b, risk_exponents=exponent)
+
+
+def main(argv) -> None:
+    parser = argparse.ArgumentParser(prog='python -m lib.backtest',
+                                     description='Replay historical predictions under candidate LMSR settings')
+    parser.add_argument('data_dir', nargs='?', default='data')
+    parser.add_argument('--b', default='100', help='comma-separated liquidity parameters')
+    parser.add_argument('--risk-exponent', default='1', help='comma-separated exponents of the (1 - p) weight')
+    parser.add_argument('--fee', type=float, default=LMSR.PLATFORM_FEE)
+    parser.add_argument('--source', action='append',
+                        help='prediction snapshot (.json) or journal (.jsonl); repeatable, read in order')
+    parser.add_argument('--seed-from-catalog', action='store_true', help="open markets at the catalog's prices")
+    parser.add_argument('--price-path', metavar='MARKET_ID', help="include a market's price path in --out")
+    parser.add_argument('--out', help='write the report as JSON')
+    args = parser.parse_args(argv)
+    
+    read_started = time.perf_counter()
+    flow = load_data_dir(args.data_dir, args.source)
+    read_seconds = time.perf_counter() - read_started
+    print(f'Read {len(flow):,} trades on {len(np.unique(flow.market)):,} markets in {read_seconds:.2f}s'
+          + (f' ({flow.skipped:,} skipped: unknown market or outcome)' if flow.skipped else ''))
+    
+    result = run_backtest(flow, [float(v) for v in args.b.split(',') if v],
+                          [float(v) for v in args.risk_exponent.split(',') if v],
+                          args.fee, args.seed_from_catalog)
+    rate = len(flow) * len(result.configs) / result.seconds if result.seconds else 0.0
+    print(f'Replayed {len(result.configs)} configurations in {result.seconds:.2f}s ({rate:,.0f} trade-configs/s)')
+    
+    summary = result.summary()
+    print(f"{'b':>10} {'exp':>6} {'avg fill':>9} {'mean impact':>12} {'max impact':>11} "
+          f"{'payout':>14} {'revenue':>12} {'user net':>14}")
+    for row in summary:
+        print(f"{row['b']:>10g} {row['risk_exponent']:>6g} {row['avg_fill_probability']:>9.4f} "
+              f"{row['mean_price_impact']:>12.6f} {row['max_price_impact']:>11.6f} "
+              f"{row['total_payout']:>14,.2f} {row['platform_revenue']:>12,.2f} {row['user_net']:>14,.2f}")
+    
+    if args.out:
+        counts = np.bincount(flow.market, minlength=len(flow.market_ids))
+        report: Dict[str, Any] = {
+            'configs': summary,
+            'markets': {
+                flow.market_ids[i]: {
+                    'outcome_ids': flow.outcome_ids[i],
+                    'trades': int(counts[i]),
+                    'final_probabilities': result.final_probabilities(flow.market_ids[i]).round(6).tolist()
+                }
+                for i in np.flatnonzero(counts).tolist()
+            }
+        }
+        if args.price_path:
+            if args.price_path not in flow.market_ids:
+                print(f"Unknown market {args.price_path}", file=sys.stderr)
+                sys.exit(2)
+            path = result.price_path(args.price_path)
+            report['price_path'] = {
+                'market_id': args.price_path,
+                'created_at': path['created_at'],
+                'probabilities': path['probabilities'].round(6).tolist()
+            }
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f'Wrote {args.out}')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
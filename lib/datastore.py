@@ -4,16 +4,25 @@ JSON file-based data storage for prediction markets
 """
 
 import json
+import logging
 import os
-from typing import Any, List
+import tempfile
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
 
+from .journal import Journal
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+@metrics.timed('samsa_datastore_seconds', 'read_json')
 def read_json(file_path: str) -> List[Any]:
     """
     Read JSON data from file
     
     Args:
         file_path: Path to the JSON file
-        
+    
     Returns:
         List of data from the file, or empty list if file doesn't exist
     """
@@ -23,19 +32,31 @@ def read_json(file_path: str) -> List[Any]:
     except (FileNotFoundError, json.JSONDecodeError):
         return []
 
+@metrics.timed('samsa_datastore_seconds', 'write_json')
 def write_json(file_path: str, data: List[Any]) -> None:
     """
-    Write JSON data to file
+    Atomically write JSON data to file
     
     Args:
         file_path: Path to the JSON file
         data: Data to write
     """
     # Ensure directory exists
-    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    directory = os.path.dirname(file_path) or '.'
+    os.makedirs(directory, exist_ok=True)
     
-    with open(file_path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    # Write to a temp file in the same directory and rename it over the
+    # target, so a crash mid-write never leaves a truncated file behind
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(file_path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
 
 def append_to_json(file_path: str, item: Any) -> None:
     """
@@ -58,7 +79,7 @@ def update_in_json(file_path: str, item_id: str, updates: dict, id_field: str =
         item_id: ID of the item to update
         updates: Dictionary of fields to update
         id_field: Name of the ID field
-        
+    
     Returns:
         True if item was found and updated, False otherwise
     """
@@ -80,7 +101,7 @@ def delete_from_json(file_path: str, item_id: str, id_field: str = 'id') -> bool
         file_path: Path to the JSON file
         item_id: ID of the item to delete
         id_field: Name of the ID field
-        
+    
     Returns:
         True if item was found and deleted, False otherwise
     """
@@ -103,10 +124,395 @@ def find_in_json(file_path: str, item_id: str, id_field: str = 'id') -> Any:
         file_path: Path to the JSON file
         item_id: ID of the item to find
         id_field: Name of the ID field
-        
+    
     Returns:
         The item if found, None otherwise
     """
     data = read_json(file_path)
     return next((item for item in data if item.get(id_field) == item_id), None)
 
+def _clone(value: Any) -> Any:
+    """Copy of a JSON-shaped value: dicts and lists are copied, scalars shared"""
+    if type(value) is dict:
+        return {k: _clone(v) for k, v in value.items()}
+    if type(value) is list:
+        return [_clone(v) for v in value]
+    return value
+
+
+class JSONStore:
+    """
+    In-memory, indexed view of a JSON array file
+    
+    The file is parsed once on construction. Records are kept in an
+    id-keyed dict plus one secondary index per entry in ``index_fields``,
+    so single-record reads and writes are O(1). Mutations only mark the
+    store dirty; a background thread writes the whole batch back to disk
+    every ``flush_interval`` seconds (write-behind). A ``flush_interval``
+    of 0 makes every mutation write through immediately.
+    
+    With ``journal=True`` each mutation is instead appended to a JSON-lines
+    journal next to the file, and a flush only fsyncs the journal. The JSON
+    file becomes a snapshot that is rewritten once the journal grows past
+    ``compact_threshold`` entries, so append-heavy collections no longer pay
+    a whole-file rewrite per batch.
+    
+    With a ``backend`` (e.g. ``SQLiteBackend.table('predictions')``) the
+    records are loaded from it instead, and each flush hands it only the
+    changed and deleted records.
+    
+    Stored records are never modified in place. ``save`` keeps its own copy
+    and ``update`` swaps in a new dict under the lock, so the flusher and the
+    journal never serialize a half-applied change. ``get`` hands out a copy
+    for callers to modify and save back. ``all`` and ``find_by`` return the
+    stored records themselves, without copying, and must be treated as
+    read-only.
+    """
+    
+    def __init__(self, file_path: str, id_field: str = 'id',
+                 index_fields: Iterable[str] = (), flush_interval: float = 1.0,
+                 journal: bool = False, compact_threshold: int = 10000,
+                 backend: Optional[Any] = None):
+        """
+        Initialize the store and load the file
+        
+        Args:
+            file_path: Path to the JSON array file backing the store
+            id_field: Name of the ID field
+            index_fields: Fields to maintain secondary indexes on
+            flush_interval: Seconds between write-behind flushes (0 = write-through)
+            journal: Log mutations to an append-only journal instead of
+                rewriting the file on every flush
+            compact_threshold: Journal entries that trigger a snapshot compaction
+            backend: Optional row store with ``load()`` and ``persist(changed, deleted)``
+                used instead of the file (``journal`` is then ignored)
+        """
+        self.file_path = file_path
+        self.id_field = id_field
+        self.flush_interval = flush_interval
+        self.compact_threshold = compact_threshold
+        self.backend = backend
+        
+        self._lock = threading.RLock()
+        self._records: Dict[str, dict] = {}
+        self._indexes: Dict[str, Dict[Any, Dict[str, None]]] = {f: {} for f in index_fields}
+        self._index_keys: Dict[str, Dict[str, Any]] = {}
+        self._dirty_ids: Set[str] = set()
+        self._deleted_ids: Set[str] = set()
+        # Bumped on every change so callers can cheaply detect stale derived data
+        self.version = 0
+        self._listeners: List[Callable[[str, Optional[dict]], None]] = []
+        
+        # Serializes flushes so an older snapshot never lands after a newer one
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        
+        self.journal: Optional[Journal] = None
+        if journal and backend is None:
+            self.journal = Journal(os.path.splitext(file_path)[0] + '.journal.jsonl')
+        
+        self.load()
+        
+        if flush_interval > 0:
+            self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+            self._flusher.start()
+    
+    # --- Loading / indexing ---
+    
+    def load(self) -> None:
+        """(Re)load the snapshot, replay the journal and rebuild the indexes"""
+        data = self.backend.load() if self.backend is not None else read_json(self.file_path)
+        with self._lock:
+            self._records = {}
+            self._index_keys = {}
+            for field_name in self._indexes:
+                self._indexes[field_name] = {}
+            for item in data:
+                self._put(item)
+            
+            if self.journal is not None:
+                for entry in self.journal.replay():
+                    if entry['op'] == 'put':
+                        self._put(entry['item'])
+                    elif entry['op'] == 'del':
+                        self._unindex(entry['id'])
+                        self._records.pop(entry['id'], None)
+            
+            self._dirty_ids.clear()
+            self._deleted_ids.clear()
+            self.version += 1
+    
+    def _put(self, item: dict) -> None:
+        """Insert or replace a record and refresh its index entries"""
+        item_id = item[self.id_field]
+        self._unindex(item_id)
+        self._records[item_id] = item
+        
+        keys = {}
+        for field_name, index in self._indexes.items():
+            value = item.get(field_name)
+            index.setdefault(value, {})[item_id] = None
+            keys[field_name] = value
+        self._index_keys[item_id] = keys
+    
+    def _unindex(self, item_id: str) -> None:
+        """Remove a record's entries from the secondary indexes"""
+        keys = self._index_keys.pop(item_id, None)
+        if not keys:
+            return
+        for field_name, value in keys.items():
+            bucket = self._indexes[field_name].get(value)
+            if bucket is not None:
+                bucket.pop(item_id, None)
+                if not bucket:
+                    del self._indexes[field_name][value]
+    
+    # --- Reads ---
+    
+    def get(self, item_id: str) -> Optional[dict]:
+        """
+        Get a record by ID
+        
+        Args:
+            item_id: ID of the record
+        
+        Returns:
+            A copy of the record if found, None otherwise
+        """
+        item = self._records.get(item_id)
+        return _clone(item) if item is not None else None
+    
+    def all(self) -> List[dict]:
+        """Get all records in file order (shared with the store: read-only)"""
+        with self._lock:
+            return list(self._records.values())
+    
+    def find_by(self, field_name: str, value: Any) -> List[dict]:
+        """
+        Get all records whose indexed field equals ``value``
+        
+        Args:
+            field_name: Indexed field name
+            value: Value to match
+        
+        Returns:
+            Matching records in insertion order (shared with the store: read-only)
+        """
+        with self._lock:
+            bucket = self._indexes[field_name].get(value, {})
+            return [self._records[item_id] for item_id in bucket]
+    
+    def __len__(self) -> int:
+        return len(self._records)
+    
+    def __contains__(self, item_id: str) -> bool:
+        return item_id in self._records
+    
+    # --- Writes ---
+    
+    def save(self, item: dict) -> dict:
+        """
+        Insert or replace a record and schedule it for persistence
+        
+        Args:
+            item: Record to store (must carry the ID field)
+        
+        Returns:
+            The record passed in (the store keeps its own copy)
+        """
+        stored = _clone(item)
+        with self._lock:
+            self._put(stored)
+            item_id = stored[self.id_field]
+            self._dirty_ids.add(item_id)
+            self._deleted_ids.discard(item_id)
+            self._log({'op': 'put', 'item': stored})
+            self.version += 1
+        self._after_write()
+        self._notify(item_id, stored)
+        return item
+    
+    def update(self, item_id: str, updates: dict) -> Optional[dict]:
+        """
+        Update fields of an existing record
+        
+        Args:
+            item_id: ID of the record to update
+            updates: Dictionary of fields to update
+        
+        Returns:
+            A copy of the updated record, or None if not found
+        """
+        updates = _clone(updates)
+        with self._lock:
+            item = self._records.get(item_id)
+            if item is None:
+                return None
+            item = {**item, **updates}
+            self._put(item)
+            self._dirty_ids.add(item_id)
+            self._log({'op': 'put', 'item': item})
+            self.version += 1
+        self._after_write()
+        self._notify(item_id, item)
+        return _clone(item)
+    
+    def update_many(self, updates: Dict[str, dict]) -> int:
+        """
+        Update many records under a single lock acquisition
+        
+        Args:
+            updates: Mapping of record ID -> fields to update
+        
+        Returns:
+            Number of records found and updated
+        """
+        changed = []
+        with self._lock:
+            for item_id, changes in updates.items():
+                item = self._records.get(item_id)
+                if item is None:
+                    continue
+                item = {**item, **_clone(changes)}
+                self._put(item)
+                self._dirty_ids.add(item_id)
+                self._log({'op': 'put', 'item': item})
+                changed.append(item)
+            self.version += 1
+        self._after_write()
+        if self._listeners:
+            for item in changed:
+                self._notify(item[self.id_field], item)
+        return len(changed)
+    
+    def delete(self, item_id: str) -> bool:
+        """
+        Delete a record
+        
+        Args:
+            item_id: ID of the record to delete
+        
+        Returns:
+            True if the record existed, False otherwise
+        """
+        with self._lock:
+            if item_id not in self._records:
+                return False
+            self._unindex(item_id)
+            del self._records[item_id]
+            self._dirty_ids.discard(item_id)
+            self._deleted_ids.add(item_id)
+            self._log({'op': 'del', 'id': item_id})
+            self.version += 1
+        self._after_write()
+        self._notify(item_id, None)
+        return True
+    
+    def add_listener(self, listener: Callable[[str, Optional[dict]], None]) -> None:
+        """
+        Register a callback run after every change
+        
+        Args:
+            listener: Called as listener(item_id, item) with the stored record,
+                or with item=None when the record was deleted
+        """
+        self._listeners.append(listener)
+    
+    def _notify(self, item_id: str, item: Optional[dict]) -> None:
+        # The write is already committed: a failing listener must not fail
+        # the caller or keep the remaining listeners from seeing the change
+        for listener in self._listeners:
+            try:
+                listener(item_id, item)
+            except Exception:
+                logger.exception('Listener %r failed on %s %s', listener, self.file_path, item_id)
+    
+    # --- Persistence ---
+    
+    @property
+    def dirty(self) -> bool:
+        """Whether there are changes not yet written to disk"""
+        return bool(self._dirty_ids or self._deleted_ids)
+    
+    @metrics.timed('samsa_datastore_seconds', 'flush')
+    def flush(self) -> int:
+        """
+        Write pending changes to disk
+        
+        In journal mode this fsyncs the journal and compacts it into the
+        snapshot once it exceeds ``compact_threshold`` entries.
+        
+        The pending changes are captured under the store lock, but written
+        outside it, so readers and writers never wait on disk I/O. Stored
+        records are never modified in place, so the captured references stay
+        a consistent snapshot. The exception is a journal compaction, which
+        has to keep appends out until the journal is truncated and so runs
+        under the lock, once per ``compact_threshold`` entries. If the write
+        fails, the changes are marked pending again for the next flush.
+        
+        Returns:
+            Number of changed records included in the flush
+        """
+        with self._flush_lock:
+            with self._lock:
+                if not self.dirty:
+                    return 0
+                dirty_ids, deleted_ids = self._dirty_ids, self._deleted_ids
+                self._dirty_ids, self._deleted_ids = set(), set()
+                if self.backend is not None:
+                    snapshot = [self._records[item_id] for item_id in dirty_ids]
+                elif self.journal is None:
+                    snapshot = list(self._records.values())
+            
+            try:
+                if self.backend is not None:
+                    self.backend.persist(snapshot, deleted_ids)
+                elif self.journal is None:
+                    write_json(self.file_path, snapshot)
+                else:
+                    self.journal.sync()
+                    if len(self.journal) >= self.compact_threshold:
+                        self.compact()
+            except BaseException:
+                with self._lock:
+                    # Anything deleted or re-saved since is already pending
+                    self._dirty_ids |= dirty_ids - self._deleted_ids
+                    self._deleted_ids |= deleted_ids - self._dirty_ids
+                raise
+        return len(dirty_ids) + len(deleted_ids)
+    
+    def compact(self) -> None:
+        """Fold the journal into a fresh snapshot and truncate it"""
+        if self.backend is not None:
+            return
+        with self._lock:
+            write_json(self.file_path, list(self._records.values()))
+            if self.journal is not None:
+                self.journal.truncate()
+    
+    def close(self) -> None:
+        """Stop the background flusher and write any pending changes"""
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join()
+            self._flusher = None
+        self.flush()
+        if self.journal is not None:
+            self.journal.close()
+    
+    def _log(self, entry: Dict[str, Any]) -> None:
+        if self.journal is not None:
+            self.journal.append(entry)
+    
+    def _after_write(self) -> None:
+        if self.flush_interval <= 0:
+            self.flush()
+    
+    def _flush_loop(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception:
+                # The changes stay pending; retry on the next tick
+                logger.exception('Flushing %s failed', self.file_path)
@@ -0,0 +1,129 @@
+"""
+SAMSA - Write-Ahead Journal
+Append-only JSON-lines log with batched fsync
+"""
+
+import json
+import os
+import threading
+from typing import Any, Dict, Iterator
+
+
+class Journal:
+    """
+    Append-only JSON-lines journal
+    
+    Each entry is one line of compact JSON, so an append costs the same no
+    matter how long the history is. Appends go to the OS immediately but are
+    only fsynced when ``sync`` is called, which lets callers batch many
+    appends into one durable write.
+    """
+    
+    def __init__(self, file_path: str):
+        """
+        Open (or create) a journal file
+        
+        Args:
+            file_path: Path to the .jsonl journal file
+        """
+        self.file_path = file_path
+        self._lock = threading.Lock()
+        self._unsynced = 0
+        
+        os.makedirs(os.path.dirname(file_path) or '.', exist_ok=True)
+        self._entries = self._recover()
+        self._file = open(file_path, 'a', encoding='utf-8')
+    
+    def _recover(self) -> int:
+        """
+        Drop a torn final line left by a crash mid-append
+        
+        Returns:
+            Number of complete entries in the file
+        """
+        try:
+            with open(self.file_path, 'r+b') as f:
+                entries = 0
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    entries += chunk.count(b'\n')
+                
+                size = f.tell()
+                if size == 0:
+                    return 0
+                f.seek(size - 1)
+                if f.read(1) == b'\n':
+                    return entries
+                # Scan back block by block to the last newline, however long
+                # the torn line is; none at all means nothing was complete
+                end = size
+                while end > 0:
+                    start = max(0, end - (1 << 16))
+                    f.seek(start)
+                    newline = f.read(end - start).rfind(b'\n')
+                    if newline >= 0:
+                        f.truncate(start + newline + 1)
+                        return entries
+                    end = start
+                f.truncate(0)
+                return entries
+        except FileNotFoundError:
+            return 0
+    
+    def __len__(self) -> int:
+        """Number of entries currently in the journal"""
+        return self._entries
+    
+    def append(self, entry: Dict[str, Any]) -> None:
+        """
+        Append one entry to the journal
+        
+        Args:
+            entry: JSON-serializable dict
+        """
+        line = json.dumps(entry, ensure_ascii=False, separators=(',', ':'))
+        with self._lock:
+            self._file.write(line + '\n')
+            self._file.flush()
+            self._unsynced += 1
+            self._entries += 1
+    
+    def sync(self) -> int:
+        """
+        Force appended entries to stable storage
+        
+        Returns:
+            Number of entries made durable by this call
+        """
+        with self._lock:
+            synced = self._unsynced
+            if synced:
+                os.fsync(self._file.fileno())
+                self._unsynced = 0
+            return synced
+    
+    def replay(self) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate over all entries in append order
+        
+        """
+        try:
+            with open(self.file_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    yield json.loads(line)
+        except FileNotFoundError:
+            return
+    
+    def truncate(self) -> None:
+        """Discard all entries (called after they are compacted into a snapshot)"""
+        with self._lock:
+            self._file.truncate(0)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+            self._entries = 0
+    
+    def close(self) -> None:
+        """Sync and close the journal file"""
+        self.sync()
+        with self._lock:
+            self._file.close()
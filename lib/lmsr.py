@@ -4,8 +4,13 @@ Logarithmic Market Scoring Rule with Risk-Weighted Rebate Model
 """
 
 import math
-from typing import Dict, Any, Optional
-from dataclasses import dataclass, field
+import threading
+from typing import Dict, Any, List, Optional, Sequence, Set, Union
+from dataclasses import dataclass
+
+import numpy as np
+
+from .metrics import metrics
 
 
 @dataclass
@@ -102,14 +107,19 @@ class LMSRMarket:
         Returns:
             Probability between 0 and 1
         """
-        e_yes = math.exp(self.q_yes / self.b)
-        e_no = math.exp(self.q_no / self.b)
-        return e_yes / (e_yes + e_no)
+        # Logistic form of e^(qYes/b) / (e^(qYes/b) + e^(qNo/b)); never
+        # exponentiates a positive number, so large q/b cannot overflow
+        d = (self.q_yes - self.q_no) / self.b
+        if d >= 0:
+            return 1 / (1 + math.exp(-d))
+        e = math.exp(d)
+        return e / (1 + e)
     
     def get_probability_percent(self) -> float:
         """Get probability as percentage (0-100)"""
         return self.get_probability() * 100
     
+    @metrics.timed('samsa_lmsr_seconds', 'invest')
     def invest(self, side: str, stake: float) -> float:
         """
         Risk-weighted investment on YES or NO
@@ -117,7 +127,7 @@ class LMSRMarket:
         Args:
             side: "YES" or "NO"
             stake: Amount to invest
-            
+        
         Returns:
             New probability after investment (clamped 0.05-0.95)
         """
@@ -153,6 +163,159 @@ class LMSRMarket:
             self.b = state['b']
 
 
+class MultiOutcomeLMSRMarket:
+    """
+    N-outcome LMSR Market
+    Holds one quantity per outcome in a NumPy vector. Prices are the
+    softmax of q/b and the cost function is C(q) = b * log(sum(e^(q/b))),
+    both evaluated with the log-sum-exp shift so they stay finite for any q.
+    """
+    
+    PLATFORM_FEE = 0.01  # 1% platform fee
+    
+    def __init__(self, outcome_ids: Sequence[str], b: float = 100,
+                 initial_probabilities: Optional[Sequence[float]] = None):
+        """
+        Initialize an N-outcome LMSR market
+        
+        Args:
+            outcome_ids: IDs of the outcomes, in display order
+            b: Liquidity parameter (higher = more stable prices)
+            initial_probabilities: Starting probabilities (0-1 or 0-100, normalized);
+                uniform if omitted
+        """
+        if len(outcome_ids) < 2:
+            raise ValueError("A market needs at least two outcomes")
+        
+        self.b = b
+        self.outcome_ids: List[str] = list(outcome_ids)
+        self._index = {outcome_id: i for i, outcome_id in enumerate(self.outcome_ids)}
+        self.q = np.zeros(len(self.outcome_ids))
+        
+        if initial_probabilities is not None:
+            p = np.asarray(initial_probabilities, dtype=float)
+            if p.sum() > 0:
+                p = np.clip(p / p.sum(), 0.01, 0.99)
+                # Softmax is shift-invariant, so q = b * ln(p) reproduces p
+                self.q = b * np.log(p / p.sum())
+                self.q -= self.q.max()
+    
+    def outcome_index(self, outcome: Union[int, str]) -> int:
+        """Resolve an outcome ID or index to its position in the q vector"""
+        if isinstance(outcome, str):
+            if outcome not in self._index:
+                raise ValueError(f"Unknown outcome {outcome}")
+            return self._index[outcome]
+        return int(outcome)
+    
+    def cost(self, q: Optional[np.ndarray] = None) -> float:
+        """
+        LMSR cost function C(q) = b * log(sum(e^(q/b)))
+        
+        Args:
+            q: Quantity vector (defaults to the current state)
+        """
+        x = (self.q if q is None else q) / self.b
+        m = x.max()
+        return float(self.b * (m + np.log(np.exp(x - m).sum())))
+    
+    def get_probabilities(self) -> np.ndarray:
+        """
+        Get current prices of all outcomes in one vectorized pass
+        
+        Returns:
+            Array of probabilities summing to 1
+        """
+        x = self.q / self.b
+        e = np.exp(x - x.max())
+        return e / e.sum()
+    
+    def get_probability(self, outcome: Union[int, str] = 0) -> float:
+        """Get current probability of a single outcome"""
+        return float(self.get_probabilities()[self.outcome_index(outcome)])
+    
+    def quote(self, outcome: Union[int, str], shares: float) -> float:
+        """
+        Cost of buying ``shares`` of an outcome: C(q + shares * e_i) - C(q)
+        
+        Args:
+            outcome: Outcome ID or index
+            shares: Quantity to buy (negative to sell)
+        
+        Returns:
+            Cost in stake units
+        """
+        q = self.q.copy()
+        q[self.outcome_index(outcome)] += shares
+        return self.cost(q) - self.cost()
+    
+    def quote_all(self, shares: float) -> np.ndarray:
+        """
+        Cost of buying ``shares`` of each outcome, for every outcome at once
+        
+        Uses C(q + s * e_i) - C(q) = b * log(1 + p_i * (e^(s/b) - 1)).
+        
+        Args:
+            shares: Quantity to buy of each outcome
+        
+        Returns:
+            Array of costs, one per outcome
+        """
+        p = self.get_probabilities()
+        return self.b * np.log1p(p * np.expm1(shares / self.b))
+    
+    @metrics.timed('samsa_lmsr_seconds', 'invest_multi')
+    def invest(self, outcome: Union[int, str], stake: float) -> float:
+        """
+        Risk-weighted investment on one outcome
+        
+        Args:
+            outcome: Outcome ID or index
+            stake: Amount to invest
+        
+        Returns:
+            New probability of the outcome after investment (clamped 0.05-0.95)
+        """
+        i = self.outcome_index(outcome)
+        p = self.get_probabilities()[i]
+        # Risk-weighted pressure based on downside risk
+        self.q[i] += stake * (1 - p)
+        
+        new_p = float(self.get_probabilities()[i])
+        return max(0.05, min(0.95, new_p))
+    
+    def get_state(self) -> Dict[str, Any]:
+        """Get market state for persistence"""
+        return {
+            'outcome_ids': list(self.outcome_ids),
+            'q': self.q.tolist(),
+            'b': self.b,
+            'probabilities': self.get_probabilities().tolist()
+        }
+    
+    def set_state(self, state: Dict[str, Any]) -> None:
+        """Restore market state"""
+        if 'outcome_ids' in state:
+            self.outcome_ids = list(state['outcome_ids'])
+            self._index = {outcome_id: i for i, outcome_id in enumerate(self.outcome_ids)}
+        if 'q' in state:
+            self.q = np.asarray(state['q'], dtype=float)
+        if 'b' in state:
+            self.b = state['b']
+    
+    @classmethod
+    def from_binary(cls, market: LMSRMarket, outcome_ids: Sequence[str]) -> 'MultiOutcomeLMSRMarket':
+        """
+        Upgrade a YES/NO market that tracked "first outcome vs. the rest"
+        
+        The first outcome keeps its YES probability and the NO probability is
+        split evenly across the remaining outcomes.
+        """
+        p_yes = market.get_probability()
+        rest = (1 - p_yes) / (len(outcome_ids) - 1)
+        return cls(outcome_ids, market.b, [p_yes] + [rest] * (len(outcome_ids) - 1))
+
+
 class LMSR:
     """Static utility class for LMSR calculations"""
     
@@ -205,6 +368,7 @@ class LMSR:
         return f"1:{loss_amount / win_profit:.2f}"
     
     @staticmethod
+    @metrics.timed('samsa_lmsr_seconds', 'settle_trade')
     def settle_trade(stake: float, probability: float, did_win: bool, fee: float = 0.01) -> SettlementResult:
         """
         Full settlement calculation
@@ -214,7 +378,7 @@ class LMSR:
             probability: Probability at time of trade (0-1 or 0-100)
             did_win: Whether the trade won
             fee: Platform fee
-            
+        
         Returns:
             SettlementResult with all settlement details
         """
@@ -241,6 +405,39 @@ class LMSR:
                 refund=refund
             )
     
+    @staticmethod
+    @metrics.timed('samsa_lmsr_seconds', 'settle_trades_batch')
+    def settle_trades_batch(stakes: Sequence[float], probabilities: Sequence[float],
+                            did_win: Sequence[bool], fee: float = 0.01) -> Dict[str, np.ndarray]:
+        """
+        Vectorized ``settle_trade`` over many trades
+        
+        Args:
+            stakes: Investment amounts
+            probabilities: Probabilities at time of trade (0-1 or 0-100, per element)
+            did_win: Whether each trade won
+            fee: Platform fee
+        
+        Returns:
+            Dict of column name -> array; ``refund`` is NaN for winning trades
+        """
+        stake = np.asarray(stakes, dtype=float)
+        p = np.asarray(probabilities, dtype=float)
+        p = np.where(p > 1, p / 100, p)
+        won = np.asarray(did_win, dtype=bool)
+        
+        at_risk = stake * (1 - p)
+        profit = at_risk * (1 - fee)
+        refund = stake * p
+        
+        return {
+            'did_win': won,
+            'user_net': np.where(won, profit, -at_risk),
+            'total_return': np.where(won, stake + profit, refund),
+            'platform_revenue': np.where(won, at_risk * fee, 0.0),
+            'refund': np.where(won, np.nan, refund)
+        }
+    
     @staticmethod
     def get_trade_breakdown(stake: float, probability: float, fee: float = 0.01) -> TradeBreakdown:
         """
@@ -250,7 +447,7 @@ class LMSR:
             stake: Investment amount
             probability: Probability (0-100 or 0-1)
             fee: Platform fee
-            
+        
         Returns:
             TradeBreakdown with all calculated values
         """
@@ -276,20 +473,105 @@ class LMSR:
             platform_revenue=platform_revenue,
             risk_reward=LMSR.calc_risk_reward(stake, p, fee)
         )
+    
+    @staticmethod
+    def get_trade_breakdown_batch(stakes: Sequence[float], probabilities: Sequence[float],
+                                  fee: float = 0.01, grid: bool = False) -> Dict[str, np.ndarray]:
+        """
+        Vectorized trade breakdown for many (stake, probability) pairs
+        
+        Computes the same quantities as ``get_trade_breakdown`` for whole
+        arrays at once and returns them as columns instead of one
+        ``TradeBreakdown`` per pair.
+        
+        Args:
+            stakes: Investment amounts
+            probabilities: Probabilities (0-100 or 0-1, per element)
+            fee: Platform fee
+            grid: If True, price every stake against every probability; the
+                columns then have shape (len(probabilities), len(stakes))
+        
+        Returns:
+            Dict of column name -> array (broadcast shape of the inputs)
+        """
+        stake = np.asarray(stakes, dtype=float)
+        p = np.asarray(probabilities, dtype=float)
+        p = np.where(p > 1, p / 100, p)
+        if grid:
+            stake, p = np.meshgrid(stake, p)
+        else:
+            stake, p = np.broadcast_arrays(stake, p)
+        
+        at_risk = stake * (1 - p)
+        win_profit = at_risk * (1 - fee)
+        win_return = stake + win_profit
+        lose_refund = stake * p
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            win_return_percent = np.where(stake > 0, win_return / stake * 100, 0.0)
+            lose_return_percent = np.where(stake > 0, lose_refund / stake * 100, 0.0)
+            risk_reward = np.where(win_profit > 0, at_risk / win_profit, np.nan)
+        
+        return {
+            'stake': stake,
+            'probability': p,
+            'probability_percent': p * 100,
+            'win_profit': win_profit,
+            'win_return': win_return,
+            'win_return_percent': win_return_percent,
+            'lose_loss': at_risk,
+            'lose_refund': lose_refund,
+            'lose_return_percent': lose_return_percent,
+            'platform_revenue': at_risk * fee,
+            'risk_reward': risk_reward
+        }
 
 
 class LMSRMarketManager:
     """Manages multiple LMSR markets"""
     
     def __init__(self):
-        self.markets: Dict[str, LMSRMarket] = {}
+        self.markets: Dict[str, Union[LMSRMarket, MultiOutcomeLMSRMarket]] = {}
+        self._dirty: Set[str] = set()
+        self._dirty_lock = threading.Lock()
     
     def get_or_create_market(self, market_id: str, b: float = 100, initial_probability: float = 0.5) -> LMSRMarket:
         """Get or create a market"""
         if market_id not in self.markets:
             self.markets[market_id] = LMSRMarket(b, initial_probability)
+            self.mark_dirty(market_id)
         return self.markets[market_id]
     
+    def get_or_create_multi_market(self, market_id: str, outcome_ids: Sequence[str], b: float = 100,
+                                   initial_probabilities: Optional[Sequence[float]] = None) -> MultiOutcomeLMSRMarket:
+        """
+        Get or create an N-outcome market
+        
+        A binary market previously created for the same ID is upgraded in place.
+        """
+        market = self.markets.get(market_id)
+        if isinstance(market, MultiOutcomeLMSRMarket):
+            return market
+        
+        if market is None:
+            market = MultiOutcomeLMSRMarket(outcome_ids, b, initial_probabilities)
+        else:
+            market = MultiOutcomeLMSRMarket.from_binary(market, outcome_ids)
+        self.markets[market_id] = market
+        self.mark_dirty(market_id)
+        return market
+    
+    def mark_dirty(self, market_id: str) -> None:
+        """Flag a market whose state changed outside ``invest`` for the next checkpoint"""
+        with self._dirty_lock:
+            self._dirty.add(market_id)
+    
+    def pop_dirty(self) -> Set[str]:
+        """Return and clear the IDs of markets changed since the last call"""
+        with self._dirty_lock:
+            dirty, self._dirty = self._dirty, set()
+        return dirty
+    
     def get_market(self, market_id: str) -> Optional[LMSRMarket]:
         """Get existing market"""
         return self.markets.get(market_id)
@@ -305,8 +587,12 @@ class LMSRMarketManager:
         if not market:
             raise ValueError(f"Market {market_id} not found")
         
-        old_probability = market.get_probability()
+        if isinstance(market, MultiOutcomeLMSRMarket):
+            old_probability = market.get_probability(side)
+        else:
+            old_probability = market.get_probability()
         new_probability = market.invest(side, stake)
+        self.mark_dirty(market_id)
         breakdown = LMSR.get_trade_breakdown(stake, old_probability)
         
         return {
@@ -319,6 +605,45 @@ class LMSRMarketManager:
             'breakdown': breakdown.to_dict()
         }
     
+    def trade(self, market_id: str, outcome_ids: Sequence[str], outcome_id: str, stake: float,
+              b: float = 100, initial_probabilities: Optional[Sequence[float]] = None) -> Dict[str, Any]:
+        """
+        Invest in one outcome of an N-outcome market, creating it if needed
+        
+        Args:
+            market_id: Market ID
+            outcome_ids: The market's outcome IDs (used when creating it)
+            outcome_id: Outcome to invest in
+            stake: Amount to invest
+            b: Liquidity parameter for a new market
+            initial_probabilities: Seed prices for a new market
+        
+        Returns:
+            Dict with ``shares`` (q added), ``old_probability`` of the outcome
+            and the post-trade ``probabilities`` in outcome order
+        """
+        market = self.get_or_create_multi_market(market_id, outcome_ids, b, initial_probabilities)
+        old_probability = market.get_probability(outcome_id)
+        market.invest(outcome_id, stake)
+        self.mark_dirty(market_id)
+        return {
+            'shares': stake * (1 - old_probability),
+            'old_probability': old_probability,
+            'probabilities': market.get_probabilities().tolist()
+        }
+    
+    def get_state(self, market_id: str) -> Optional[Dict[str, Any]]:
+        """State of one market, or None if it has no LMSR state yet"""
+        market = self.markets.get(market_id)
+        return market.get_state() if market is not None else None
+    
+    def get_states(self, market_ids: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+        """States of the given markets that exist"""
+        return {market_id: self.markets[market_id].get_state() for market_id in market_ids if market_id in self.markets}
+    
+    def __len__(self) -> int:
+        return len(self.markets)
+    
     def get_all_states(self) -> Dict[str, Dict[str, Any]]:
         """Get all market states"""
         return {market_id: market.get_state() for market_id, market in self.markets.items()}
@@ -326,7 +651,10 @@ class LMSRMarketManager:
     def restore_states(self, states: Dict[str, Dict[str, Any]]) -> None:
         """Restore all market states"""
         for market_id, state in states.items():
-            market = LMSRMarket(state.get('b', 100))
+            if 'q' in state:
+                market = MultiOutcomeLMSRMarket(state['outcome_ids'], state.get('b', 100))
+            else:
+                market = LMSRMarket(state.get('b', 100))
             market.set_state(state)
             self.markets[market_id] = market
 
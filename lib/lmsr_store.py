@@ -0,0 +1,103 @@
+"""
+SAMSA - LMSR State Store
+Durable checkpoints of LMSR market quantities
+"""
+
+import os
+import threading
+from typing import Any, Dict, Optional
+
+from .datastore import read_json, write_json
+from .journal import Journal
+from .lmsr import LMSRMarketManager
+
+
+class LMSRStateStore:
+    """
+    Checkpoints an ``LMSRMarketManager`` to disk and restores it at boot
+    
+    Only markets flagged dirty since the previous checkpoint are written,
+    one journal line each, and a background thread throttles checkpoints to
+    one every ``checkpoint_interval`` seconds however many trades happen in
+    between. The journal is folded into a ``{market_id: state}`` JSON
+    snapshot once it reaches ``compact_threshold`` entries.
+    """
+    
+    def __init__(self, manager: LMSRMarketManager, file_path: str,
+                 checkpoint_interval: float = 1.0, compact_threshold: int = 5000):
+        """
+        Initialize the store
+        
+        Args:
+            manager: Market manager to checkpoint
+            file_path: Path to the JSON snapshot file
+            checkpoint_interval: Seconds between background checkpoints (0 = manual only)
+            compact_threshold: Journal entries that trigger a snapshot compaction
+        """
+        self.manager = manager
+        self.file_path = file_path
+        self.checkpoint_interval = checkpoint_interval
+        self.compact_threshold = compact_threshold
+        self.journal = Journal(os.path.splitext(file_path)[0] + '.journal.jsonl')
+        
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def load(self) -> int:
+        """
+        Restore all market states from the snapshot and journal
+        
+        Returns:
+            Number of markets restored
+        """
+        states: Dict[str, Dict[str, Any]] = read_json(self.file_path) or {}
+        for entry in self.journal.replay():
+            states[entry['id']] = entry['state']
+        
+        self.manager.restore_states(states)
+        return len(states)
+    
+    def checkpoint(self) -> int:
+        """
+        Persist the state of every market changed since the last checkpoint
+        
+        Returns:
+            Number of markets written
+        """
+        with self._lock:
+            dirty = self.manager.pop_dirty()
+            for market_id in dirty:
+                market = self.manager.get_market(market_id)
+                if market is not None:
+                    self.journal.append({'id': market_id, 'state': market.get_state()})
+            self.journal.sync()
+            
+            if len(self.journal) >= self.compact_threshold:
+                self.compact()
+            return len(dirty)
+    
+    def compact(self) -> None:
+        """Write a full snapshot of all markets and truncate the journal"""
+        with self._lock:
+            write_json(self.file_path, self.manager.get_all_states())
+            self.journal.truncate()
+    
+    def start(self) -> None:
+        """Start periodic background checkpoints"""
+        if self.checkpoint_interval > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+    
+    def close(self) -> None:
+        """Stop background checkpoints and write a final one"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.checkpoint()
+        self.journal.close()
+    
+    def _run(self) -> None:
+        while not self._stop.wait(self.checkpoint_interval):
+            self.checkpoint()
@@ -0,0 +1,39 @@
+"""
+SAMSA - Lock Striping
+Per-key locks for serializing updates to the same market
+"""
+
+import threading
+import zlib
+from typing import List
+
+
+class LockStripes:
+    """
+    Fixed pool of locks selected by hashing a key
+    
+    Two operations on the same key always take the same lock, while
+    operations on different keys usually proceed in parallel. The pool size
+    bounds memory no matter how many keys are seen.
+    """
+    
+    def __init__(self, stripes: int = 64):
+        """
+        Initialize the lock pool
+        
+        Args:
+            stripes: Number of locks in the pool
+        """
+        self._locks: List[threading.RLock] = [threading.RLock() for _ in range(stripes)]
+    
+    def lock_for(self, key: str) -> threading.RLock:
+        """
+        Get the lock guarding a key
+        
+        Args:
+            key: Key to lock (e.g. a market ID)
+            
+        Returns:
+            Re-entrant lock shared by every key in the same stripe
+        """
+        return self._locks[zlib.crc32(key.encode('utf-8')) % len(self._locks)]
@@ -0,0 +1,151 @@
+"""
+SAMSA - Market Index
+Incrementally maintained ranked views over the market catalog
+"""
+
+import heapq
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sortedcontainers import SortedList
+
+# Close date used to score markets that have none (matches server.js)
+NO_CLOSE_DATE = datetime(2099, 12, 31, tzinfo=timezone.utc)
+
+
+def parse_timestamp(value: Optional[str]) -> Optional[float]:
+    """Parse an ISO-8601 date string (with optional trailing Z) to a UTC timestamp"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+class MarketIndex:
+    """
+    Ranked views of active markets kept up to date on every change
+    
+    Maintains three structures, each updated in O(log N) when a market is
+    created, traded or resolved:
+    
+    - a volume-ordered ``SortedList`` for "trending" (top K is a slice),
+    - a close-date-ordered list for "current events" (the time window is
+      found by bisection, so only markets inside it are scored),
+    - per-category buckets of active market IDs.
+    
+    Views return market IDs; callers look the records up in their store.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_volume: SortedList = SortedList()
+        self._by_close: SortedList = SortedList()
+        self._no_close: Dict[str, None] = {}
+        self._categories: Dict[str, Dict[str, None]] = {}
+        self._entries: Dict[str, Tuple[float, Optional[float], str]] = {}
+    
+    def rebuild(self, markets: List[dict]) -> None:
+        """Index a full catalog from scratch"""
+        with self._lock:
+            self._by_volume = SortedList()
+            self._by_close = SortedList()
+            self._no_close = {}
+            self._categories = {}
+            self._entries = {}
+            for market in markets:
+                self._add(market)
+    
+    def update(self, market_id: str, market: Optional[dict]) -> None:
+        """
+        Re-index one market (``JSONStore`` listener signature)
+        
+        Args:
+            market_id: ID of the changed market
+            market: Current record, or None if it was deleted
+        """
+        with self._lock:
+            self._remove(market_id)
+            if market is not None:
+                self._add(market)
+    
+    def _add(self, market: dict) -> None:
+        if market.get('status') != 'active':
+            return
+        
+        market_id = market['id']
+        volume = market.get('total_volume') or 0
+        close_ts = parse_timestamp(market.get('close_date'))
+        category = (market.get('category') or '').lower()
+        
+        self._by_volume.add((-volume, market_id))
+        if close_ts is None:
+            self._no_close[market_id] = None
+        else:
+            self._by_close.add((close_ts, market_id))
+        self._categories.setdefault(category, {})[market_id] = None
+        self._entries[market_id] = (volume, close_ts, category)
+    
+    def _remove(self, market_id: str) -> None:
+        entry = self._entries.pop(market_id, None)
+        if entry is None:
+            return
+        
+        volume, close_ts, category = entry
+        self._by_volume.discard((-volume, market_id))
+        if close_ts is None:
+            self._no_close.pop(market_id, None)
+        else:
+            self._by_close.discard((close_ts, market_id))
+        bucket = self._categories.get(category)
+        if bucket is not None:
+            bucket.pop(market_id, None)
+            if not bucket:
+                del self._categories[category]
+    
+    def trending(self, limit: int = 10) -> List[str]:
+        """IDs of the ``limit`` active markets with the highest volume"""
+        with self._lock:
+            return [market_id for _, market_id in self._by_volume.islice(0, limit)]
+    
+    def current_events(self, now: Optional[datetime] = None, horizon_days: int = 180,
+                       limit: Optional[int] = None) -> List[str]:
+        """
+        IDs of active markets closing within the horizon (or with no close
+        date), best first by ``volume / 1000 - days_until_close / 10``
+        
+        Args:
+            now: Reference time (defaults to the current UTC time)
+            horizon_days: How far ahead a close date may be
+            limit: Return only the top ``limit`` markets
+        """
+        now = now or datetime.now(timezone.utc)
+        now_ts = now.timestamp()
+        horizon_ts = (now + timedelta(days=horizon_days)).timestamp()
+        no_close_ts = NO_CLOSE_DATE.timestamp()
+        
+        with self._lock:
+            lo = self._by_close.bisect_right((now_ts, '\uffff'))
+            hi = self._by_close.bisect_right((horizon_ts, '\uffff'))
+            candidates = list(self._by_close.islice(lo, hi))
+            candidates.extend((no_close_ts, market_id) for market_id in self._no_close)
+            scored = [
+                (self._entries[market_id][0] / 1000 - (close_ts - now_ts) / 86400 / 10, market_id)
+                for close_ts, market_id in candidates
+            ]
+        
+        if limit is not None:
+            best = heapq.nlargest(limit, scored, key=lambda item: item[0])
+        else:
+            best = sorted(scored, key=lambda item: item[0], reverse=True)
+        return [market_id for _, market_id in best]
+    
+    def category(self, category: str) -> List[str]:
+        """IDs of active markets in a category (case-insensitive)"""
+        with self._lock:
+            return list(self._categories.get(category.lower(), ()))
@@ -0,0 +1,99 @@
+"""
+SAMSA - Market Statistics
+Incremental maintenance and consistency checks for market totals
+"""
+
+from typing import Any, Dict, List, Optional, Sequence
+
+
+def apply_trade(market: dict, outcome: dict, stake: float,
+                probabilities: Optional[Sequence[float]] = None) -> None:
+    """
+    Update a market's statistics for one trade without rescanning it
+    
+    Args:
+        market: Market record (mutated in place)
+        outcome: The traded outcome within ``market['outcomes']``
+        stake: Amount staked
+        probabilities: Post-trade LMSR prices (0-1) in outcome order; when
+            given they replace the displayed outcome probabilities
+    """
+    outcome['total_stake'] = outcome.get('total_stake', 0) + stake
+    market['total_volume'] = market.get('total_volume', 0) + stake
+    
+    if probabilities is not None:
+        for o, p in zip(market['outcomes'], probabilities):
+            o['probability'] = round(p * 100)
+
+
+def compute_stats(market: dict, predictions: List[dict],
+                  probabilities: Optional[Sequence[float]] = None) -> Dict[str, Any]:
+    """
+    Derive a market's statistics from scratch from its prediction log
+    
+    Args:
+        market: Market record
+        predictions: All predictions placed on the market
+        probabilities: LMSR prices (0-1) in outcome order, if known
+        
+    Returns:
+        Dict with ``total_volume`` and per-outcome ``outcomes`` values
+    """
+    stakes = {o['id']: 0 for o in market['outcomes']}
+    for p in predictions:
+        if p['outcome_id'] in stakes:
+            stakes[p['outcome_id']] += p['stake_amount']
+    
+    outcomes = {}
+    for i, o in enumerate(market['outcomes']):
+        expected = {'total_stake': stakes[o['id']]}
+        if probabilities is not None:
+            expected['probability'] = round(probabilities[i] * 100)
+        outcomes[o['id']] = expected
+    
+    return {'total_volume': sum(stakes.values()), 'outcomes': outcomes}
+
+
+def verify_stats(market: dict, predictions: List[dict],
+                 probabilities: Optional[Sequence[float]] = None,
+                 repair: bool = False, tolerance: float = 1e-6) -> List[Dict[str, Any]]:
+    """
+    Check a market's running totals against its prediction log
+    
+    Args:
+        market: Market record
+        predictions: All predictions placed on the market
+        probabilities: LMSR prices (0-1) in outcome order, if known
+        repair: Overwrite mismatched values with the rebuilt ones
+        tolerance: Allowed absolute difference for stake totals
+        
+    Returns:
+        List of mismatches ({field, outcome_id, stored, expected})
+    """
+    expected = compute_stats(market, predictions, probabilities)
+    mismatches = []
+    
+    if abs(market.get('total_volume', 0) - expected['total_volume']) > tolerance:
+        mismatches.append({
+            'field': 'total_volume',
+            'outcome_id': None,
+            'stored': market.get('total_volume', 0),
+            'expected': expected['total_volume']
+        })
+        if repair:
+            market['total_volume'] = expected['total_volume']
+    
+    for o in market['outcomes']:
+        for field_name, value in expected['outcomes'][o['id']].items():
+            stored = o.get(field_name, 0)
+            if abs(stored - value) > tolerance:
+                mismatches.append({
+                    'field': field_name,
+                    'outcome_id': o['id'],
+                    'stored': stored,
+                    'expected': value
+                })
+                if repair:
+                    o[field_name] = value
+    
+    return mismatches
@@ -0,0 +1,322 @@
+"""
+SAMSA - Metrics
+Counters, latency histograms and a sampling profiler with Prometheus text output
+"""
+
+import bisect
+import functools
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds (50us .. 10s)
+DEFAULT_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+# Innermost frames of threads that are parked rather than working; such
+# samples are dropped so idle flushers and pools do not swamp the profile
+IDLE_FRAMES = frozenset({
+    'threading.py:wait',
+    'threading.py:_wait_for_tstate_lock',
+    'queue.py:get',
+    'selectors.py:select',
+    'socket.py:accept'
+})
+
+
+class Histogram:
+    """Cumulative-bucket histogram of observed values"""
+    
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+    
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class _Family:
+    """A named metric with a fixed set of label names"""
+    
+    def __init__(self, name: str, kind: str, help_text: str, label_names: Sequence[str]):
+        self.name = name
+        self.kind = kind
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.children: Dict[LabelValues, object] = {}
+
+
+class Metrics:
+    """
+    Registry of counters, histograms and gauges
+    
+    Recording is a dict lookup plus a few additions under one lock, so the
+    instrumented hot paths pay well under a microsecond per call. Nothing is
+    formatted until ``render`` is called by a scrape. ``enabled = False``
+    turns every timer and counter into a no-op.
+    """
+    
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._families: Dict[str, _Family] = {}
+        self._gauges: Dict[str, Tuple[str, Callable[[], float]]] = {}
+        self._lock = threading.Lock()
+    
+    # --- Registration ---
+    
+    def counter(self, name: str, help_text: str, label_names: Sequence[str] = ()) -> None:
+        """Declare a counter family"""
+        self._families.setdefault(name, _Family(name, 'counter', help_text, label_names))
+    
+    def histogram(self, name: str, help_text: str, label_names: Sequence[str] = ()) -> None:
+        """Declare a histogram family"""
+        self._families.setdefault(name, _Family(name, 'histogram', help_text, label_names))
+    
+    def gauge(self, name: str, help_text: str, fn: Callable[[], float]) -> None:
+        """Declare a gauge whose value is read from ``fn`` at scrape time"""
+        self._gauges[name] = (help_text, fn)
+    
+    # --- Recording ---
+    
+    def inc(self, name: str, labels: LabelValues = (), amount: float = 1) -> None:
+        """Increment a counter"""
+        if not self.enabled:
+            return
+        family = self._families[name]
+        with self._lock:
+            family.children[labels] = family.children.get(labels, 0) + amount
+    
+    def observe(self, name: str, labels: LabelValues, value: float) -> None:
+        """Record one observation in a histogram"""
+        if not self.enabled:
+            return
+        family = self._families[name]
+        with self._lock:
+            histogram = family.children.get(labels)
+            if histogram is None:
+                histogram = family.children[labels] = Histogram()
+            histogram.observe(value)
+    
+    @contextmanager
+    def timer(self, name: str, labels: LabelValues = ()) -> Iterator[None]:
+        """Time a block into a histogram (seconds)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, labels, time.perf_counter() - start)
+    
+    def timed(self, name: str, *labels: str) -> Callable[[Callable], Callable]:
+        """Decorator timing every call of a function into a histogram"""
+        def decorator(fn: Callable) -> Callable:
+            # Resolve the histogram once so each call only pays for two
+            # clock reads and one locked update
+            family = self._families[name]
+            histogram = family.children.setdefault(labels, Histogram())
+            lock = self._lock
+            clock = time.perf_counter
+            
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                start = clock()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    elapsed = clock() - start
+                    with lock:
+                        histogram.observe(elapsed)
+            return wrapper
+        return decorator
+    
+    # --- Exposition ---
+    
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format"""
+        lines: List[str] = []
+        with self._lock:
+            snapshot = [(family, [(labels, _copy(child)) for labels, child in sorted(family.children.items())])
+                        for family in self._families.values()]
+        
+        for family, children in snapshot:
+            lines.append(f'# HELP {family.name} {family.help}')
+            lines.append(f'# TYPE {family.name} {family.kind}')
+            for labels, child in children:
+                if family.kind == 'counter':
+                    lines.append(f'{family.name}{_labels(family.label_names, labels)} {_number(child)}')
+                    continue
+                cumulative = 0
+                for bound, count in zip(child.buckets + (float('inf'),), child.counts):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f"{family.name}_bucket{_labels(family.label_names + ('le',), labels + (le,))} {cumulative}")
+                lines.append(f'{family.name}_sum{_labels(family.label_names, labels)} {_number(child.sum)}')
+                lines.append(f'{family.name}_count{_labels(family.label_names, labels)} {child.count}')
+        
+        for name, (help_text, fn) in self._gauges.items():
+            try:
+                value = fn()
+            except Exception:
+                continue
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} gauge')
+            lines.append(f'{name} {_number(value)}')
+        
+        return '\n'.join(lines) + '\n'
+
+
+def _copy(child):
+    if isinstance(child, Histogram):
+        copy = Histogram(child.buckets)
+        copy.counts, copy.sum, copy.count = list(child.counts), child.sum, child.count
+        return copy
+    return child
+
+
+def _labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ''
+    pairs = ','.join(f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+    return '{' + pairs + '}'
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler sampling every thread's stack on a timer
+    
+    While stopped it costs nothing. While running, a daemon thread reads
+    ``sys._current_frames()`` every ``interval`` seconds and counts each
+    collapsed stack, which can be rendered in the folded format used by
+    flame graph tools or summarized per function.
+    """
+    
+    def __init__(self, interval: float = 0.005, max_depth: int = 64):
+        """
+        Args:
+            interval: Seconds between samples
+            max_depth: Innermost frames kept per stack
+        """
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples = 0
+        self.started_at: Optional[float] = None
+        self._stacks: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+    
+    def start(self, interval: Optional[float] = None, reset: bool = True) -> None:
+        """Start sampling (no-op if already running)"""
+        if self._thread is not None:
+            return
+        if interval:
+            self.interval = interval
+        if reset:
+            self.reset()
+        self.started_at = time.time()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='samsa-profiler', daemon=True)
+        self._thread.start()
+    
+    def stop(self) -> None:
+        """Stop sampling, keeping the collected stacks"""
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join()
+    
+    def reset(self) -> None:
+        with self._lock:
+            self._stacks = {}
+            self.samples = 0
+    
+    def folded(self) -> str:
+        """Collected stacks in folded format ('outer;inner count' per line)"""
+        with self._lock:
+            stacks = sorted(self._stacks.items(), key=lambda item: -item[1])
+        return ''.join(f'{stack} {count}\n' for stack, count in stacks)
+    
+    def top(self, limit: int = 25) -> Dict[str, object]:
+        """
+        Summarize the samples per function
+        
+        Returns:
+            Dict with sample totals and the functions with the most
+            ``self`` (innermost frame) and ``total`` (anywhere on the stack) samples
+        """
+        with self._lock:
+            stacks = dict(self._stacks)
+            samples = self.samples
+        own: Dict[str, int] = {}
+        total: Dict[str, int] = {}
+        for stack, count in stacks.items():
+            frames = stack.split(';')
+            own[frames[-1]] = own.get(frames[-1], 0) + count
+            for frame in set(frames):
+                total[frame] = total.get(frame, 0) + count
+        
+        def ranked(counts: Dict[str, int]) -> List[Dict[str, object]]:
+            return [{'function': fn, 'samples': n} for fn, n in sorted(counts.items(), key=lambda item: -item[1])[:limit]]
+        
+        return {
+            'running': self.running,
+            'interval': self.interval,
+            'samples': samples,
+            'started_at': self.started_at,
+            'self': ranked(own),
+            'total': ranked(total)
+        }
+    
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            collected = []
+            for thread_id, frame in frames.items():
+                if thread_id == own_id:
+                    continue
+                stack = self._collapse(frame)
+                if stack.rsplit(';', 1)[-1] not in IDLE_FRAMES:
+                    collected.append(stack)
+            with self._lock:
+                for stack in collected:
+                    self._stacks[stack] = self._stacks.get(stack, 0) + 1
+                self.samples += 1
+    
+    def _collapse(self, frame) -> str:
+        names = []
+        while frame is not None and len(names) < self.max_depth:
+            code = frame.f_code
+            names.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+            frame = frame.f_back
+        return ';'.join(reversed(names))
+
+
+# Process-wide registry used by the library's instrumented hot paths
+metrics = Metrics(enabled=os.environ.get('SAMSA_METRICS', '1') != '0')
+metrics.histogram('samsa_datastore_seconds', 'Time spent in datastore file I/O', ('op',))
+metrics.histogram('samsa_lmsr_seconds', 'Time spent in LMSR pricing and settlement', ('op',))
+metrics.counter('samsa_trade_batches_total', 'Group commits performed by the trade queue')
+metrics.counter('samsa_trade_batch_orders_total', 'Orders applied through the trade queue')
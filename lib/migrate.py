@@ -0,0 +1,28 @@
+"""
+SAMSA - JSON to SQLite Migration
+One-shot copy of data/*.json into the SQLite backend
+
+Usage: python -m lib.migrate [data_dir] [db_path]
+"""
+
+import os
+import sys
+
+from .sqlite_store import SQLiteBackend, migrate_json
+
+
+def main(argv) -> None:
+    source = argv[0] if argv else 'data'
+    target = argv[1] if len(argv) > 1 else os.path.join(source, 'samsa.db')
+    
+    database = SQLiteBackend(target)
+    try:
+        for collection, migrated in migrate_json(source, database).items():
+            print(f'{collection}: {migrated} records')
+    finally:
+        database.close()
+    print(f'Migrated {source} -> {target}')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
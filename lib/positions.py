@@ -0,0 +1,268 @@
+"""
+SAMSA - Position Book
+Materialized per-user, per-market positions with vectorized mark-to-market
+"""
+
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+from .datastore import JSONStore
+from .lmsr import LMSR
+
+
+class _Entry(NamedTuple):
+    """A prediction's contribution to its owner's position"""
+    user_id: str
+    market_id: str
+    outcome_id: str
+    active: bool
+    stake: float
+    shares: float
+    win_value: float
+    lose_value: float
+    returned: float
+    created_at: str
+
+
+@dataclass
+class Holding:
+    """Open exposure to one outcome of a market"""
+    shares: float = 0.0
+    cost: float = 0.0
+    win_value: float = 0.0
+    lose_value: float = 0.0
+    predictions: int = 0
+    
+    @property
+    def avg_cost(self) -> float:
+        """Stake paid per share"""
+        return self.cost / self.shares if self.shares > 0 else 0.0
+
+
+@dataclass
+class Position:
+    """A user's holdings and realized results in one market"""
+    outcomes: Dict[str, Holding] = field(default_factory=dict)
+    realized_cost: float = 0.0
+    realized_return: float = 0.0
+    settled: int = 0
+    created_at: str = ''
+    updated_at: str = ''
+
+
+class PositionBook:
+    """
+    Per-user positions kept current by a prediction store listener
+    
+    Each active prediction adds to its (user, market, outcome) holding:
+    
+    - shares: LMSR quantity bought (``shares`` on the prediction, or
+      stake * (1 - odds) for records written before it was stored)
+    - cost: stake paid
+    - win/lose value: what the prediction pays if the outcome wins
+      (``potential_return``) and if it loses (``potential_refund``)
+    
+    Under the rebated-loss model a holding at outcome probability ``pi``
+    is worth ``pi * win_value + (1 - pi) * lose_value``. That is linear in
+    the aggregates, so a whole portfolio is marked with one NumPy
+    expression, however many predictions it came from. When a prediction
+    settles, its stake and return move into the position's realized totals.
+    """
+    
+    def __init__(self, predictions: JSONStore):
+        """
+        Args:
+            predictions: Prediction store (positions update on every write)
+        """
+        self.predictions = predictions
+        self._lock = threading.Lock()
+        self._positions: Dict[str, Dict[str, Position]] = {}
+        self._entries: Dict[str, _Entry] = {}
+        
+        self.rebuild()
+        predictions.add_listener(self._on_prediction)
+    
+    # --- Maintenance ---
+    
+    def rebuild(self) -> None:
+        """Re-derive every position from the prediction log"""
+        positions: Dict[str, Dict[str, Position]] = {}
+        entries: Dict[str, _Entry] = {}
+        for prediction in self.predictions.all():
+            entry = _entry(prediction)
+            if entry is not None:
+                entries[prediction['id']] = entry
+                _apply(positions, entry, 1)
+        with self._lock:
+            self._positions = positions
+            self._entries = entries
+    
+    def _on_prediction(self, prediction_id: str, prediction: Optional[dict]) -> None:
+        entry = _entry(prediction) if prediction is not None else None
+        with self._lock:
+            previous = self._entries.get(prediction_id)
+            if previous == entry:
+                return
+            if previous is not None:
+                _apply(self._positions, previous, -1)
+                del self._entries[prediction_id]
+            if entry is not None:
+                _apply(self._positions, entry, 1)
+                self._entries[prediction_id] = entry
+    
+    # --- Reads ---
+    
+    def positions(self, user_id: str) -> Dict[str, Position]:
+        """Snapshot of a user's positions keyed by market ID"""
+        with self._lock:
+            return {
+                market_id: Position(
+                    outcomes={k: Holding(**vars(h)) for k, h in position.outcomes.items()},
+                    realized_cost=position.realized_cost,
+                    realized_return=position.realized_return,
+                    settled=position.settled,
+                    created_at=position.created_at,
+                    updated_at=position.updated_at
+                )
+                for market_id, position in self._positions.get(user_id, {}).items()
+            }
+    
+    def portfolio(self, user_id: str, prices: Callable[[str], Dict[str, float]],
+                  include_closed: bool = True) -> Dict[str, Any]:
+        """
+        Mark a user's positions to current prices
+        
+        Args:
+            user_id: User to report on
+            prices: Returns {outcome_id: probability (0-1)} for a market ID
+            include_closed: Also list positions with no open holdings
+        
+        Returns:
+            Positions with per-outcome and per-market values, plus totals
+        """
+        positions = self.positions(user_id)
+        
+        # Flatten every open holding into parallel arrays and mark them at once
+        keys = []
+        for market_id, position in positions.items():
+            market_prices = prices(market_id) if position.outcomes else {}
+            for outcome_id, holding in position.outcomes.items():
+                keys.append((market_id, outcome_id, holding, market_prices.get(outcome_id, 0.0)))
+        
+        pi = np.array([k[3] for k in keys], dtype=float)
+        win = np.array([k[2].win_value for k in keys], dtype=float)
+        lose = np.array([k[2].lose_value for k in keys], dtype=float)
+        cost = np.array([k[2].cost for k in keys], dtype=float)
+        value = pi * win + (1 - pi) * lose
+        pnl = value - cost
+        
+        holdings: Dict[str, List[Dict[str, Any]]] = {}
+        for i, (market_id, outcome_id, holding, price) in enumerate(keys):
+            holdings.setdefault(market_id, []).append({
+                'outcome_id': outcome_id,
+                'shares': round(holding.shares, 4),
+                'avg_cost': round(holding.avg_cost, 4),
+                'cost': round(holding.cost, 2),
+                'predictions': holding.predictions,
+                'probability': round(float(price), 4),
+                'value_if_win': round(holding.win_value, 2),
+                'value_if_lose': round(holding.lose_value, 2),
+                'market_value': round(float(value[i]), 2),
+                'unrealized_pnl': round(float(pnl[i]), 2)
+            })
+        
+        report = []
+        for market_id, position in positions.items():
+            outcomes = holdings.get(market_id, [])
+            if not outcomes and not include_closed:
+                continue
+            report.append({
+                'market_id': market_id,
+                'status': 'open' if outcomes else 'closed',
+                'outcomes': outcomes,
+                'cost': round(sum(o['cost'] for o in outcomes), 2),
+                'market_value': round(sum(o['market_value'] for o in outcomes), 2),
+                'unrealized_pnl': round(sum(o['unrealized_pnl'] for o in outcomes), 2),
+                'realized_pnl': round(position.realized_return - position.realized_cost, 2),
+                'settled_predictions': position.settled,
+                'created_at': position.created_at,
+                'updated_at': position.updated_at
+            })
+        report.sort(key=lambda p: (p['status'] != 'open', -p['market_value'], p['market_id']))
+        
+        return {
+            'user_id': user_id,
+            'positions': report,
+            'totals': {
+                'open_positions': sum(1 for p in report if p['status'] == 'open'),
+                'cost': round(float(cost.sum()), 2),
+                'market_value': round(float(value.sum()), 2),
+                'unrealized_pnl': round(float(pnl.sum()), 2),
+                'realized_pnl': round(sum(p.realized_return - p.realized_cost for p in positions.values()), 2)
+            }
+        }
+
+
+def _entry(prediction: dict) -> Optional[_Entry]:
+    """A user's prediction as a position entry (None for anonymous predictions)"""
+    user_id = prediction.get('user_id')
+    if not user_id or not prediction.get('market_id'):
+        return None
+    stake = prediction.get('stake_amount') or 0
+    shares = prediction.get('shares')
+    win_value = prediction.get('potential_return')
+    lose_value = prediction.get('potential_refund')
+    if shares is None or win_value is None or lose_value is None:
+        breakdown = LMSR.get_trade_breakdown(stake, prediction.get('odds_at_prediction') or 0)
+        if shares is None:
+            shares = stake * (1 - breakdown.probability)
+        if win_value is None:
+            win_value = breakdown.win_return
+        if lose_value is None:
+            lose_value = breakdown.lose_refund
+    active = prediction.get('status') == 'active'
+    return _Entry(
+        user_id=user_id,
+        market_id=prediction['market_id'],
+        outcome_id=prediction.get('outcome_id'),
+        active=active,
+        stake=stake,
+        shares=shares,
+        win_value=win_value,
+        lose_value=lose_value,
+        returned=0.0 if active else (prediction.get('actual_return') or 0),
+        created_at=prediction.get('created_at') or ''
+    )
+
+
+def _apply(positions: Dict[str, Dict[str, Position]], entry: _Entry, sign: int) -> None:
+    user_positions = positions.setdefault(entry.user_id, {})
+    position = user_positions.get(entry.market_id)
+    if position is None:
+        position = user_positions[entry.market_id] = Position(created_at=entry.created_at)
+    
+    if entry.active:
+        holding = position.outcomes.setdefault(entry.outcome_id, Holding())
+        holding.shares += sign * entry.shares
+        holding.cost += sign * entry.stake
+        holding.win_value += sign * entry.win_value
+        holding.lose_value += sign * entry.lose_value
+        holding.predictions += sign
+        if holding.predictions <= 0:
+            del position.outcomes[entry.outcome_id]
+    else:
+        position.realized_cost += sign * entry.stake
+        position.realized_return += sign * entry.returned
+        position.settled += sign
+    
+    if sign > 0:
+        if not position.created_at or (entry.created_at and entry.created_at < position.created_at):
+            position.created_at = entry.created_at
+        position.updated_at = max(position.updated_at, entry.created_at)
+    if not position.outcomes and position.settled <= 0:
+        del user_positions[entry.market_id]
+        if not user_positions:
+            del positions[entry.user_id]
@@ -0,0 +1,245 @@
+"""
+SAMSA - Price History
+Compact per-market probability time series with OHLC downsampling
+"""
+
+import os
+import re
+import struct
+import threading
+import time
+from array import array
+from typing import Any, BinaryIO, Dict, List, Optional, Sequence
+
+import numpy as np
+
+# Candle widths in seconds
+RESOLUTIONS = {
+    '1m': 60,
+    '1h': 3600,
+    '1d': 86400
+}
+
+# On-disk record: timestamp, traded volume, outcome count, then one price per outcome
+RECORD_HEADER = struct.Struct('<ddH')
+
+
+class PriceSeries:
+    """
+    Append-only price series for one market
+    
+    Timestamps, volumes and prices live in flat ``array('d')`` buffers
+    (prices with a stride of one slot per outcome), which cost 8 bytes per
+    value and can be viewed as NumPy arrays without copying. ``lock`` guards
+    the buffers and the series' file.
+    """
+    
+    def __init__(self, n_outcomes: int):
+        self.n_outcomes = n_outcomes
+        self.lock = threading.Lock()
+        self.timestamps = array('d')
+        self.volumes = array('d')
+        self.prices = array('d')
+    
+    def __len__(self) -> int:
+        return len(self.timestamps)
+    
+    def append(self, timestamp: float, prices: Sequence[float], volume: float = 0.0) -> None:
+        """Append one post-trade price vector"""
+        self.timestamps.append(timestamp)
+        self.volumes.append(volume)
+        self.prices.extend(prices)
+    
+    def candles(self, resolution: int, outcome_index: int = 0,
+                start: Optional[float] = None, end: Optional[float] = None) -> Dict[str, List[float]]:
+        """
+        Downsample one outcome's prices into OHLC buckets
+        
+        Args:
+            resolution: Bucket width in seconds
+            outcome_index: Position of the outcome in the price vector
+            start: Earliest timestamp to include
+            end: Latest timestamp to include
+        
+        Returns:
+            Columns t (bucket start), open, high, low, close and volume
+        """
+        n = len(self.timestamps)
+        ts = np.frombuffer(self.timestamps, dtype=float, count=n)
+        lo = 0 if start is None else int(np.searchsorted(ts, start, side='left'))
+        hi = n if end is None else int(np.searchsorted(ts, end, side='right'))
+        if lo >= hi:
+            return {'t': [], 'open': [], 'high': [], 'low': [], 'close': [], 'volume': []}
+        
+        ts = ts[lo:hi]
+        prices = np.frombuffer(self.prices, dtype=float, count=n * self.n_outcomes)
+        prices = prices.reshape(n, self.n_outcomes)[lo:hi, outcome_index]
+        volumes = np.frombuffer(self.volumes, dtype=float, count=n)[lo:hi]
+        
+        buckets = np.floor_divide(ts, resolution)
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(buckets)) + 1))
+        ends = np.concatenate((starts[1:], [len(ts)])) - 1
+        
+        return {
+            't': (buckets[starts] * resolution).tolist(),
+            'open': prices[starts].tolist(),
+            'high': np.maximum.reduceat(prices, starts).tolist(),
+            'low': np.minimum.reduceat(prices, starts).tolist(),
+            'close': prices[ends].tolist(),
+            'volume': np.add.reduceat(volumes, starts).tolist()
+        }
+
+
+class PriceHistory:
+    """
+    Price series for every market, persisted as append-only binary files
+    
+    Each trade appends one fixed-layout record to ``<directory>/<market_id>.bin``.
+    Series are loaded lazily the first time a market is touched.
+    
+    Trades on a market take only that series' lock, so markets record in
+    parallel. Each market being traded keeps a buffered append handle open.
+    A background thread flushes the handles every ``flush_interval`` seconds
+    and closes those idle since the previous flush, which bounds the number
+    of open files by the markets traded per interval.
+    """
+    
+    def __init__(self, directory: Optional[str] = None, flush_interval: float = 1.0):
+        """
+        Args:
+            directory: Where to persist series (None keeps them in memory only)
+            flush_interval: Seconds between flushes of the open files (0 = after every record)
+        """
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._series: Dict[str, PriceSeries] = {}
+        self._lock = threading.Lock()
+        self._files: Dict[str, BinaryIO] = {}
+        self._written: Dict[str, None] = {}
+        self._stop = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            if flush_interval > 0:
+                self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+                self._flusher.start()
+    
+    def _path(self, market_id: str) -> str:
+        safe = market_id if re.fullmatch(r'[A-Za-z0-9_-]+', market_id) else market_id.encode('utf-8').hex()
+        return os.path.join(self.directory, safe + '.bin')
+    
+    def _load(self, market_id: str) -> Optional[PriceSeries]:
+        if not self.directory:
+            return None
+        try:
+            with open(self._path(market_id), 'rb') as f:
+                raw = f.read()
+        except FileNotFoundError:
+            return None
+        
+        series = None
+        offset = 0
+        while offset + RECORD_HEADER.size <= len(raw):
+            timestamp, volume, n = RECORD_HEADER.unpack_from(raw, offset)
+            offset += RECORD_HEADER.size
+            if offset + 8 * n > len(raw):
+                break
+            prices = struct.unpack_from(f'<{n}d', raw, offset)
+            offset += 8 * n
+            if series is None:
+                series = PriceSeries(n)
+            series.append(timestamp, prices, volume)
+        return series
+    
+    def series(self, market_id: str) -> Optional[PriceSeries]:
+        """Get a market's series, loading it from disk on first access"""
+        series = self._series.get(market_id)
+        if series is None:
+            with self._lock:
+                series = self._series.get(market_id)
+                if series is None:
+                    series = self._load(market_id)
+                    if series is not None:
+                        self._series[market_id] = series
+        return series
+    
+    def record(self, market_id: str, prices: Sequence[float], volume: float = 0.0,
+               timestamp: Optional[float] = None) -> None:
+        """
+        Append a post-trade price vector for a market
+        
+        Args:
+            market_id: ID of the market
+            prices: Probability of each outcome (0-1), in outcome order
+            volume: Stake traded
+            timestamp: Unix time of the trade (defaults to now)
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        prices = [float(p) for p in prices]
+        
+        series = self.series(market_id)
+        if series is None:
+            with self._lock:
+                series = self._series.setdefault(market_id, PriceSeries(len(prices)))
+        with series.lock:
+            series.append(timestamp, prices, volume)
+            
+            if self.directory:
+                f = self._files.get(market_id)
+                if f is None:
+                    f = self._files[market_id] = open(self._path(market_id), 'ab')
+                f.write(RECORD_HEADER.pack(timestamp, volume, len(prices)) +
+                        struct.pack(f'<{len(prices)}d', *prices))
+                if self.flush_interval <= 0:
+                    f.flush()
+                self._written[market_id] = None
+    
+    def flush(self) -> None:
+        """Write buffered records to their files and close the handles idle since the last flush"""
+        for market_id in list(self._files):
+            series = self._series[market_id]
+            with series.lock:
+                if market_id in self._written:
+                    del self._written[market_id]
+                    self._files[market_id].flush()
+                else:
+                    self._files.pop(market_id).close()
+    
+    def close(self) -> None:
+        """Stop the flusher and close every open file"""
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join()
+            self._flusher = None
+        for market_id in list(self._files):
+            with self._series[market_id].lock:
+                self._files.pop(market_id).close()
+                self._written.pop(market_id, None)
+    
+    def _flush_loop(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+    
+    def candles(self, market_id: str, resolution: str = '1h', outcome_index: int = 0,
+                start: Optional[float] = None, end: Optional[float] = None) -> Dict[str, Any]:
+        """
+        OHLC candles for one outcome of a market
+        
+        Args:
+            market_id: ID of the market
+            resolution: One of RESOLUTIONS ('1m', '1h', '1d')
+            outcome_index: Position of the outcome
+            start: Earliest Unix time to include
+            end: Latest Unix time to include
+        
+        Raises:
+            ValueError: If the resolution is unknown
+        """
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"Unknown resolution {resolution}")
+        
+        series = self.series(market_id)
+        if series is None:
+            return {'t': [], 'open': [], 'high': [], 'low': [], 'close': [], 'volume': []}
+        with series.lock:
+            return series.candles(RESOLUTIONS[resolution], outcome_index, start, end)
@@ -0,0 +1,318 @@
+"""
+SAMSA - Query Index
+Cursor-paginated listing with filter, range and sort pushdown over a store
+"""
+
+import base64
+import gc
+import json
+import math
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sortedcontainers import SortedList
+
+# Position of a record in one ordering: (sort key, insertion sequence)
+Entry = Tuple[tuple, int]
+
+
+def _key(field_name: Optional[str], item: dict) -> tuple:
+    """
+    Sort key of a record for one field
+    
+    Missing values sort first; the leading flag keeps None from being
+    compared with real values. Insertion order (field None) has a constant
+    key so the sequence number decides.
+    """
+    if field_name is None:
+        return ()
+    value = item.get(field_name)
+    return (value is not None, value)
+
+
+class QueryIndex:
+    """
+    Ordered indexes over a ``JSONStore`` for paginated queries
+    
+    Keeps, as ``SortedList``s of (sort key, sequence) entries (O(log N)
+    inserts and removals, so a new prediction costs the same at any size):
+    
+    - one list per sortable field (plus insertion order),
+    - one bucket per value of each filterable field, ordered by the
+      default sort.
+    
+    A query picks the smallest bucket matching its equality filters. With
+    the default sort the bucket is walked as is. With another sort it is
+    re-sorted by that field when that is cheaper than walking the field's
+    full ordering and filtering (a selective filter). Otherwise the query
+    walks the sorted list of its sort field. It bisects to the cursor and to
+    the date range bounds when the range field is that ordering's key. It
+    then walks forward until the page is full, checking any remaining
+    filters on the records it visits. A page
+    therefore costs O(log N) plus the rows it visits, however large the
+    collection. Cursors encode the last (key, sequence) returned, so records
+    inserted between requests neither repeat nor shift later pages.
+    """
+    
+    def __init__(self, get: Callable[[str], Optional[dict]],
+                 filter_fields: Sequence[str] = (), sort_fields: Sequence[str] = (),
+                 default_sort: Optional[str] = None, range_field: Optional[str] = None):
+        """
+        Args:
+            get: Record lookup by ID (e.g. ``store.get``)
+            filter_fields: Fields accepted as equality filters
+            sort_fields: Fields results can be sorted by
+            default_sort: Sort used when none is given (None = insertion order)
+            range_field: Field the ``since`` / ``until`` bounds apply to
+        """
+        self.get = get
+        self.filter_fields = tuple(filter_fields)
+        self.default_sort = default_sort
+        self.sort_fields = tuple(dict.fromkeys((default_sort,) + tuple(sort_fields)))
+        self.range_field = range_field
+        
+        self._lock = threading.Lock()
+        self._next_seq = 0
+        self._seqs: Dict[str, int] = {}
+        self._ids: Dict[int, str] = {}
+        self._keys: Dict[Optional[str], Dict[str, tuple]] = {f: {} for f in self.sort_fields}
+        self._values: Dict[str, Dict[str, Any]] = {f: {} for f in self.filter_fields}
+        self._sorted: Dict[Optional[str], SortedList] = {f: SortedList() for f in self.sort_fields}
+        self._buckets: Dict[Tuple[str, Any], SortedList] = {}
+    
+    # --- Maintenance ---
+    
+    def rebuild(self, items: Iterable[dict]) -> None:
+        """Index a full collection from scratch, in its stored order"""
+        items = list(items)
+        ids = [item['id'] for item in items]
+        seqs = range(len(items))
+        # Millions of small key tuples would otherwise trigger repeated full
+        # collections while the lists are built
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            keys = {f: [_key(f, item) for item in items] for f in self.sort_fields}
+            values = {f: [item.get(f) for item in items] for f in self.filter_fields}
+            buckets: Dict[Tuple[str, Any], List[Entry]] = {}
+            default_keys = keys[self.default_sort]
+            for f in self.filter_fields:
+                for value, key, seq in zip(values[f], default_keys, seqs):
+                    bucket = buckets.get((f, value))
+                    if bucket is None:
+                        bucket = buckets[(f, value)] = []
+                    bucket.append((key, seq))
+            buckets = {bucket_key: SortedList(bucket) for bucket_key, bucket in buckets.items()}
+            
+            with self._lock:
+                self._next_seq = len(items)
+                self._seqs = dict(zip(ids, seqs))
+                self._ids = dict(zip(seqs, ids))
+                self._keys = {f: dict(zip(ids, keys[f])) for f in self.sort_fields}
+                self._values = {f: dict(zip(ids, values[f])) for f in self.filter_fields}
+                self._sorted = {f: SortedList(zip(keys[f], seqs)) for f in self.sort_fields}
+                self._buckets = buckets
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+    
+    def update(self, item_id: str, item: Optional[dict]) -> None:
+        """
+        Re-index one record (``JSONStore`` listener signature)
+        
+        Only the orderings whose key changed are touched, so a trade that
+        moves a market's volume re-sorts just the volume list.
+        """
+        with self._lock:
+            seq = self._seqs.get(item_id)
+            
+            if item is None:
+                if seq is None:
+                    return
+                default_key = self._keys[self.default_sort][item_id]
+                for f in self.sort_fields:
+                    self._sorted[f].discard((self._keys[f].pop(item_id), seq))
+                for f in self.filter_fields:
+                    self._remove_from_bucket((f, self._values[f].pop(item_id)), (default_key, seq))
+                del self._seqs[item_id], self._ids[seq]
+                return
+            
+            is_new = seq is None
+            if is_new:
+                seq = self._assign(item_id)
+            old_default = None if is_new else self._keys[self.default_sort][item_id]
+            new_default = _key(self.default_sort, item)
+            for f in self.sort_fields:
+                key = _key(f, item)
+                old = None if is_new else self._keys[f][item_id]
+                if is_new or old != key:
+                    if not is_new:
+                        self._sorted[f].discard((old, seq))
+                    self._sorted[f].add((key, seq))
+                    self._keys[f][item_id] = key
+            
+            for f in self.filter_fields:
+                value = item.get(f)
+                old = None if is_new else self._values[f][item_id]
+                if not is_new and old == value and old_default == new_default:
+                    continue
+                if not is_new:
+                    self._remove_from_bucket((f, old), (old_default, seq))
+                bucket = self._buckets.get((f, value))
+                if bucket is None:
+                    bucket = self._buckets[(f, value)] = SortedList()
+                bucket.add((new_default, seq))
+                self._values[f][item_id] = value
+    
+    @staticmethod
+    def _bucket_is_cheaper(bucket_size: int, total: int, limit: Optional[int]) -> bool:
+        """
+        Whether sorting a filter bucket beats walking the full ordering
+        
+        Sorting costs about b log b. Walking the ordering until ``limit``
+        matches are found visits about limit * N / b entries, or all N
+        without a limit.
+        """
+        if bucket_size == 0:
+            return True
+        walk = total if limit is None else min(total, limit * total / bucket_size)
+        return bucket_size * max(1.0, math.log2(bucket_size)) < walk
+    
+    def _assign(self, item_id: str) -> int:
+        seq = self._next_seq
+        self._next_seq += 1
+        self._seqs[item_id] = seq
+        self._ids[seq] = item_id
+        return seq
+    
+    def _remove_from_bucket(self, bucket_key: Tuple[str, Any], entry: Entry) -> None:
+        bucket = self._buckets.get(bucket_key)
+        if bucket is not None:
+            bucket.discard(entry)
+            if not bucket:
+                del self._buckets[bucket_key]
+    
+    # --- Queries ---
+    
+    def query(self, filters: Optional[Dict[str, Any]] = None, sort: Optional[str] = None,
+              descending: bool = False, since: Optional[str] = None, until: Optional[str] = None,
+              limit: Optional[int] = None, cursor: Optional[str] = None,
+              fields: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        """
+        Fetch one page of records
+        
+        Args:
+            filters: {field: value} equality filters (fields from ``filter_fields``)
+            sort: Sort field (defaults to ``default_sort``)
+            descending: Reverse the sort
+            since: Inclusive lower bound on ``range_field`` (ISO timestamps compare as text)
+            until: Inclusive upper bound on ``range_field``
+            limit: Page size (None = every match)
+            cursor: ``next_cursor`` of the previous page
+            fields: Keys to keep in each record (None = whole records)
+        
+        Returns:
+            Dict with ``items``, ``next_cursor`` (None on the last page) and ``has_more``
+        
+        Raises:
+            ValueError: On an unknown filter or sort field, or a cursor that
+                does not belong to this sort
+        """
+        filters = dict(filters or {})
+        for field_name in filters:
+            if field_name not in self.filter_fields:
+                raise ValueError(f"Cannot filter by '{field_name}'")
+        sort = sort or self.default_sort
+        if sort not in self.sort_fields:
+            raise ValueError(f"Cannot sort by '{sort}'")
+        if (since is not None or until is not None) and self.range_field is None:
+            raise ValueError("This collection has no date range field")
+        position = _decode_cursor(cursor, sort, descending) if cursor else None
+        
+        with self._lock:
+            entries = self._sorted[sort]
+            residual = dict(filters)
+            if filters:
+                buckets = [(self._buckets.get((f, v)) or SortedList(), f) for f, v in filters.items()]
+                bucket, used = min(buckets, key=lambda b: len(b[0]))
+                if sort == self.default_sort:
+                    # Walk the smallest matching bucket; it is already in sort order
+                    entries = bucket
+                    del residual[used]
+                elif self._bucket_is_cheaper(len(bucket), len(entries), limit):
+                    # Re-sort the bucket by the requested field rather than
+                    # scanning the whole ordering for its few members
+                    keys = self._keys[sort]
+                    entries = SortedList((keys[self._ids[seq]], seq) for _, seq in bucket)
+                    del residual[used]
+            
+            lo, hi = 0, len(entries)
+            range_pushed = self.range_field == sort
+            if range_pushed and (since is not None or until is not None):
+                # (True,) sorts after every missing value and before every present one
+                lo = entries.bisect_left(((True,) if since is None else (True, since), -1))
+                if until is not None:
+                    hi = entries.bisect_right(((True, until), float('inf')))
+            if position is not None:
+                try:
+                    if descending:
+                        hi = min(hi, entries.bisect_left(position))
+                    else:
+                        lo = max(lo, entries.bisect_right(position))
+                except TypeError:
+                    # A well-formed cursor whose key does not compare with this field's values
+                    raise ValueError("Invalid cursor")
+            
+            page: List[Tuple[dict, Entry]] = []
+            has_more = False
+            for entry in entries.islice(lo, hi, reverse=descending):
+                item = self.get(self._ids[entry[1]])
+                if item is None or not _matches(item, residual):
+                    continue
+                if not range_pushed and not _in_range(item.get(self.range_field) if self.range_field else None,
+                                                      since, until):
+                    continue
+                if limit is not None and len(page) == limit:
+                    has_more = True
+                    break
+                page.append((item, entry))
+        
+        items = [item for item, _ in page]
+        if fields:
+            items = [{k: item[k] for k in fields if k in item} for item in items]
+        return {
+            'items': items,
+            'next_cursor': _encode_cursor(sort, descending, page[-1][1]) if has_more else None,
+            'has_more': has_more
+        }
+
+
+def _matches(item: dict, filters: Dict[str, Any]) -> bool:
+    return all(item.get(f) == v for f, v in filters.items())
+
+
+def _in_range(value: Optional[str], since: Optional[str], until: Optional[str]) -> bool:
+    if since is None and until is None:
+        return True
+    if value is None:
+        return False
+    return (since is None or value >= since) and (until is None or value <= until)
+
+
+def _encode_cursor(sort: Optional[str], descending: bool, entry: Entry) -> str:
+    raw = json.dumps([sort, descending, list(entry[0]), entry[1]], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def _decode_cursor(cursor: str, sort: Optional[str], descending: bool) -> Entry:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        cursor_sort, cursor_descending, key, seq = json.loads(raw)
+        if not isinstance(key, list) or len(key) > 2 or type(seq) is not int:
+            raise ValueError("Invalid cursor")
+        position = (tuple(key), seq)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if cursor_sort != sort or cursor_descending != descending:
+        raise ValueError("Cursor belongs to a different sort order")
+    return position
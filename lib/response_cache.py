@@ -0,0 +1,94 @@
+"""
+SAMSA - Response Cache
+Pre-serialized, pre-compressed API responses keyed by data version
+"""
+
+import gzip
+import hashlib
+import json
+import threading
+import time
+from dataclasses import dataclass
+from email.utils import formatdate
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+@dataclass
+class CachedResponse:
+    """Serialized response body plus its validators"""
+    version: Hashable
+    body: bytes
+    gzip_body: Optional[bytes]
+    etag: str
+    last_modified: float
+    
+    @property
+    def last_modified_http(self) -> str:
+        """Last-Modified header value (RFC 7231 date)"""
+        return formatdate(self.last_modified, usegmt=True)
+
+
+class ResponseCache:
+    """
+    Holds the serialized bytes of expensive responses
+    
+    An entry is rebuilt only when the caller passes a different ``version``
+    (e.g. ``JSONStore.version``), so repeated polls of unchanged data cost a
+    dict lookup. Bodies of at least ``compress_min_size`` bytes are also
+    gzipped once at build time.
+    """
+    
+    def __init__(self, serializer: Callable[[Any], str] = None, compress_min_size: int = 1024):
+        """
+        Initialize the cache
+        
+        Args:
+            serializer: Function turning data into a JSON string (defaults to compact json.dumps)
+            compress_min_size: Smallest body worth gzipping, in bytes
+        """
+        self.serializer = serializer or (lambda data: json.dumps(data, separators=(',', ':')))
+        self.compress_min_size = compress_min_size
+        self._entries: Dict[Hashable, CachedResponse] = {}
+        self._lock = threading.Lock()
+    
+    def get(self, key: Hashable, version: Hashable, render: Callable[[], Any]) -> CachedResponse:
+        """
+        Get the cached response for ``key``, rebuilding it if ``version`` moved
+        
+        Args:
+            key: Cache key (e.g. the route name)
+            version: Version of the underlying data
+            render: Produces the data to serialize on a miss
+            
+        Returns:
+            The current CachedResponse
+        """
+        entry = self._entries.get(key)
+        if entry is not None and entry.version == version:
+            return entry
+        
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.version == version:
+                return entry
+            
+            body = self.serializer(render()).encode('utf-8')
+            etag = '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+            if entry is not None and entry.etag == etag:
+                # Same bytes under a new version: keep the original timestamp
+                last_modified = entry.last_modified
+            else:
+                last_modified = time.time()
+            gzip_body = gzip.compress(body, compresslevel=6) if len(body) >= self.compress_min_size else None
+            
+            entry = CachedResponse(version, body, gzip_body, etag, last_modified)
+            self._entries[key] = entry
+            return entry
+    
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """Drop one entry, or every entry if ``key`` is None"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
@@ -0,0 +1,335 @@
+"""
+SAMSA - Risk Engine
+Monte Carlo simulation of platform P&L across all open markets
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+# Elements (scenarios x markets) drawn per simulation chunk
+CHUNK_ELEMENTS = 4_000_000
+
+
+def norm_cdf(z: np.ndarray) -> np.ndarray:
+    """
+    Standard normal CDF using the Abramowitz-Stegun 7.1.26 erf approximation
+    
+    Absolute error is below 1.5e-7, far finer than the Monte Carlo noise,
+    and it keeps the engine free of a SciPy dependency.
+    """
+    x = np.abs(z) / np.sqrt(2.0)
+    t = 1.0 / (1.0 + 0.3275911 * x)
+    poly = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429))))
+    erf = 1.0 - poly * np.exp(-x * x)
+    return 0.5 * (1.0 + np.sign(z) * erf)
+
+
+def norm_ppf(p: np.ndarray) -> np.ndarray:
+    """Inverse of ``norm_cdf`` by bisection (meant for small threshold arrays)"""
+    p = np.asarray(p, dtype=float)
+    lo = np.full(p.shape, -10.0)
+    hi = np.full(p.shape, 10.0)
+    for _ in range(60):
+        mid = (lo + hi) / 2
+        below = norm_cdf(mid) < p
+        lo = np.where(below, mid, lo)
+        hi = np.where(below, hi, mid)
+    z = (lo + hi) / 2
+    return np.where(p >= 1, np.inf, np.where(p <= 0, -np.inf, z))
+
+
+class RiskEngine:
+    """
+    Platform exposure to the resolution of every open market
+    
+    Under the rebated-loss model a prediction with stake ``s`` taken at
+    probability ``p`` puts ``a = s * (1 - p)`` at risk. If it wins the platform
+    pays out ``a * (1 - fee)`` on top of the stake. If it loses the platform
+    keeps ``a`` and refunds the rest. Platform P&L therefore depends only on
+    which outcome wins each market. ``load`` folds all active predictions
+    into two (markets x outcomes) tables with ``np.add.at``:
+    
+    - ``pnl_if[m, k]``: platform P&L on market m if outcome k wins
+    - ``fees_if[m, k]``: fee revenue on market m if outcome k wins
+    
+    A scenario is then just one winning outcome per market, and its P&L is
+    a gather from ``pnl_if``. Scenarios are simulated in chunks, so millions
+    of them need no per-prediction work at all.
+    """
+    
+    def __init__(self, fee: float = 0.01):
+        """
+        Args:
+            fee: Platform fee charged on winning profit
+        """
+        self.fee = fee
+        self.market_ids: List[str] = []
+        self.outcome_ids: List[List[str]] = []
+        self.probabilities = np.zeros((0, 0))
+        self.pnl_if = np.zeros((0, 0))
+        self.fees_if = np.zeros((0, 0))
+        self.stakes = np.zeros(0)
+        self.counts = np.zeros(0, dtype=np.int64)
+    
+    def load(self, markets: Sequence[dict], probabilities: Sequence[Sequence[float]],
+             predictions: Iterable[dict]) -> int:
+        """
+        Build the exposure tables
+        
+        Args:
+            markets: Open markets (each with an ``outcomes`` list)
+            probabilities: Current outcome probabilities per market, in the
+                market's outcome order (normalized here)
+            predictions: Active predictions; ones on other markets or
+                unknown outcomes are ignored
+        
+        Returns:
+            Number of predictions loaded
+        """
+        n_markets = len(markets)
+        width = max((len(m['outcomes']) for m in markets), default=0)
+        self.market_ids = [m['id'] for m in markets]
+        self.outcome_ids = [[o['id'] for o in m['outcomes']] for m in markets]
+        market_pos = {market_id: i for i, market_id in enumerate(self.market_ids)}
+        outcome_pos = [{outcome_id: k for k, outcome_id in enumerate(ids)} for ids in self.outcome_ids]
+        
+        # Outcome probabilities padded with zeros for markets with fewer outcomes
+        self.probabilities = np.zeros((n_markets, width))
+        for i, p in enumerate(probabilities):
+            p = np.clip(np.asarray(p, dtype=float), 0, None)
+            total = p.sum()
+            self.probabilities[i, :len(p)] = p / total if total > 0 else 1.0 / len(p)
+        
+        rows, cols, stakes, odds = [], [], [], []
+        for prediction in predictions:
+            i = market_pos.get(prediction.get('market_id'))
+            if i is None:
+                continue
+            k = outcome_pos[i].get(prediction.get('outcome_id'))
+            if k is None:
+                continue
+            rows.append(i)
+            cols.append(k)
+            stakes.append(prediction.get('stake_amount') or 0)
+            odds.append(prediction.get('odds_at_prediction') or 0)
+        
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+        stake = np.asarray(stakes, dtype=float)
+        p = np.asarray(odds, dtype=float)
+        p = np.where(p > 1, p / 100, p)
+        at_risk = stake * (1 - p)
+        
+        # Every prediction on the market pays the platform `at_risk` unless it
+        # wins, in which case the platform pays `at_risk * (1 - fee)` instead
+        kept = np.zeros(n_markets)
+        np.add.at(kept, rows, at_risk)
+        on_outcome = np.zeros((n_markets, width))
+        np.add.at(on_outcome, (rows, cols), at_risk)
+        self.pnl_if = kept[:, None] - on_outcome * (2 - self.fee)
+        self.fees_if = on_outcome * self.fee
+        
+        self.stakes = np.zeros(n_markets)
+        np.add.at(self.stakes, rows, stake)
+        self.counts = np.bincount(rows, minlength=n_markets)
+        return len(rows)
+    
+    # --- Closed-form moments ---
+    
+    def expected(self) -> Dict[str, float]:
+        """Exact expected P&L and fee revenue under independent resolutions"""
+        return {
+            'expected_pnl': float((self.probabilities * self.pnl_if).sum()),
+            'expected_fee_revenue': float((self.probabilities * self.fees_if).sum()),
+            'worst_case_pnl': float(self.pnl_if_min().sum()),
+            'best_case_pnl': float(np.where(self._valid(), self.pnl_if, -np.inf).max(axis=1).sum()) if self.market_ids else 0.0
+        }
+    
+    def pnl_if_min(self) -> np.ndarray:
+        """Each market's P&L under its worst outcome for the platform"""
+        if not len(self.market_ids):
+            return np.zeros(0)
+        return np.where(self._valid(), self.pnl_if, np.inf).min(axis=1)
+    
+    def _valid(self, columns: Optional[int] = None, trim: int = 0) -> np.ndarray:
+        """Mask of real (non-padding) outcome columns, optionally dropping each market's last ``trim``"""
+        widths = np.array([len(ids) for ids in self.outcome_ids])
+        columns = self.pnl_if.shape[1] if columns is None else columns
+        return np.arange(columns)[None, :] < (widths - trim)[:, None]
+    
+    # --- Simulation ---
+    
+    def _draw_latents(self, rng: np.random.Generator, n: int, correlation: float,
+                      group_index: Optional[np.ndarray], cholesky: Optional[np.ndarray]) -> np.ndarray:
+        """
+        Latent draws (n x markets) for one chunk
+        
+        Draws are float32, ample for sampling. Independent markets draw
+        uniforms. Correlated markets draw standard
+        normals tied by a Gaussian copula; instead of mapping every draw
+        through the normal CDF, the caller compares them against thresholds
+        mapped once through its inverse.
+        """
+        n_markets = len(self.market_ids)
+        if cholesky is not None:
+            return rng.standard_normal((n, n_markets), dtype=np.float32) @ cholesky.T.astype(np.float32)
+        if correlation <= 0:
+            return rng.random((n, n_markets), dtype=np.float32)
+        
+        # One-factor model: markets in the same group share a common shock
+        groups = group_index if group_index is not None else np.zeros(n_markets, dtype=np.int64)
+        factors = rng.standard_normal((n, int(groups.max()) + 1), dtype=np.float32)
+        latents = rng.standard_normal((n, n_markets), dtype=np.float32)
+        latents *= np.float32(np.sqrt(1 - correlation))
+        latents += np.float32(np.sqrt(correlation)) * factors[:, groups]
+        return latents
+    
+    def simulate(self, n_scenarios: int = 1_000_000, correlation: float = 0.0,
+                 groups: Optional[Sequence[Any]] = None, correlation_matrix: Optional[np.ndarray] = None,
+                 confidence: Sequence[float] = (0.95, 0.99), seed: Optional[int] = None,
+                 top: int = 20) -> Dict[str, Any]:
+        """
+        Simulate market resolutions and summarize the platform P&L distribution
+        
+        Winners are drawn from each market's current probabilities. With
+        ``correlation`` > 0, markets sharing a ``groups`` label (all markets
+        if omitted) are tied together by a one-factor Gaussian copula.
+        ``correlation_matrix`` instead gives a full market-by-market latent
+        correlation. Either way, outcomes earlier in a market's outcome list
+        (e.g. "yes") tend to win together.
+        
+        Args:
+            n_scenarios: Number of simulated scenarios
+            correlation: Latent correlation within a group (0 = independent)
+            groups: Group label per market (e.g. category) for ``correlation``
+            correlation_matrix: Optional (markets x markets) correlation matrix
+            confidence: Levels to report VaR / CVaR at
+            seed: RNG seed for reproducible runs
+            top: Markets to include in the exposure breakdown
+        
+        Returns:
+            Summary with expected/simulated P&L, tail risk and per-market exposure
+        
+        Raises:
+            ValueError: If the correlation settings are invalid
+        """
+        if not 0 <= correlation < 1:
+            raise ValueError("correlation must be in [0, 1)")
+        n_markets = len(self.market_ids)
+        if n_scenarios <= 0 or n_markets == 0:
+            return {'scenarios': 0, 'markets': n_markets, **self.expected(), 'var': {}, 'exposure': []}
+        
+        # Simulation columns are ordered by outcome count, widest first
+        widths = np.array([len(ids) for ids in self.outcome_ids])
+        order = np.argsort(-widths, kind='stable')
+        
+        cholesky = None
+        if correlation_matrix is not None:
+            matrix = np.asarray(correlation_matrix, dtype=float)
+            if matrix.shape != (n_markets, n_markets):
+                raise ValueError("correlation_matrix must be markets x markets")
+            try:
+                cholesky = np.linalg.cholesky(matrix[np.ix_(order, order)])
+            except np.linalg.LinAlgError:
+                raise ValueError("correlation_matrix must be positive definite")
+        
+        group_index = None
+        if groups is not None:
+            _, group_index = np.unique(np.asarray([str(g) for g in groups]), return_inverse=True)
+            group_index = group_index[order]
+        
+        # Inverse-CDF sampling: the winner of market m is the number of its
+        # cumulative-probability thresholds below the uniform draw. With the
+        # widest markets first, each threshold pass only touches a leading
+        # slice of the columns; binary markets need a single comparison.
+        width = self.pnl_if.shape[1]
+        cdf = np.cumsum(self.probabilities[order], axis=1)
+        if cholesky is not None or correlation > 0:
+            cdf = norm_ppf(cdf)
+        passes = [(k, int((widths[order] > k + 1).sum())) for k in range(width - 1)]
+        offsets = order * width
+        pnl_flat = self.pnl_if.ravel()
+        
+        chunk = max(1, CHUNK_ELEMENTS // n_markets)
+        base_seed = seed if seed is not None else int(np.random.SeedSequence().entropy % (2 ** 63))
+        
+        # The worst (1 - tail level) share of scenarios is tracked with their
+        # winners so the tail can be attributed to markets without a second pass
+        levels = sorted(confidence)
+        tail_level = levels[-1]
+        n_tail = max(1, int(np.ceil(n_scenarios * (1 - tail_level))))
+        tail_totals = np.empty(0)
+        tail_winners = np.empty((0, n_markets), dtype=np.int16)
+        totals = np.empty(n_scenarios)
+        
+        for c, start in enumerate(range(0, n_scenarios, chunk)):
+            n = min(chunk, n_scenarios - start)
+            rng = np.random.default_rng([base_seed, c])
+            latents = self._draw_latents(rng, n, correlation, group_index, cholesky)
+            winners = np.zeros((n, n_markets), dtype=np.int16)
+            for k, count in passes:
+                winners[:, :count] += latents[:, :count] > cdf[:count, k]
+            chunk_totals = pnl_flat.take(winners + offsets).sum(axis=1)
+            totals[start:start + n] = chunk_totals
+            
+            candidates = np.concatenate((tail_totals, chunk_totals))
+            worst = np.argpartition(candidates, n_tail - 1)[:n_tail] if len(candidates) > n_tail else np.arange(len(candidates))
+            tail_totals = candidates[worst]
+            tail_winners = np.concatenate((tail_winners, winners))[worst]
+        
+        # Value at risk: the loss exceeded in only (1 - level) of scenarios;
+        # CVaR is the mean loss beyond it (both negative when even the tail is a profit)
+        ordered = np.sort(totals)
+        var = {}
+        for level in levels:
+            k = max(1, int(np.ceil(n_scenarios * (1 - level))))
+            var[f'{level:g}'] = {
+                'pnl_quantile': round(float(ordered[k - 1]), 2),
+                'var': round(-float(ordered[k - 1]), 2),
+                'cvar': round(-float(ordered[:k].mean()), 2)
+            }
+        
+        # Per-market P&L averaged over the tail scenarios (back in market order)
+        tail_contribution = np.empty(n_markets)
+        tail_contribution[order] = pnl_flat.take(tail_winners + offsets).mean(axis=0)
+        
+        # Marginal moments are exact: the copula changes only how markets co-move
+        mean = (self.probabilities * self.pnl_if).sum(axis=1)
+        std = np.sqrt(np.maximum((self.probabilities * self.pnl_if ** 2).sum(axis=1) - mean ** 2, 0))
+        worst = self.pnl_if_min()
+        ranked = np.argsort(worst, kind='stable')[:top]
+        exposure = [{
+            'market_id': self.market_ids[i],
+            'predictions': int(self.counts[i]),
+            'total_stake': round(float(self.stakes[i]), 2),
+            'expected_pnl': round(float(mean[i]), 2),
+            'pnl_std': round(float(std[i]), 2),
+            'worst_case_pnl': round(float(worst[i]), 2),
+            'worst_case_outcome': self.outcome_ids[i][int(np.argmin(np.where(self._valid()[i], self.pnl_if[i], np.inf)))],
+            'tail_pnl': round(float(tail_contribution[i]), 2),
+            'pnl_if': {outcome_id: round(float(self.pnl_if[i, k]), 2) for k, outcome_id in enumerate(self.outcome_ids[i])}
+        } for i in ranked]
+        
+        expected = self.expected()
+        return {
+            'scenarios': n_scenarios,
+            'markets': n_markets,
+            'predictions': int(self.counts.sum()),
+            'correlation': correlation if cholesky is None else 'matrix',
+            'seed': base_seed,
+            'expected_pnl': round(expected['expected_pnl'], 2),
+            'expected_fee_revenue': round(expected['expected_fee_revenue'], 2),
+            'worst_case_pnl': round(expected['worst_case_pnl'], 2),
+            'best_case_pnl': round(expected['best_case_pnl'], 2),
+            'simulated': {
+                'mean_pnl': round(float(totals.mean()), 2),
+                'std_pnl': round(float(totals.std()), 2),
+                'min_pnl': round(float(totals.min()), 2),
+                'max_pnl': round(float(totals.max()), 2),
+                'probability_of_loss': round(float((totals < 0).mean()), 6)
+            },
+            'var': var,
+            'tail_level': tail_level,
+            'exposure': exposure
+        }
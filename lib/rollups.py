@@ -0,0 +1,197 @@
+"""
+SAMSA - Stats Rollups
+Pre-aggregated market statistics per league and per category
+"""
+
+import re
+import threading
+from collections import Counter
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
+
+Group = Tuple[str, str]
+
+
+def league_slug(name: str) -> str:
+    """League ID for a league name ('Premier League' -> 'premier_league', as the frontend builds it)"""
+    return re.sub(r'\s+', '_', name).lower()
+
+
+def market_groups(market: dict) -> Tuple[Group, ...]:
+    """Rollup groups a market counts towards"""
+    groups = []
+    if market.get('category'):
+        groups.append(('category', market['category']))
+    league = market.get('league_id') or (league_slug(market['league']) if market.get('league') else None)
+    if league:
+        groups.append(('league', league))
+    return tuple(groups)
+
+
+class _MarketEntry(NamedTuple):
+    """What a market currently contributes to its groups"""
+    groups: Tuple[Group, ...]
+    active: bool
+    volume: float
+
+
+class _Totals:
+    """Aggregates of one group (or of one market's predictions)"""
+    
+    __slots__ = ('active_markets', 'volume', 'predictions', 'traders')
+    
+    def __init__(self):
+        self.active_markets = 0
+        self.volume = 0.0
+        self.predictions = 0
+        self.traders: Counter = Counter()
+
+
+class StatsRollup:
+    """
+    League and category statistics maintained as markets and predictions change
+    
+    Counts only active markets, as ``/api/leagues/:leagueId/stats`` in
+    server.js does. Each group keeps:
+    
+    - active_markets and total_volume of its active markets,
+    - predictions placed on those markets,
+    - unique_traders, from a per-user prediction count so that a trader
+      disappears once their last counted prediction does.
+    
+    Each market's own prediction count and trader counts are kept too. A
+    market that resolves (or moves group) subtracts them from its groups
+    instead of the group being recounted. A trade touches a constant number
+    of counters and a read is a dict lookup, so stats for every league can
+    be served on each page load.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._groups: Dict[Group, _Totals] = {}
+        self._markets: Dict[str, _MarketEntry] = {}
+        self._market_predictions: Dict[str, _Totals] = {}
+        self._predictions: Dict[str, Tuple[str, Optional[str]]] = {}
+    
+    def rebuild(self, markets: Iterable[dict], predictions: Iterable[dict]) -> None:
+        """Aggregate a full catalog and prediction log from scratch"""
+        with self._lock:
+            self._groups = {}
+            self._markets = {}
+            self._market_predictions = {}
+            self._predictions = {}
+            for prediction in predictions:
+                self._add_prediction(prediction)
+            for market in markets:
+                self._set_market(market['id'], market)
+    
+    # --- Store listeners ---
+    
+    def update_market(self, market_id: str, market: Optional[dict]) -> None:
+        """Re-aggregate one market (``JSONStore`` listener signature)"""
+        with self._lock:
+            self._set_market(market_id, market)
+    
+    def update_prediction(self, prediction_id: str, prediction: Optional[dict]) -> None:
+        """Count a new or deleted prediction (``JSONStore`` listener signature)"""
+        with self._lock:
+            if prediction is None:
+                self._remove_prediction(prediction_id)
+            elif prediction_id not in self._predictions:
+                self._add_prediction(prediction)
+    
+    # --- Reads ---
+    
+    def stats(self, kind: str, key: str) -> Dict[str, float]:
+        """
+        Aggregates of one group
+        
+        Args:
+            kind: 'league' or 'category'
+            key: League ID or category name
+        
+        Returns:
+            active_markets, total_volume, predictions and unique_traders
+            (all zero for a group without markets)
+        """
+        with self._lock:
+            totals = self._groups.get((kind, key)) or _Totals()
+            return {
+                'active_markets': totals.active_markets,
+                'total_volume': round(totals.volume, 2),
+                'predictions': totals.predictions,
+                'unique_traders': len(totals.traders)
+            }
+    
+    # --- Internals (caller holds the lock) ---
+    
+    def _set_market(self, market_id: str, market: Optional[dict]) -> None:
+        previous = self._markets.pop(market_id, None)
+        entry = None
+        if market is not None:
+            entry = _MarketEntry(market_groups(market), market.get('status') == 'active',
+                                 float(market.get('total_volume') or 0))
+            self._markets[market_id] = entry
+        if previous == entry:
+            return
+        if (previous is not None and entry is not None and previous.active and entry.active
+                and previous.groups == entry.groups):
+            # A trade only moves volume; leave the trader counts alone
+            for group in entry.groups:
+                self._groups[group].volume += entry.volume - previous.volume
+            return
+        if previous is not None and previous.active:
+            self._apply_market(market_id, previous, -1)
+        if entry is not None and entry.active:
+            self._apply_market(market_id, entry, 1)
+    
+    def _apply_market(self, market_id: str, entry: _MarketEntry, sign: int) -> None:
+        own = self._market_predictions.get(market_id)
+        for group in entry.groups:
+            totals = self._groups.get(group)
+            if totals is None:
+                totals = self._groups[group] = _Totals()
+            totals.active_markets += sign
+            totals.volume += sign * entry.volume
+            if own is not None:
+                totals.predictions += sign * own.predictions
+                if sign > 0:
+                    totals.traders.update(own.traders)
+                else:
+                    totals.traders.subtract(own.traders)
+                    totals.traders += Counter()
+            if totals.active_markets <= 0 and not totals.traders:
+                del self._groups[group]
+    
+    def _add_prediction(self, prediction: dict) -> None:
+        market_id = prediction.get('market_id')
+        if not market_id:
+            return
+        user_id = prediction.get('user_id')
+        self._predictions[prediction['id']] = (market_id, user_id)
+        self._count_prediction(market_id, user_id, 1)
+    
+    def _remove_prediction(self, prediction_id: str) -> None:
+        counted = self._predictions.pop(prediction_id, None)
+        if counted is not None:
+            self._count_prediction(counted[0], counted[1], -1)
+    
+    def _count_prediction(self, market_id: str, user_id: Optional[str], sign: int) -> None:
+        own = self._market_predictions.get(market_id)
+        if own is None:
+            own = self._market_predictions[market_id] = _Totals()
+        own.predictions += sign
+        if user_id:
+            own.traders[user_id] += sign
+            if own.traders[user_id] <= 0:
+                del own.traders[user_id]
+        
+        entry = self._markets.get(market_id)
+        if entry is None or not entry.active:
+            return
+        for group in entry.groups:
+            totals = self._groups[group]
+            totals.predictions += sign
+            if user_id:
+                totals.traders[user_id] += sign
+                if totals.traders[user_id] <= 0:
+                    del totals.traders[user_id]
@@ -0,0 +1,171 @@
+"""
+SAMSA - Market Search
+In-process inverted index over market titles, descriptions and keywords
+"""
+
+import bisect
+import heapq
+import re
+import threading
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+# Relevance weight of a term occurring in each field
+FIELD_WEIGHTS = {
+    'title': 3.0,
+    'search_keywords': 2.0,
+    'description': 1.0
+}
+
+# Prefix matches count for less than exact term matches
+PREFIX_WEIGHT = 0.5
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Split text into lowercase alphanumeric terms"""
+    return TOKEN_RE.findall(text.lower()) if text else []
+
+
+class SearchIndex:
+    """
+    Inverted index for market search
+    
+    Each term maps to a posting dict of ``market_id -> weight``. A sorted
+    vocabulary list lets query terms match by prefix via bisection, so
+    "bitc" finds "bitcoin". Documents are re-indexed only when their
+    searchable text changes, so trade updates cost a tuple comparison.
+    Each market's status and category are kept alongside, so filtered
+    searches never look the records up in the store.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings: Dict[str, Dict[str, float]] = {}
+        self._terms: List[str] = []
+        self._doc_terms: Dict[str, Set[str]] = {}
+        self._doc_text: Dict[str, Tuple[Optional[str], ...]] = {}
+        self._doc_meta: Dict[str, Tuple[Optional[str], str]] = {}
+    
+    def rebuild(self, markets: List[dict]) -> None:
+        """Index a full catalog from scratch"""
+        with self._lock:
+            self._postings = {}
+            self._terms = []
+            self._doc_terms = {}
+            self._doc_text = {}
+            self._doc_meta = {}
+            for market in markets:
+                self._add(market, keep_sorted=False)
+            self._terms = sorted(self._postings)
+    
+    def update(self, market_id: str, market: Optional[dict]) -> None:
+        """
+        Re-index one market (``JSONStore`` listener signature)
+        
+        Args:
+            market_id: ID of the changed market
+            market: Current record, or None if it was deleted
+        """
+        text = tuple(market.get(f) for f in FIELD_WEIGHTS) if market is not None else None
+        if text is not None and self._doc_text.get(market_id) == text:
+            meta = _meta(market)
+            if self._doc_meta.get(market_id) != meta:
+                with self._lock:
+                    self._doc_meta[market_id] = meta
+            return
+        
+        with self._lock:
+            self._remove(market_id)
+            if market is not None:
+                self._add(market)
+    
+    def _add(self, market: dict, keep_sorted: bool = True) -> None:
+        market_id = market['id']
+        weights: Dict[str, float] = {}
+        for field_name, weight in FIELD_WEIGHTS.items():
+            for term in tokenize(market.get(field_name)):
+                weights[term] = weights.get(term, 0.0) + weight
+        
+        for term, weight in weights.items():
+            posting = self._postings.get(term)
+            if posting is None:
+                posting = self._postings[term] = {}
+                if keep_sorted:
+                    bisect.insort(self._terms, term)
+            posting[market_id] = weight
+        
+        self._doc_terms[market_id] = set(weights)
+        self._doc_text[market_id] = tuple(market.get(f) for f in FIELD_WEIGHTS)
+        self._doc_meta[market_id] = _meta(market)
+    
+    def _remove(self, market_id: str) -> None:
+        self._doc_text.pop(market_id, None)
+        self._doc_meta.pop(market_id, None)
+        for term in self._doc_terms.pop(market_id, ()):
+            posting = self._postings[term]
+            posting.pop(market_id, None)
+            if not posting:
+                del self._postings[term]
+                i = bisect.bisect_left(self._terms, term)
+                del self._terms[i]
+    
+    def search(self, query: str, limit: int = 20, max_expansions: int = 50,
+               status: Optional[str] = None, category: Optional[str] = None,
+               accept: Optional[Callable[[str], bool]] = None) -> List[Tuple[str, float]]:
+        """
+        Find markets matching every term of ``query``
+        
+        Only the ``limit`` best accepted matches are ranked, so a broad query
+        costs a heap selection rather than a sort of every match.
+        
+        Args:
+            query: Free-text query
+            limit: Maximum number of results
+            max_expansions: Vocabulary terms a query term may expand to by prefix
+            status: Only markets with this status
+            category: Only markets in this category (case-insensitive)
+            accept: Optional extra predicate on market IDs
+        
+        Returns:
+            List of (market_id, score), best first
+        """
+        terms = tokenize(query)
+        if not terms:
+            return []
+        
+        with self._lock:
+            scores: Optional[Dict[str, float]] = None
+            for term in terms:
+                term_scores: Dict[str, float] = {}
+                i = bisect.bisect_left(self._terms, term)
+                for vocab in self._terms[i:i + max_expansions]:
+                    if not vocab.startswith(term):
+                        break
+                    factor = 1.0 if vocab == term else PREFIX_WEIGHT
+                    for market_id, weight in self._postings[vocab].items():
+                        term_scores[market_id] = max(term_scores.get(market_id, 0.0), weight * factor)
+                
+                if scores is None:
+                    scores = term_scores
+                else:
+                    scores = {m: s + term_scores[m] for m, s in scores.items() if m in term_scores}
+                if not scores:
+                    return []
+            
+            if status or category:
+                category = category.lower() if category else None
+                meta = self._doc_meta
+                scores = {m: s for m, s in scores.items()
+                          if (not status or meta[m][0] == status)
+                          and (not category or meta[m][1] == category)}
+        
+        matches = scores.items()
+        if accept is not None:
+            matches = [item for item in matches if accept(item[0])]
+        return heapq.nsmallest(limit, matches, key=lambda item: (-item[1], item[0]))
+
+
+def _meta(market: dict) -> Tuple[Optional[str], str]:
+    """Filterable fields of a market: (status, lowercased category)"""
+    return market.get('status'), (market.get('category') or '').lower()
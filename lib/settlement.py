@@ -0,0 +1,95 @@
+"""
+SAMSA - Settlement Engine
+Bulk settlement of a resolved market's predictions
+"""
+
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+
+from .datastore import JSONStore
+from .lmsr import LMSR
+from .metrics import metrics
+
+
+@metrics.timed('samsa_lmsr_seconds', 'settle_market')
+def settle_market(predictions: JSONStore, market_id: str, winning_outcome_id: str,
+                  fee: float = 0.01, chunk_size: int = 5000,
+                  progress: Optional[Callable[[int, int], None]] = None) -> Dict[str, Any]:
+    """
+    Settle every prediction on a market in vectorized chunks
+    
+    Only the market's own rows are read (through the store's ``market_id``
+    index) and only those rows are written back. Each chunk is priced with
+    one ``LMSR.settle_trades_batch`` call and committed with one
+    ``update_many``.
+    
+    Args:
+        predictions: Prediction store indexed on ``market_id``
+        market_id: ID of the resolved market
+        winning_outcome_id: ID of the winning outcome
+        fee: Platform fee
+        chunk_size: Predictions settled per batch
+        progress: Optional callback(settled, total) invoked after each chunk
+        
+    Returns:
+        Summary with counts and payout/revenue totals
+    """
+    rows = predictions.find_by('market_id', market_id)
+    total = len(rows)
+    summary = {
+        'settled': 0,
+        'won': 0,
+        'lost': 0,
+        'total_stake': 0.0,
+        'total_payout': 0.0,
+        'platform_revenue': 0.0
+    }
+    
+    for start in range(0, total, chunk_size):
+        chunk = rows[start:start + chunk_size]
+        stakes = np.fromiter((p['stake_amount'] for p in chunk), dtype=float, count=len(chunk))
+        odds = np.fromiter((p['odds_at_prediction'] for p in chunk), dtype=float, count=len(chunk))
+        won = np.fromiter((p['outcome_id'] == winning_outcome_id for p in chunk), dtype=bool, count=len(chunk))
+        
+        result = LMSR.settle_trades_batch(stakes, odds, won, fee)
+        user_net = result['user_net'].tolist()
+        total_return = result['total_return'].tolist()
+        platform_revenue = result['platform_revenue'].tolist()
+        
+        updates = {}
+        for i, p in enumerate(chunk):
+            if won[i]:
+                settlement = {
+                    'outcome': 'WIN',
+                    'user_net': user_net[i],
+                    'total_return': total_return[i],
+                    'platform_revenue': platform_revenue[i]
+                }
+            else:
+                settlement = {
+                    'outcome': 'LOSE',
+                    'user_net': user_net[i],
+                    'refund': total_return[i],
+                    'total_return': total_return[i],
+                    'platform_revenue': 0
+                }
+            updates[p['id']] = {
+                'status': 'won' if won[i] else 'lost',
+                'actual_return': total_return[i],
+                'settlement': settlement
+            }
+        predictions.update_many(updates)
+        
+        n_won = int(won.sum())
+        summary['settled'] += len(chunk)
+        summary['won'] += n_won
+        summary['lost'] += len(chunk) - n_won
+        summary['total_stake'] += float(stakes.sum())
+        summary['total_payout'] += float(result['total_return'].sum())
+        summary['platform_revenue'] += float(result['platform_revenue'].sum())
+        
+        if progress is not None:
+            progress(summary['settled'], total)
+    
+    return summary
@@ -0,0 +1,344 @@
+"""
+SAMSA - SQLite Storage Backend
+Markets, outcomes, predictions, users and transactions in one SQLite database
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .datastore import JSONStore
+from .metrics import metrics
+
+# Collection -> columns promoted out of the JSON document so they can be indexed
+COLLECTIONS: Dict[str, Tuple[str, ...]] = {
+    'markets': ('status', 'category'),
+    'predictions': ('market_id', 'user_id', 'status'),
+    'transactions': ('user_id', 'type'),
+    'users': ()
+}
+
+# IDs bound per IN (...) query, under SQLite's default limit of 999 variables
+MAX_VARIABLES = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS markets (
+    id TEXT PRIMARY KEY,
+    status TEXT,
+    category TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_markets_status ON markets (status);
+CREATE INDEX IF NOT EXISTS idx_markets_category ON markets (category);
+
+CREATE TABLE IF NOT EXISTS outcomes (
+    market_id TEXT NOT NULL,
+    outcome_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (market_id, outcome_id)
+);
+
+CREATE TABLE IF NOT EXISTS predictions (
+    id TEXT PRIMARY KEY,
+    market_id TEXT,
+    user_id TEXT,
+    status TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_predictions_market_id ON predictions (market_id);
+CREATE INDEX IF NOT EXISTS idx_predictions_user_id ON predictions (user_id);
+
+CREATE TABLE IF NOT EXISTS transactions (
+    id TEXT PRIMARY KEY,
+    user_id TEXT,
+    type TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_transactions_user_id ON transactions (user_id);
+
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+"""
+
+
+def _dumps(item: Any) -> str:
+    return json.dumps(item, ensure_ascii=False, separators=(',', ':'))
+
+
+class SQLiteBackend:
+    """
+    SQLite database holding every collection
+    
+    Offers the same operations as the ``lib.datastore`` JSON helpers
+    (read / write / append / update / delete / find), keyed by collection
+    name instead of file path. Every record is one row keyed by ``id``, so
+    lookups, updates and deletes touch a single indexed row instead of
+    rewriting a file. Market outcomes live in their own table keyed by
+    (market_id, outcome_id).
+    
+    The database runs in WAL mode with ``synchronous=NORMAL``. Commits
+    append to the write-ahead log without blocking readers. All statements
+    are fixed parameterized SQL, so sqlite3's statement cache prepares each
+    one once per connection.
+    """
+    
+    def __init__(self, db_path: str):
+        """
+        Open (and create if needed) the database
+        
+        Args:
+            db_path: Path to the SQLite file
+        """
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None,
+                                     cached_statements=256)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+        self.closed = False
+    
+    # --- Row encoding ---
+    
+    def _columns(self, collection: str) -> Tuple[str, ...]:
+        if collection not in COLLECTIONS:
+            raise ValueError(f"Unknown collection: {collection}")
+        return COLLECTIONS[collection]
+    
+    def _upsert(self, collection: str, items: Iterable[dict]) -> None:
+        """Insert or replace rows (caller holds the lock and a transaction)"""
+        columns = self._columns(collection)
+        names = ', '.join(('id',) + columns + ('data',))
+        placeholders = ', '.join('?' * (len(columns) + 2))
+        updates = ', '.join(f'{c} = excluded.{c}' for c in columns + ('data',))
+        # ON CONFLICT keeps the row's rowid, so insertion order survives updates
+        sql = f'INSERT INTO {collection} ({names}) VALUES ({placeholders}) ON CONFLICT(id) DO UPDATE SET {updates}'
+        
+        rows = []
+        outcome_rows = []
+        for item in items:
+            document = item
+            if collection == 'markets':
+                document = {k: v for k, v in item.items() if k != 'outcomes'}
+                outcome_rows.append((item['id'], item.get('outcomes') or []))
+            rows.append((item['id'],) + tuple(item.get(c) for c in columns) + (_dumps(document),))
+        self._conn.executemany(sql, rows)
+        
+        for market_id, outcomes in outcome_rows:
+            self._conn.execute('DELETE FROM outcomes WHERE market_id = ?', (market_id,))
+            self._conn.executemany(
+                'INSERT INTO outcomes (market_id, outcome_id, position, data) VALUES (?, ?, ?, ?)',
+                [(market_id, o['id'], i, _dumps(o)) for i, o in enumerate(outcomes)]
+            )
+    
+    def _decode(self, collection: str, rows: List[Tuple[str, str]], whole: bool = False) -> List[dict]:
+        """
+        Turn (id, data) rows into records, re-attaching market outcomes
+        
+        Only the outcomes of the given markets are read, in chunks of IDs that
+        stay under SQLite's bound-variable limit; ``whole`` (every market of
+        the collection) scans the outcomes table once instead.
+        """
+        items = [json.loads(data) for _, data in rows]
+        if collection != 'markets' or not items:
+            return items
+        
+        outcomes: Dict[str, List[dict]] = {}
+        if whole:
+            cursors = [self._conn.execute('SELECT market_id, data FROM outcomes ORDER BY market_id, position')]
+        else:
+            ids = [market_id for market_id, _ in rows]
+            cursors = []
+            for start in range(0, len(ids), MAX_VARIABLES):
+                chunk = ids[start:start + MAX_VARIABLES]
+                cursors.append(self._conn.execute(
+                    f"SELECT market_id, data FROM outcomes WHERE market_id IN ({','.join('?' * len(chunk))}) "
+                    'ORDER BY market_id, position', chunk))
+        for cursor in cursors:
+            for market_id, data in cursor:
+                outcomes.setdefault(market_id, []).append(json.loads(data))
+        for item in items:
+            item['outcomes'] = outcomes.get(item['id'], [])
+        return items
+    
+    # --- Datastore operations ---
+    
+    @metrics.timed('samsa_datastore_seconds', 'sqlite_read')
+    def read(self, collection: str) -> List[dict]:
+        """Read every record of a collection in insertion order"""
+        self._columns(collection)
+        with self._lock:
+            rows = self._conn.execute(f'SELECT id, data FROM {collection} ORDER BY rowid').fetchall()
+            return self._decode(collection, rows, whole=True)
+    
+    def write(self, collection: str, items: List[dict]) -> None:
+        """Replace a collection's contents in one transaction"""
+        self._columns(collection)
+        with self._lock, self._transaction():
+            self._conn.execute(f'DELETE FROM {collection}')
+            if collection == 'markets':
+                self._conn.execute('DELETE FROM outcomes')
+            self._upsert(collection, items)
+    
+    def append(self, collection: str, item: dict) -> None:
+        """Insert (or replace) one record"""
+        with self._lock, self._transaction():
+            self._upsert(collection, [item])
+    
+    def update(self, collection: str, item_id: str, updates: dict) -> bool:
+        """
+        Update fields of one record
+        
+        Returns:
+            True if the record was found and updated, False otherwise
+        """
+        with self._lock, self._transaction():
+            item = self.find(collection, item_id)
+            if item is None:
+                return False
+            item.update(updates)
+            self._upsert(collection, [item])
+            return True
+    
+    def delete(self, collection: str, item_id: str) -> bool:
+        """
+        Delete one record
+        
+        Returns:
+            True if the record existed, False otherwise
+        """
+        self._columns(collection)
+        with self._lock, self._transaction():
+            deleted = self._conn.execute(f'DELETE FROM {collection} WHERE id = ?', (item_id,)).rowcount
+            if collection == 'markets':
+                self._conn.execute('DELETE FROM outcomes WHERE market_id = ?', (item_id,))
+            return deleted > 0
+    
+    def find(self, collection: str, item_id: str) -> Optional[dict]:
+        """Find one record by ID"""
+        self._columns(collection)
+        with self._lock:
+            rows = self._conn.execute(f'SELECT id, data FROM {collection} WHERE id = ?', (item_id,)).fetchall()
+            items = self._decode(collection, rows)
+        return items[0] if items else None
+    
+    def find_by(self, collection: str, field_name: str, value: Any) -> List[dict]:
+        """
+        Find records by an indexed column (e.g. predictions by market_id)
+        
+        Raises:
+            ValueError: If the field is not a promoted column of the collection
+        """
+        if field_name not in self._columns(collection):
+            raise ValueError(f"{collection}.{field_name} is not an indexed column")
+        with self._lock:
+            rows = self._conn.execute(
+                f'SELECT id, data FROM {collection} WHERE {field_name} = ? ORDER BY rowid', (value,)).fetchall()
+            return [json.loads(data) for _, data in rows] if collection != 'markets' else self._decode(collection, rows)
+    
+    @metrics.timed('samsa_datastore_seconds', 'sqlite_persist')
+    def persist(self, collection: str, changed: List[dict], deleted: Iterable[str]) -> None:
+        """Write a batch of changed and deleted records in one transaction"""
+        self._columns(collection)
+        deleted = [(item_id,) for item_id in deleted]
+        with self._lock, self._transaction():
+            if changed:
+                self._upsert(collection, changed)
+            if deleted:
+                self._conn.executemany(f'DELETE FROM {collection} WHERE id = ?', deleted)
+                if collection == 'markets':
+                    self._conn.executemany('DELETE FROM outcomes WHERE market_id = ?', deleted)
+    
+    def count(self, collection: str) -> int:
+        self._columns(collection)
+        with self._lock:
+            return self._conn.execute(f'SELECT COUNT(*) FROM {collection}').fetchone()[0]
+    
+    def is_empty(self) -> bool:
+        """Whether no collection holds any rows (e.g. a freshly created database)"""
+        return all(self.count(collection) == 0 for collection in COLLECTIONS)
+    
+    def table(self, collection: str) -> 'SQLiteTable':
+        """Backend for a ``JSONStore`` holding one collection"""
+        self._columns(collection)
+        return SQLiteTable(self, collection)
+    
+    def close(self) -> None:
+        """Checkpoint the WAL into the main file and close the connection"""
+        with self._lock:
+            if self.closed:
+                return
+            self._conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+            self._conn.close()
+            self.closed = True
+    
+    def _transaction(self) -> '_Transaction':
+        return _Transaction(self._conn)
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT/ROLLBACK, re-entrant within one connection"""
+    
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self.outer = False
+    
+    def __enter__(self) -> None:
+        if not self.conn.in_transaction:
+            self.conn.execute('BEGIN IMMEDIATE')
+            self.outer = True
+    
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if self.outer:
+            self.conn.execute('ROLLBACK' if exc_type is not None else 'COMMIT')
+
+
+class SQLiteTable:
+    """
+    One collection of a ``SQLiteBackend``, used as a ``JSONStore`` backend
+    
+    The store still serves reads from memory; its flushes write only the
+    changed and deleted rows.
+    """
+    
+    def __init__(self, database: SQLiteBackend, collection: str):
+        self.database = database
+        self.collection = collection
+    
+    def load(self) -> List[dict]:
+        return self.database.read(self.collection)
+    
+    def persist(self, changed: List[dict], deleted: Iterable[str]) -> None:
+        self.database.persist(self.collection, changed, deleted)
+
+
+def migrate_json(data_dir: str, database: SQLiteBackend) -> Dict[str, int]:
+    """
+    Copy the JSON data files (snapshot plus any journal) into SQLite
+    
+    Each collection is replaced wholesale, so re-running the migration is safe.
+    
+    Args:
+        data_dir: Directory holding markets.json, predictions.json, ...
+        database: Target database
+    
+    Returns:
+        Records migrated per collection
+    """
+    counts = {}
+    for collection in COLLECTIONS:
+        path = os.path.join(data_dir, f'{collection}.json')
+        journal_path = os.path.join(data_dir, f'{collection}.journal.jsonl')
+        store = JSONStore(path, flush_interval=0, journal=os.path.exists(journal_path))
+        items = store.all()
+        store.close()
+        database.write(collection, items)
+        counts[collection] = len(items)
+    return counts
+
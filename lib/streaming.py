@@ -0,0 +1,175 @@
+"""
+SAMSA - Live Price Streaming
+Coalescing fan-out of per-market deltas to many subscribers
+"""
+
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+
+def market_delta(market: dict) -> Dict[str, Any]:
+    """Compact delta describing a market's current prices, volume and status"""
+    return {
+        'id': market['id'],
+        'outcomes': {o['id']: o.get('probability', 0) for o in market.get('outcomes', [])},
+        'total_volume': market.get('total_volume', 0),
+        'status': market.get('status')
+    }
+
+
+class Subscription:
+    """
+    One subscriber's pending updates
+    
+    Pending deltas are keyed by market, so a subscriber that falls behind
+    holds at most one (the latest) delta per market rather than a growing
+    queue. ``wake`` is called whenever new deltas arrive; by default it sets
+    a threading.Event that ``wait`` blocks on, and async consumers can pass
+    a loop-safe callback instead.
+    """
+    
+    def __init__(self, market_ids: Optional[Iterable[str]] = None,
+                 wake: Optional[Callable[[], None]] = None):
+        """
+        Args:
+            market_ids: Markets to follow (None = all markets)
+            wake: Callback run when deltas become available
+        """
+        self.market_ids: Optional[Set[str]] = set(market_ids) if market_ids else None
+        self.closed = False
+        self.lag = 0
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._event = threading.Event()
+        self._wake = wake or self._event.set
+    
+    def offer(self, deltas: Dict[str, Dict[str, Any]]) -> bool:
+        """
+        Queue a tick's deltas (coalescing with undelivered ones)
+        
+        Returns:
+            True if this subscriber still had undelivered deltas (it is lagging)
+        """
+        with self._lock:
+            lagging = bool(self._pending)
+            if self.market_ids is None:
+                self._pending.update(deltas)
+            else:
+                for market_id in self.market_ids.intersection(deltas):
+                    self._pending[market_id] = deltas[market_id]
+            has_pending = bool(self._pending)
+        if has_pending:
+            self._wake()
+        return lagging
+    
+    def drain(self) -> List[Dict[str, Any]]:
+        """Take all pending deltas"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._event.clear()
+        self.lag = 0
+        return list(pending.values())
+    
+    def wait(self, timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Block until deltas arrive (or timeout / close) and drain them"""
+        self._event.wait(timeout)
+        return self.drain()
+    
+    def close(self) -> None:
+        self.closed = True
+        self._wake()
+
+
+class PriceBroadcaster:
+    """
+    Publishes market deltas to subscribers once per tick
+    
+    ``publish`` only stages the latest delta per market, so any number of
+    trades on a market within one tick produce a single update. A background
+    thread fans each tick out to every subscriber. Subscribers that have not
+    drained for ``max_lag_ticks`` consecutive ticks are closed so that one
+    slow client cannot hold memory or CPU indefinitely.
+    """
+    
+    def __init__(self, tick_interval: float = 0.25, max_lag_ticks: int = 120):
+        """
+        Args:
+            tick_interval: Seconds between fan-outs
+            max_lag_ticks: Ticks a subscriber may stay undrained before it is dropped
+        """
+        self.tick_interval = tick_interval
+        self.max_lag_ticks = max_lag_ticks
+        self._staged: Dict[str, Dict[str, Any]] = {}
+        self._subscribers: Set[Subscription] = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def publish(self, market_id: str, delta: Dict[str, Any]) -> None:
+        """Stage a market's latest delta for the next tick"""
+        with self._lock:
+            self._staged[market_id] = delta
+    
+    def on_market_change(self, market_id: str, market: Optional[dict]) -> None:
+        """``JSONStore`` listener publishing a delta for every market change"""
+        if market is not None:
+            self.publish(market_id, market_delta(market))
+    
+    def subscribe(self, market_ids: Optional[Iterable[str]] = None,
+                  wake: Optional[Callable[[], None]] = None) -> Subscription:
+        """Register a new subscriber"""
+        subscription = Subscription(market_ids, wake)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+    
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """Remove a subscriber"""
+        with self._lock:
+            self._subscribers.discard(subscription)
+        subscription.close()
+    
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+    
+    def tick(self) -> int:
+        """
+        Fan the staged deltas out to all subscribers
+        
+        Returns:
+            Number of markets in the tick
+        """
+        with self._lock:
+            staged, self._staged = self._staged, {}
+            subscribers = list(self._subscribers)
+        if not staged:
+            return 0
+        
+        for subscription in subscribers:
+            if subscription.offer(staged):
+                subscription.lag += 1
+                if subscription.lag > self.max_lag_ticks:
+                    self.unsubscribe(subscription)
+        return len(staged)
+    
+    def start(self) -> None:
+        """Start the background tick thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+    
+    def stop(self) -> None:
+        """Stop ticking and close every subscription"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        with self._lock:
+            subscribers, self._subscribers = list(self._subscribers), set()
+        for subscription in subscribers:
+            subscription.close()
+    
+    def _run(self) -> None:
+        while not self._stop.wait(self.tick_interval):
+            self.tick()
@@ -0,0 +1,143 @@
+"""
+SAMSA - Trade Queue
+Group commit of trades arriving within a few milliseconds of each other
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .metrics import metrics
+
+
+class NotDurableError(Exception):
+    """
+    An order was applied, but its batch could not be written to disk
+    
+    The change stays in memory and is written by the next successful commit
+    or background flush. ``result`` is what ``execute`` returned for the
+    order.
+    """
+    
+    def __init__(self, result: Any, cause: BaseException):
+        super().__init__(f'Applied but not yet durable: {cause}')
+        self.result = result
+        self.cause = cause
+
+
+class TradeQueue:
+    """
+    Micro-batching front of the trade path
+    
+    Request threads ``submit`` an order and wait on the returned future. A
+    single committer thread takes the first waiting order, then keeps
+    collecting for ``window`` seconds (or until ``max_batch`` orders). It
+    hands each market's orders, in arrival order, to ``execute`` in one
+    call. It then calls ``commit`` once for the whole batch, and only after
+    that resolves every future with its own result. However many trades a
+    burst brings, the writes ``commit`` makes are paid once per window
+    instead of once per trade.
+    
+    ``execute`` reports each order on its own: it returns a result or an
+    exception instance per order, so one bad order fails only its own
+    future. If ``execute`` raises, none of the group's orders is taken to be
+    applied and they all fail with that error. Orders are not rolled back
+    when ``commit`` fails, since the engine has already moved its prices.
+    Each applied order's future then fails with ``NotDurableError``, which
+    carries its result.
+    """
+    
+    def __init__(self, execute: Callable[[str, List[Any]], List[Any]], commit: Callable[[], Any],
+                 window: float = 0.002, max_batch: int = 512):
+        """
+        Args:
+            execute: Applies one market's orders in sequence and returns one
+                result, or the exception it raised, per order (called on the
+                committer thread)
+            commit: Makes everything the batch changed durable
+            window: Seconds to keep collecting after the first order arrives
+            max_batch: Orders that close a batch early
+        """
+        self.execute = execute
+        self.commit = commit
+        self.window = window
+        self.max_batch = max_batch
+        
+        self._queue: 'queue.Queue[Optional[Tuple[str, Any, Future]]]' = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+    
+    def submit(self, market_id: str, order: Any) -> Future:
+        """
+        Queue an order for the next batch
+        
+        Returns:
+            Future resolved with the order's result once its batch is committed
+        """
+        if self._thread is None:
+            raise RuntimeError('Trade queue is not running')
+        future: Future = Future()
+        self._queue.put((market_id, order, future))
+        return future
+    
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='samsa-trade-queue', daemon=True)
+            self._thread.start()
+    
+    def stop(self) -> None:
+        """Commit whatever is queued, then stop the committer thread"""
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+    
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is None:
+                break
+            batch = [first]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._process(batch)
+    
+    def _process(self, batch: List[Tuple[str, Any, Future]]) -> None:
+        by_market: Dict[str, List[Tuple[Any, Future]]] = {}
+        for market_id, order, future in batch:
+            by_market.setdefault(market_id, []).append((order, future))
+        
+        results: List[Tuple[Future, Any]] = []
+        for market_id, entries in by_market.items():
+            try:
+                outcomes = self.execute(market_id, [order for order, _ in entries])
+            except Exception as e:
+                outcomes = [e] * len(entries)
+            results.extend((future, outcome) for (_, future), outcome in zip(entries, outcomes))
+        
+        commit_error: Optional[BaseException] = None
+        try:
+            self.commit()
+        except Exception as e:
+            commit_error = e
+        
+        metrics.inc('samsa_trade_batches_total')
+        metrics.inc('samsa_trade_batch_orders_total', amount=len(batch))
+        for future, outcome in results:
+            if isinstance(outcome, BaseException):
+                future.set_exception(outcome)
+            elif commit_error is not None:
+                future.set_exception(NotDurableError(outcome, commit_error))
+            else:
+                future.set_result(outcome)
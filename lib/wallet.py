@@ -0,0 +1,218 @@
+"""
+SAMSA - Wallet Ledger
+Materialized per-user balances over the transaction and prediction logs
+"""
+
+import threading
+import uuid
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from .datastore import JSONStore
+from .locks import LockStripes
+
+
+@dataclass
+class Account:
+    """Running totals for one user"""
+    deposits: float = 0.0
+    withdrawals: float = 0.0
+    staked: float = 0.0
+    active_stakes: float = 0.0
+    returns: float = 0.0
+    
+    @property
+    def balance(self) -> float:
+        """Deposits - withdrawals - stakes placed + settled returns"""
+        return self.deposits - self.withdrawals - self.staked + self.returns
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {**asdict(self), 'balance': self.balance}
+
+
+class Wallet:
+    """
+    Wallet ledger with O(1) balance reads
+    
+    Each user's totals are kept in an ``Account`` that is updated as
+    transactions and predictions are written to their stores (via store
+    listeners), so a balance check never rescans the logs. ``rebuild`` and
+    ``verify`` re-derive the accounts from the logs.
+    """
+    
+    MAX_DEPOSIT = 10000
+    
+    def __init__(self, transactions: JSONStore, predictions: JSONStore):
+        """
+        Initialize the wallet and derive accounts from the existing logs
+        
+        Args:
+            transactions: Transaction store indexed on ``user_id``
+            predictions: Prediction store
+        """
+        self.transactions = transactions
+        self.predictions = predictions
+        self._lock = threading.Lock()
+        self._user_locks = LockStripes(64)
+        self._accounts: Dict[str, Account] = {}
+        self._stakes: Dict[str, Tuple[str, float, bool, float]] = {}
+        
+        self.rebuild()
+        transactions.add_listener(self._on_transaction)
+        predictions.add_listener(self._on_prediction)
+    
+    # --- Ledger maintenance ---
+    
+    def rebuild(self) -> None:
+        """Re-derive every account from the transaction and prediction logs"""
+        accounts, stakes = self._derive()
+        with self._lock:
+            self._accounts = accounts
+            self._stakes = stakes
+    
+    def verify(self, repair: bool = False) -> Dict[str, Dict[str, Any]]:
+        """
+        Compare materialized accounts with a fresh derivation from the logs
+        
+        Args:
+            repair: Replace the materialized accounts with the derived ones
+            
+        Returns:
+            Mapping of user ID -> {stored, expected} for every mismatch
+        """
+        accounts, stakes = self._derive()
+        mismatches = {}
+        with self._lock:
+            for user_id in set(accounts) | set(self._accounts):
+                stored = self._accounts.get(user_id, Account())
+                expected = accounts.get(user_id, Account())
+                if any(abs(a - b) > 1e-6 for a, b in zip(asdict(stored).values(), asdict(expected).values())):
+                    mismatches[user_id] = {'stored': stored.to_dict(), 'expected': expected.to_dict()}
+            if repair:
+                self._accounts = accounts
+                self._stakes = stakes
+        return mismatches
+    
+    def _derive(self) -> Tuple[Dict[str, Account], Dict[str, Tuple[str, float, bool, float]]]:
+        accounts: Dict[str, Account] = {}
+        stakes: Dict[str, Tuple[str, float, bool, float]] = {}
+        for transaction in self.transactions.all():
+            _apply_transaction(accounts, transaction)
+        for prediction in self.predictions.all():
+            entry = _stake_entry(prediction)
+            if entry is not None:
+                stakes[prediction['id']] = entry
+                _apply_stake(accounts, entry, 1)
+        return accounts, stakes
+    
+    def _on_transaction(self, transaction_id: str, transaction: Optional[dict]) -> None:
+        if transaction is not None:
+            with self._lock:
+                _apply_transaction(self._accounts, transaction)
+    
+    def _on_prediction(self, prediction_id: str, prediction: Optional[dict]) -> None:
+        entry = _stake_entry(prediction) if prediction is not None else None
+        with self._lock:
+            previous = self._stakes.get(prediction_id)
+            if previous == entry:
+                return
+            if previous is not None:
+                _apply_stake(self._accounts, previous, -1)
+                del self._stakes[prediction_id]
+            if entry is not None:
+                _apply_stake(self._accounts, entry, 1)
+                self._stakes[prediction_id] = entry
+    
+    # --- Reads ---
+    
+    def lock_for(self, user_id: str) -> threading.RLock:
+        """Lock serializing balance-changing operations for one user"""
+        return self._user_locks.lock_for(user_id)
+    
+    def account(self, user_id: str) -> Account:
+        """Get a snapshot of a user's account"""
+        with self._lock:
+            account = self._accounts.get(user_id)
+            return Account(**asdict(account)) if account else Account()
+    
+    def balance(self, user_id: str) -> float:
+        """Get a user's available balance (never negative)"""
+        return max(0.0, self.account(user_id).balance)
+    
+    def transactions_for(self, user_id: str) -> List[dict]:
+        """Get a user's transaction history in ledger order"""
+        return self.transactions.find_by('user_id', user_id)
+    
+    # --- Ledger writes ---
+    
+    def deposit(self, user_id: str, amount: float, payment_method: str = 'card') -> dict:
+        """
+        Record a deposit
+        
+        Raises:
+            ValueError: If the amount is invalid or above MAX_DEPOSIT
+        """
+        if not isinstance(amount, (int, float)) or amount <= 0:
+            raise ValueError('Invalid deposit amount')
+        if amount > self.MAX_DEPOSIT:
+            raise ValueError(f'Maximum deposit is ${self.MAX_DEPOSIT:,}')
+        
+        with self.lock_for(user_id):
+            return self.transactions.save(_transaction(user_id, 'deposit', amount, payment_method=payment_method))
+    
+    def withdraw(self, user_id: str, amount: float, withdrawal_method: str = 'bank') -> dict:
+        """
+        Record a withdrawal after checking the balance
+        
+        Raises:
+            ValueError: If the amount is invalid or exceeds the balance
+        """
+        if not isinstance(amount, (int, float)) or amount <= 0:
+            raise ValueError('Invalid withdrawal amount')
+        
+        with self.lock_for(user_id):
+            if self.balance(user_id) < amount:
+                raise ValueError('Insufficient balance')
+            return self.transactions.save(_transaction(user_id, 'withdrawal', amount, withdrawal_method=withdrawal_method))
+
+
+def _transaction(user_id: str, kind: str, amount: float, **extra: Any) -> dict:
+    return {
+        'id': uuid.uuid4().hex[:12],
+        'user_id': user_id,
+        'type': kind,
+        'amount': amount,
+        **extra,
+        'status': 'completed',
+        'created_at': datetime.utcnow().isoformat() + 'Z'
+    }
+
+
+def _apply_transaction(accounts: Dict[str, Account], transaction: dict) -> None:
+    if transaction.get('status') != 'completed' or not transaction.get('user_id'):
+        return
+    account = accounts.setdefault(transaction['user_id'], Account())
+    if transaction.get('type') == 'deposit':
+        account.deposits += transaction.get('amount') or 0
+    elif transaction.get('type') == 'withdrawal':
+        account.withdrawals += transaction.get('amount') or 0
+
+
+def _stake_entry(prediction: dict) -> Optional[Tuple[str, float, bool, float]]:
+    """(user_id, stake, active, settled return) for a user's prediction"""
+    user_id = prediction.get('user_id')
+    if not user_id:
+        return None
+    active = prediction.get('status') == 'active'
+    returned = 0.0 if active else (prediction.get('actual_return') or 0)
+    return user_id, prediction.get('stake_amount') or 0, active, returned
+
+
+def _apply_stake(accounts: Dict[str, Account], entry: Tuple[str, float, bool, float], sign: int) -> None:
+    user_id, stake, active, returned = entry
+    account = accounts.setdefault(user_id, Account())
+    account.staked += sign * stake
+    if active:
+        account.active_stakes += sign * stake
+    account.returns += sign * returned
@@ -3,40 +3,177 @@ SAMSA - Python Backend Server
 Flask-based API for prediction markets
 """
 
-from flask import Flask, request, jsonify, send_from_directory, send_file
+from flask import Flask, Response, g, request, jsonify, send_from_directory, send_file, stream_with_context
 from flask_cors import CORS
 import os
+import asyncio
+import atexit
 import json
 import uuid
 import math
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from datetime import datetime
-from functools import wraps
+from urllib.parse import parse_qs
+
+import numpy as np
+
+from lib.asgi import ASGIApp, wait_for_disconnect
+from lib.datastore import JSONStore, read_json
+from lib.locks import LockStripes
+from lib.lmsr import LMSR, LMSRMarketManager
+from lib.lmsr_store import LMSRStateStore
+from lib.market_index import MarketIndex
+from lib.market_stats import apply_trade, verify_stats
+from lib.metrics import SamplingProfiler, metrics
+from lib.positions import PositionBook
+from lib.price_history import PriceHistory
+from lib.query import QueryIndex
+from lib.response_cache import CachedResponse, ResponseCache
+from lib.rollups import StatsRollup, league_slug
+from lib.risk import RiskEngine
+from lib.search import SearchIndex
+from lib.sqlite_store import SQLiteBackend, migrate_json
+from lib.wallet import Wallet
+from lib.settlement import settle_market
+from lib.streaming import PriceBroadcaster, market_delta
+from lib.trade_queue import TradeQueue, NotDurableError
 
 app = Flask(__name__, static_folder='.', static_url_path='')
 CORS(app)
 
 # Configuration
 PORT = int(os.environ.get('PORT', 3001))
-DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+# 'flask' runs the threaded dev server; 'asgi' serves asgi_app with uvicorn
+SERVER_MODE = os.environ.get('SAMSA_SERVER_MODE', 'flask')
+DATA_DIR = os.environ.get('SAMSA_DATA_DIR', os.path.join(os.path.dirname(__file__), 'data'))
 MARKETS_PATH = os.path.join(DATA_DIR, 'markets.json')
 PREDICTIONS_PATH = os.path.join(DATA_DIR, 'predictions.json')
+TRANSACTIONS_PATH = os.path.join(DATA_DIR, 'transactions.json')
+USERS_PATH = os.path.join(DATA_DIR, 'users.json')
+LEAGUES_PATH = os.path.join(DATA_DIR, 'top-leagues-attendance.json')
+LMSR_STATE_PATH = os.path.join(DATA_DIR, 'lmsr_state.json')
+HISTORY_DIR = os.path.join(DATA_DIR, 'history')
+# 'json' keeps the data/*.json files; 'sqlite' stores every collection in SQLITE_PATH
+DATASTORE_BACKEND = os.environ.get('SAMSA_DATASTORE_BACKEND', 'json')
+SQLITE_PATH = os.environ.get('SAMSA_SQLITE_PATH', os.path.join(DATA_DIR, 'samsa.db'))
+
+# Seconds between write-behind flushes of the data stores (0 = write-through)
+FLUSH_INTERVAL = float(os.environ.get('SAMSA_FLUSH_INTERVAL', 1.0))
+# Journal entries after which an append-only store is compacted into its snapshot
+COMPACT_THRESHOLD = int(os.environ.get('SAMSA_COMPACT_THRESHOLD', 10000))
+# Seconds between checkpoints of changed LMSR market states
+LMSR_CHECKPOINT_INTERVAL = float(os.environ.get('SAMSA_LMSR_CHECKPOINT_INTERVAL', 1.0))
+# Largest number of (stake, probability) cells priced by one batch request
+MAX_BATCH_QUOTES = int(os.environ.get('SAMSA_MAX_BATCH_QUOTES', 100000))
+# Predictions settled per vectorized batch when a market resolves
+SETTLEMENT_CHUNK_SIZE = int(os.environ.get('SAMSA_SETTLEMENT_CHUNK_SIZE', 5000))
+# Seconds over which market updates are coalesced before being pushed to streams
+STREAM_TICK_INTERVAL = float(os.environ.get('SAMSA_STREAM_TICK_INTERVAL', 0.25))
+# Seconds between keep-alive comments on idle streams
+STREAM_KEEPALIVE = float(os.environ.get('SAMSA_STREAM_KEEPALIVE', 15))
+# Largest number of resolution scenarios one risk request may simulate
+MAX_RISK_SCENARIOS = int(os.environ.get('SAMSA_MAX_RISK_SCENARIOS', 2000000))
+# Seconds over which trades are collected into one durable group commit (0 = off)
+TRADE_BATCH_WINDOW = float(os.environ.get('SAMSA_TRADE_BATCH_WINDOW', 0))
+# Largest number of trades in one group commit
+TRADE_BATCH_SIZE = int(os.environ.get('SAMSA_TRADE_BATCH_SIZE', 512))
+# Seconds a request waits for its group commit before answering 503
+TRADE_COMMIT_TIMEOUT = float(os.environ.get('SAMSA_TRADE_COMMIT_TIMEOUT', 10))
+# Reject trades whose stake exceeds the user's wallet balance. Off by default,
+# as in the Node server, so users who never deposited can still trade
+REQUIRE_BALANCE = os.environ.get('SAMSA_REQUIRE_BALANCE', '').lower() in ('1', 'true', 'yes')
+# Page size of paginated listings when none is given, and the largest allowed
+DEFAULT_PAGE_SIZE = int(os.environ.get('SAMSA_DEFAULT_PAGE_SIZE', 50))
+MAX_PAGE_SIZE = int(os.environ.get('SAMSA_MAX_PAGE_SIZE', 500))
 
 # ============================================================================
 # DATA STORE UTILITIES
 # ============================================================================
 
-def read_json(file_path: str) -> list:
-    """Read JSON data from file"""
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        return []
+# Files are parsed once at startup and served from indexed in-memory stores;
+# changes are written back in batches every FLUSH_INTERVAL seconds.
+# Predictions and transactions only ever grow, so they are journaled
+# (append-only) and periodically compacted instead of rewritten.
+# With the SQLite backend each flush upserts just the changed rows; a new
+# database is seeded from the JSON files on first start.
+database = None
+if DATASTORE_BACKEND == 'sqlite':
+    database = SQLiteBackend(SQLITE_PATH)
+    if database.is_empty():
+        migrate_json(DATA_DIR, database)
+elif DATASTORE_BACKEND != 'json':
+    raise ValueError(f"Unknown SAMSA_DATASTORE_BACKEND: {DATASTORE_BACKEND}")
+
+def open_store(collection: str, file_path: str, **options) -> JSONStore:
+    """Open a collection on the configured backend"""
+    backend = database.table(collection) if database is not None else None
+    return JSONStore(file_path, flush_interval=FLUSH_INTERVAL, backend=backend, **options)
+
+markets_store = open_store('markets', MARKETS_PATH)
+predictions_store = open_store('predictions', PREDICTIONS_PATH, index_fields=('market_id',),
+                               journal=True, compact_threshold=COMPACT_THRESHOLD)
+transactions_store = open_store('transactions', TRANSACTIONS_PATH, index_fields=('user_id',),
+                                journal=True, compact_threshold=COMPACT_THRESHOLD)
+users_store = open_store('users', USERS_PATH)
+
+# Per-user running balances, updated as transactions and predictions are written
+wallet = Wallet(transactions_store, predictions_store)
+
+# Per-user, per-market positions, updated as predictions are placed and settled
+position_book = PositionBook(predictions_store)
+
+# Ranked views (trending / current events / category) kept in sync with
+# every market change instead of re-sorting the catalog per request
+market_index = MarketIndex()
+market_index.rebuild(markets_store.all())
+markets_store.add_listener(market_index.update)
+
+# League and category stats (active markets, volume, predictions, traders)
+# aggregated as markets and predictions change
+stats_rollup = StatsRollup()
+stats_rollup.rebuild(markets_store.all(), predictions_store.all())
+markets_store.add_listener(stats_rollup.update_market)
+predictions_store.add_listener(stats_rollup.update_prediction)
+
+# Reference list of leagues shown on the interests pages, keyed by league ID
+leagues = {league_slug(entry['name']): entry for entry in read_json(LEAGUES_PATH) if entry.get('name')}
+
+# Ordered indexes behind the cursor-paginated market and prediction listings
+markets_query = QueryIndex(markets_store.get, filter_fields=('status', 'category', 'league_id'),
+                           sort_fields=('total_volume', 'close_date', 'title'), range_field='close_date')
+markets_query.rebuild(markets_store.all())
+markets_store.add_listener(markets_query.update)
+
+predictions_query = QueryIndex(predictions_store.get, filter_fields=('market_id', 'user_id', 'outcome_id', 'status'),
+                               sort_fields=('stake_amount',), default_sort='created_at', range_field='created_at')
+predictions_query.rebuild(predictions_store.all())
+predictions_store.add_listener(predictions_query.update)
+
+# Full-text search over title, description and search_keywords
+search_index = SearchIndex()
+search_index.rebuild(markets_store.all())
+markets_store.add_listener(search_index.update)
+
+# Live price pushes: every market change is staged and fanned out to
+# stream subscribers once per tick
+price_broadcaster = PriceBroadcaster(tick_interval=STREAM_TICK_INTERVAL)
+markets_store.add_listener(price_broadcaster.on_market_change)
+price_broadcaster.start()
 
-def write_json(file_path: str, data: list) -> None:
-    """Write JSON data to file"""
-    with open(file_path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+@atexit.register
+def close_stores() -> None:
+    """Flush pending writes on shutdown"""
+    price_broadcaster.stop()
+    markets_store.close()
+    predictions_store.close()
+    transactions_store.close()
+    users_store.close()
+    if database is not None:
+        database.close()
+
+# Per-market lock striping for the trade and resolution paths
+market_locks = LockStripes(64)
 
 def generate_id(length: int = 12) -> str:
     """Generate a unique ID similar to nanoid"""
@@ -65,9 +202,11 @@ class LMSRMarket:
     
     def get_probability(self) -> float:
         """Get current market probability for YES outcome"""
-        e_yes = math.exp(self.q_yes / self.b)
-        e_no = math.exp(self.q_no / self.b)
-        return e_yes / (e_yes + e_no)
+        d = (self.q_yes - self.q_no) / self.b
+        if d >= 0:
+            return 1 / (1 + math.exp(-d))
+        e = math.exp(d)
+        return e / (1 + e)
     
     def invest(self, side: str, stake: float) -> float:
         """Risk-weighted investment on YES or NO"""
@@ -175,19 +314,107 @@ class LMSRMarket:
             'platform_revenue': round(platform_revenue, 2)
         }
 
-# Global market manager
-lmsr_markets = {}
+# Global market manager, warm-restored from the last checkpoint so that the
+# first trade after a restart continues from the persisted q values
+lmsr_manager = LMSRMarketManager()
+lmsr_state_store = LMSRStateStore(lmsr_manager, LMSR_STATE_PATH, checkpoint_interval=LMSR_CHECKPOINT_INTERVAL)
+lmsr_state_store.load()
+lmsr_state_store.start()
+atexit.register(lmsr_state_store.close)
+
+# Post-trade price vectors per market, for charts
+price_history = PriceHistory(HISTORY_DIR, flush_interval=FLUSH_INTERVAL)
+atexit.register(price_history.close)
+
+def trade_on_market(market: dict, outcome_id: str, stake: float, b: float = 100) -> dict:
+    """Invest in a market's N-outcome LMSR state, creating it on first trade"""
+    outcome_ids = [o['id'] for o in market['outcomes']]
+    # Seed from the market's listed probabilities (uniform when none are set)
+    initial_probabilities = [o.get('probability') or 0 for o in market['outcomes']]
+    return lmsr_manager.trade(market['id'], outcome_ids, outcome_id, stake, b, initial_probabilities)
+
+def probabilities_from_state(market: dict, state) -> list:
+    """A market's outcome probabilities from its LMSR state, in its outcome order"""
+    outcome_ids = [o['id'] for o in market['outcomes']]
+    if state is not None and state.get('outcome_ids') == outcome_ids:
+        return state['probabilities']
+    return [o.get('probability') or 0 for o in market['outcomes']]
 
-def get_or_create_market(market_id: str, b: float = 100, initial_prob: float = 0.5) -> LMSRMarket:
-    """Get or create an LMSR market"""
-    if market_id not in lmsr_markets:
-        lmsr_markets[market_id] = LMSRMarket(b, initial_prob)
-    return lmsr_markets[market_id]
+def market_probabilities(market: dict) -> list:
+    """Current outcome probabilities of a market, in its outcome order"""
+    return probabilities_from_state(market, lmsr_manager.get_state(market['id']))
 
 # ============================================================================
 # HELPER FUNCTIONS
 # ============================================================================
 
+def place_trade(market_id: str, outcome_id: str, stake_amount: float, odds_at_prediction: float,
+                user_id) -> tuple:
+    """
+    Validate and execute one order
+    
+    Returns:
+        (response body, HTTP status): the prediction with 201, or an error
+    """
+    # Trades on the same market are serialized so concurrent requests cannot
+    # lose updates to the LMSR quantities or the outcome stakes
+    with market_locks.lock_for(market_id):
+        market = markets_store.get(market_id)
+        if not market:
+            return {'error': 'Market not found'}, 404
+        
+        if market['status'] != 'active':
+            return {'error': 'Market is not active'}, 400
+        
+        outcome = next((o for o in market['outcomes'] if o['id'] == outcome_id), None)
+        if not outcome:
+            return {'error': 'Outcome not found'}, 404
+        
+        if user_id and REQUIRE_BALANCE:
+            # Check and spend the balance atomically for this user
+            with wallet.lock_for(user_id):
+                if wallet.balance(user_id) < stake_amount:
+                    return {'error': 'Insufficient balance'}, 400
+                return execute_trade(market, outcome, stake_amount, odds_at_prediction, user_id), 201
+        return execute_trade(market, outcome, stake_amount, odds_at_prediction, user_id), 201
+
+def place_trades(market_id: str, orders: list) -> list:
+    """
+    Apply one market's queued orders in arrival order under a single lock hold
+    
+    Returns:
+        One (body, status) per order, or the exception that order raised
+    """
+    results = []
+    with market_locks.lock_for(market_id):
+        for order in orders:
+            try:
+                results.append(place_trade(market_id, *order))
+            except Exception as e:
+                results.append(e)
+    return results
+
+def commit_trades() -> None:
+    """
+    Make a batch of trades durable: one append-and-fsync per journal
+    
+    The predictions journal and the LMSR state journal each take one fsync
+    for the whole batch. markets.json is left to write-behind; its stakes
+    and volume are derived from the predictions and can be rebuilt with
+    /api/markets/verify-stats?repair=true.
+    """
+    predictions_store.flush()
+    lmsr_state_store.checkpoint()
+
+# Optional group commit: trades arriving within TRADE_BATCH_WINDOW of each
+# other are applied per market in order, made durable with one fsync per
+# journal, and only then answered
+trade_queue = None
+if TRADE_BATCH_WINDOW > 0:
+    trade_queue = TradeQueue(place_trades, commit_trades, window=TRADE_BATCH_WINDOW, max_batch=TRADE_BATCH_SIZE)
+    trade_queue.start()
+    atexit.register(trade_queue.stop)
+
 def recompute_market_stats(market: dict) -> None:
     """Recompute market statistics after a trade"""
     total_stake = sum(o.get('total_stake', 0) for o in market['outcomes'])
@@ -197,6 +424,153 @@ def recompute_market_stats(market: dict) -> None:
         for outcome in market['outcomes']:
             outcome['probability'] = round((outcome.get('total_stake', 0) / total_stake) * 100)
 
+def execute_trade(market: dict, outcome: dict, stake_amount: float, odds_at_prediction: float, user_id) -> dict:
+    """
+    Apply a validated trade: move the LMSR state, record the prediction and
+    update the market's stakes. Callers must hold the market's lock.
+    """
+    market_id = market['id']
+    
+    # Get LMSR breakdown
+    breakdown = LMSRMarket.get_trade_breakdown(stake_amount, odds_at_prediction)
+    
+    # Update LMSR market state; invest moves q by stake * (1 - p) at the
+    # pre-trade price, which is the position's share count
+    fill = trade_on_market(market, outcome['id'], stake_amount)
+    
+    prediction = {
+        'id': generate_id(12),
+        'market_id': market_id,
+        'outcome_id': outcome['id'],
+        'stake_amount': stake_amount,
+        'odds_at_prediction': odds_at_prediction,
+        'shares': round(fill['shares'], 6),
+        'fill_probability': round(fill['old_probability'], 6),
+        'potential_return': round(breakdown['win']['total_return'], 2),
+        'potential_profit': round(breakdown['win']['profit'], 2),
+        'potential_refund': round(breakdown['lose']['refund'], 2),
+        'status': 'active',
+        'actual_return': 0,
+        'user_id': user_id,
+        'created_at': datetime.utcnow().isoformat() + 'Z',
+        'lmsr_breakdown': breakdown
+    }
+    
+    predictions_store.save(prediction)
+    
+    # Update market stats incrementally, pricing outcomes from the LMSR state
+    probabilities = fill['probabilities']
+    apply_trade(market, outcome, stake_amount, probabilities)
+    markets_store.save(market)
+    price_history.record(market_id, probabilities, stake_amount)
+    
+    return prediction
+
+# Serialized bytes of hot GET responses, rebuilt only when the data changes
+response_cache = ResponseCache(serializer=lambda data: app.json.dumps(data))
+
+def paginated_query(index: QueryIndex):
+    """
+    Answer a listing request from a query index
+    
+    Query params: any of the index's filter fields, since / until (bounds on
+    its date field), sort (prefix with '-' for descending), fields
+    (comma-separated projection), limit and cursor. Returns a page envelope
+    when limit or cursor is given, otherwise every match as a plain array.
+    """
+    args = request.args
+    paged = 'limit' in args or 'cursor' in args
+    limit = None
+    if paged:
+        limit = min(max(args.get('limit', DEFAULT_PAGE_SIZE, type=int) or DEFAULT_PAGE_SIZE, 1), MAX_PAGE_SIZE)
+    sort = args.get('sort') or None
+    descending = bool(sort) and sort.startswith('-')
+    fields = [f for f in args.get('fields', '').split(',') if f] or None
+    
+    try:
+        page = index.query(
+            filters={f: args[f] for f in index.filter_fields if f in args},
+            sort=sort.lstrip('-') if sort else None,
+            descending=descending,
+            since=args.get('since'),
+            until=args.get('until'),
+            limit=limit,
+            cursor=args.get('cursor'),
+            fields=fields
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if not paged:
+        return jsonify(page['items'])
+    return jsonify({'items': page['items'], 'limit': limit,
+                    'next_cursor': page['next_cursor'], 'has_more': page['has_more']})
+
+def cached_response(cached: CachedResponse) -> Response:
+    """
+    Serve a cached body with ETag/Last-Modified validators, answering
+    conditional requests with 304 and gzip-capable clients with the
+    precompressed body
+    """
+    if request.if_none_match:
+        not_modified = request.if_none_match.contains_weak(cached.etag.strip('"'))
+    else:
+        not_modified = (request.if_modified_since is not None
+                        and int(cached.last_modified) <= request.if_modified_since.timestamp())
+    
+    if not_modified:
+        response = Response(status=304)
+    elif cached.gzip_body is not None and 'gzip' in request.accept_encodings:
+        response = Response(cached.gzip_body, mimetype='application/json')
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = Response(cached.body, mimetype='application/json')
+    
+    response.headers['ETag'] = cached.etag
+    response.headers['Last-Modified'] = cached.last_modified_http
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+# ============================================================================
+# METRICS
+# ============================================================================
+
+# Per-route request counts and latencies; the library times its own file
+# I/O and LMSR hot paths into the same registry
+metrics.counter('samsa_http_requests_total', 'HTTP requests handled', ('method', 'route', 'status'))
+metrics.counter('samsa_http_request_errors_total', 'HTTP requests that failed with a 5xx or an exception', ('method', 'route'))
+metrics.histogram('samsa_http_request_duration_seconds', 'HTTP request latency', ('method', 'route'))
+metrics.gauge('samsa_markets', 'Markets loaded', lambda: len(markets_store))
+metrics.gauge('samsa_predictions', 'Predictions loaded', lambda: len(predictions_store))
+metrics.gauge('samsa_lmsr_markets', 'Markets with LMSR state', lambda: len(lmsr_manager))
+metrics.gauge('samsa_stream_subscribers', 'Open price streams', lambda: price_broadcaster.subscriber_count)
+
+# Sampling profiler, switched on and off at runtime via /api/metrics/profiler
+profiler = SamplingProfiler()
+
+@app.before_request
+def start_request_timer() -> None:
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_response_status(response: Response) -> Response:
+    g.response_status = response.status_code
+    return response
+
+@app.teardown_request
+def record_request_metrics(exc) -> None:
+    started = g.pop('request_started', None)
+    if started is None:
+        return
+    # Label by route template, not the raw path, to keep the series bounded
+    route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    status = 500 if exc is not None else g.pop('response_status', 500)
+    metrics.observe('samsa_http_request_duration_seconds', (request.method, route), time.perf_counter() - started)
+    metrics.inc('samsa_http_requests_total', (request.method, route, str(status)))
+    if status >= 500:
+        metrics.inc('samsa_http_request_errors_total', (request.method, route))
+
 # ============================================================================
 # STATIC FILE ROUTES
 # ============================================================================
@@ -226,21 +600,170 @@ def health_check():
 
 @app.route('/api/markets', methods=['GET'])
 def get_markets():
-    """Get all markets"""
-    markets = read_json(MARKETS_PATH)
-    return jsonify(markets)
+    """
+    Get markets
+    
+    Without query params the whole catalog is served from the response
+    cache (supports conditional GET); with filters, sort or a page size it
+    is answered from the market query index.
+    """
+    if request.args:
+        return paginated_query(markets_query)
+    cached = response_cache.get('markets', markets_store.version, markets_store.all)
+    return cached_response(cached)
+
+@app.route('/api/markets/trending', methods=['GET'])
+def get_trending_markets():
+    """Get the active markets with the highest volume"""
+    limit = max(1, min(request.args.get('limit', 10, type=int) or 10, MAX_PAGE_SIZE))
+    return jsonify([markets_store.get(market_id) for market_id in market_index.trending(limit)])
+
+@app.route('/api/markets/current-events', methods=['GET'])
+def get_current_event_markets():
+    """Get active markets closing within six months, ranked by volume and urgency"""
+    limit = request.args.get('limit', type=int)
+    market_ids = market_index.current_events(horizon_days=180, limit=limit)
+    return jsonify([markets_store.get(market_id) for market_id in market_ids])
+
+@app.route('/api/markets/category/<category>', methods=['GET'])
+def get_category_markets(category: str):
+    """Get active markets in a category"""
+    return jsonify([markets_store.get(market_id) for market_id in market_index.category(category)])
+
+@app.route('/api/markets/search', methods=['GET'])
+def search_markets():
+    """Search markets by text, optionally filtered by status and category"""
+    query = request.args.get('q', '')
+    status = request.args.get('status')
+    category = request.args.get('category')
+    limit = min(request.args.get('limit', 20, type=int) or 20, 100)
+    
+    results = search_index.search(query, limit=limit, status=status, category=category)
+    hits = []
+    for market_id, score in results:
+        market = markets_store.get(market_id)
+        if market is not None:
+            market['score'] = score
+            hits.append(market)
+    return jsonify(hits)
 
 @app.route('/api/markets/<market_id>', methods=['GET'])
 def get_market(market_id: str):
     """Get a specific market by ID"""
-    markets = read_json(MARKETS_PATH)
-    market = next((m for m in markets if m['id'] == market_id), None)
+    market = markets_store.get(market_id)
     
     if not market:
         return jsonify({'error': 'Market not found'}), 404
     
     return jsonify(market)
 
+@app.route('/api/markets/<market_id>/history', methods=['GET'])
+def get_market_history(market_id: str):
+    """
+    Get OHLC probability candles for one outcome of a market
+    
+    Query: resolution (1m, 1h, 1d), outcome_id (defaults to the first
+    outcome), from / to (Unix seconds).
+    """
+    market = markets_store.get(market_id)
+    if not market:
+        return jsonify({'error': 'Market not found'}), 404
+    
+    resolution = request.args.get('resolution', '1h')
+    outcome_id = request.args.get('outcome_id', market['outcomes'][0]['id'])
+    outcome_index = next((i for i, o in enumerate(market['outcomes']) if o['id'] == outcome_id), None)
+    if outcome_index is None:
+        return jsonify({'error': 'Outcome not found'}), 404
+    
+    try:
+        candles = price_history.candles(market_id, resolution, outcome_index,
+                                        request.args.get('from', type=float), request.args.get('to', type=float))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({
+        'market_id': market_id,
+        'outcome_id': outcome_id,
+        'resolution': resolution,
+        'candles': candles
+    })
+
+# --- League / Category Stats ---
+
+@app.route('/api/leagues', methods=['GET'])
+def get_leagues():
+    """
+    List every league with its stats
+    
+    Query params: sport to filter, active=true to keep only leagues with active markets.
+    """
+    sport = request.args.get('sport')
+    active_only = request.args.get('active', '').lower() in ('1', 'true', 'yes')
+    
+    result = []
+    for lid, entry in leagues.items():
+        if sport and entry.get('sport') != sport:
+            continue
+        stats = stats_rollup.stats('league', lid)
+        if active_only and not stats['active_markets']:
+            continue
+        result.append({'league_id': lid, **entry, **stats})
+    return jsonify(result)
+
+@app.route('/api/leagues/<league_id>/stats', methods=['GET'])
+def get_league_stats(league_id: str):
+    """Get a league's active markets, volume, predictions and unique traders"""
+    entry = leagues.get(league_id, {})
+    return jsonify({'league_id': league_id, **entry, **stats_rollup.stats('league', league_id)})
+
+@app.route('/api/categories/<category>/stats', methods=['GET'])
+def get_category_stats(category: str):
+    """Get a category's active markets, volume, predictions and unique traders"""
+    return jsonify({'category': category, **stats_rollup.stats('category', category)})
+
+# --- Streaming ---
+
+def parse_stream_market_ids(raw: str):
+    """Parse a comma-separated market_id filter (None = all markets)"""
+    market_ids = [market_id for market_id in (raw or '').split(',') if market_id]
+    return market_ids or None
+
+def sse_event(payload) -> str:
+    """Format one Server-Sent Events message"""
+    return f"data: {json.dumps(payload, separators=(',', ':'))}\n\n"
+
+def stream_snapshot(market_ids) -> list:
+    """Current deltas for the requested markets, sent when a stream opens"""
+    if market_ids is None:
+        return []
+    return [market_delta(market) for market in map(markets_store.get, market_ids) if market]
+
+@app.route('/api/stream/markets', methods=['GET'])
+def stream_markets():
+    """
+    Server-Sent Events stream of market price updates
+    
+    Query: market_id (comma-separated; omit for every market). Each event is
+    a JSON list of {id, outcomes, total_volume, status} deltas.
+    """
+    market_ids = parse_stream_market_ids(request.args.get('market_id'))
+    subscription = price_broadcaster.subscribe(market_ids)
+    
+    def generate():
+        try:
+            yield 'retry: 3000\n\n'
+            snapshot = stream_snapshot(market_ids)
+            if snapshot:
+                yield sse_event(snapshot)
+            while not subscription.closed:
+                deltas = subscription.wait(STREAM_KEEPALIVE)
+                yield sse_event(deltas) if deltas else ': ping\n\n'
+        finally:
+            price_broadcaster.unsubscribe(subscription)
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/api/markets', methods=['POST'])
 def create_market():
     """Create a new market"""
@@ -254,13 +777,13 @@ def create_market():
     search_keywords = data.get('search_keywords', '')
     close_date = data.get('close_date')
     resolution_date = data.get('resolution_date')
+    # Optional league association (ID, or a league name from the attendance list)
+    league = data.get('league_id') or (league_slug(data['league']) if data.get('league') else None)
     
     # Validation
     if not title or not description or not category or not isinstance(outcomes, list) or len(outcomes) < 2:
         return jsonify({'error': 'Invalid market payload'}), 400
     
-    markets = read_json(MARKETS_PATH)
-    
     # Normalize outcomes
     normalized_outcomes = []
     for o in outcomes:
@@ -276,6 +799,7 @@ def create_market():
         'title': title,
         'description': description,
         'category': category,
+        'league_id': league,
         'status': 'active',
         'close_date': close_date,
         'resolution_date': resolution_date,
@@ -287,8 +811,7 @@ def create_market():
     }
     
     recompute_market_stats(market)
-    markets.append(market)
-    write_json(MARKETS_PATH, markets)
+    markets_store.save(market)
     
     return jsonify(market), 201
 
@@ -298,60 +821,71 @@ def resolve_market(market_id: str):
     data = request.get_json()
     winning_outcome_id = data.get('winning_outcome_id')
     
-    markets = read_json(MARKETS_PATH)
-    predictions = read_json(PREDICTIONS_PATH)
-    
-    market = next((m for m in markets if m['id'] == market_id), None)
-    if not market:
-        return jsonify({'error': 'Market not found'}), 404
-    
-    win_outcome = next((o for o in market['outcomes'] if o['id'] == winning_outcome_id), None)
-    if not win_outcome:
-        return jsonify({'error': 'Invalid winning_outcome_id'}), 400
-    
-    # Update market status
-    market['status'] = 'resolved'
-    market['winning_outcome_id'] = winning_outcome_id
-    market['resolution_date'] = datetime.utcnow().isoformat() + 'Z'
+    def report_progress(settled: int, total: int) -> None:
+        if total > SETTLEMENT_CHUNK_SIZE:
+            app.logger.info('Settling %s: %d/%d predictions', market_id, settled, total)
     
-    # Settle predictions using LMSR
-    updated_predictions = []
-    for p in predictions:
-        if p['market_id'] != market_id:
-            updated_predictions.append(p)
-            continue
+    # Hold the market's lock so no trade lands between resolution and settlement
+    with market_locks.lock_for(market_id):
+        market = markets_store.get(market_id)
+        if not market:
+            return jsonify({'error': 'Market not found'}), 404
         
-        won = p['outcome_id'] == winning_outcome_id
-        settlement = LMSRMarket.settle_trade(
-            p['stake_amount'],
-            p['odds_at_prediction'],
-            won
-        )
+        win_outcome = next((o for o in market['outcomes'] if o['id'] == winning_outcome_id), None)
+        if not win_outcome:
+            return jsonify({'error': 'Invalid winning_outcome_id'}), 400
         
-        updated_predictions.append({
-            **p,
-            'status': 'won' if won else 'lost',
-            'actual_return': settlement['total_return'],
-            'settlement': settlement
+        # Update market status
+        market = markets_store.update(market_id, {
+            'status': 'resolved',
+            'winning_outcome_id': winning_outcome_id,
+            'resolution_date': datetime.utcnow().isoformat() + 'Z'
         })
+        
+        # Settle this market's predictions using LMSR
+        summary = settle_market(predictions_store, market_id, winning_outcome_id,
+                                fee=LMSRMarket.PLATFORM_FEE, chunk_size=SETTLEMENT_CHUNK_SIZE,
+                                progress=report_progress)
+    
+    return jsonify({'ok': True, 'market': market, 'settlement': summary})
+
+@app.route('/api/markets/verify-stats', methods=['POST'])
+def verify_market_stats():
+    """
+    Check every market's running totals against the prediction log
     
-    write_json(PREDICTIONS_PATH, updated_predictions)
-    write_json(MARKETS_PATH, markets)
+    Pass repair=true (query or body) to rebuild mismatched values.
+    """
+    data = request.get_json(silent=True) or {}
+    repair = str(request.args.get('repair', data.get('repair', ''))).lower() in ('1', 'true', 'yes')
+    
+    report = {}
+    for market_id in [market['id'] for market in markets_store.all()]:
+        with market_locks.lock_for(market_id):
+            # A private copy, since a repair edits it before saving it back
+            market = markets_store.get(market_id)
+            state = lmsr_manager.get_state(market['id'])
+            probabilities = state.get('probabilities') if state is not None else None
+            
+            mismatches = verify_stats(market, predictions_store.find_by('market_id', market['id']),
+                                      probabilities, repair=repair)
+            if mismatches:
+                report[market['id']] = mismatches
+                if repair:
+                    markets_store.save(market)
     
-    return jsonify({'ok': True, 'market': market})
+    return jsonify({'ok': not report, 'repaired': repair and bool(report), 'mismatches': report})
 
 # --- Predictions ---
 
 @app.route('/api/predictions', methods=['GET'])
 def get_predictions():
-    """Get all predictions, optionally filtered by market_id"""
-    predictions = read_json(PREDICTIONS_PATH)
-    market_id = request.args.get('market_id')
-    
-    if market_id:
-        predictions = [p for p in predictions if p['market_id'] == market_id]
-    
-    return jsonify(predictions)
+    """
+    Get predictions, filtered by market_id / user_id / outcome_id / status
+    and created_at range, newest first with sort=-created_at, paginated with
+    limit and cursor
+    """
+    return paginated_query(predictions_query)
 
 @app.route('/api/predictions', methods=['POST'])
 def create_prediction():
@@ -368,54 +902,24 @@ def create_prediction():
     if not market_id or not outcome_id or not isinstance(stake_amount, (int, float)) or not isinstance(odds_at_prediction, (int, float)):
         return jsonify({'error': 'Invalid prediction payload'}), 400
     
-    markets = read_json(MARKETS_PATH)
-    predictions = read_json(PREDICTIONS_PATH)
-    
-    market = next((m for m in markets if m['id'] == market_id), None)
-    if not market:
-        return jsonify({'error': 'Market not found'}), 404
-    
-    if market['status'] != 'active':
-        return jsonify({'error': 'Market is not active'}), 400
-    
-    outcome = next((o for o in market['outcomes'] if o['id'] == outcome_id), None)
-    if not outcome:
-        return jsonify({'error': 'Outcome not found'}), 404
-    
-    # Get LMSR breakdown
-    breakdown = LMSRMarket.get_trade_breakdown(stake_amount, odds_at_prediction)
-    
-    # Update LMSR market state
-    lmsr_market = get_or_create_market(market_id, 100, odds_at_prediction / 100)
-    side = 'YES' if outcome_id == market['outcomes'][0]['id'] else 'NO'
-    new_probability = lmsr_market.invest(side, stake_amount)
-    
-    prediction = {
-        'id': generate_id(12),
-        'market_id': market_id,
-        'outcome_id': outcome_id,
-        'stake_amount': stake_amount,
-        'odds_at_prediction': odds_at_prediction,
-        'potential_return': round(breakdown['win']['total_return'], 2),
-        'potential_profit': round(breakdown['win']['profit'], 2),
-        'potential_refund': round(breakdown['lose']['refund'], 2),
-        'status': 'active',
-        'actual_return': 0,
-        'user_id': user_id,
-        'created_at': datetime.utcnow().isoformat() + 'Z',
-        'lmsr_breakdown': breakdown
-    }
-    
-    predictions.append(prediction)
-    
-    # Update market outcome stake
-    outcome['total_stake'] = outcome.get('total_stake', 0) + stake_amount
-    recompute_market_stats(market)
-    
-    write_json(PREDICTIONS_PATH, predictions)
-    write_json(MARKETS_PATH, markets)
-    
-    return jsonify(prediction), 201
+    order = (outcome_id, stake_amount, odds_at_prediction, user_id)
+    if trade_queue is not None:
+        try:
+            body, status = trade_queue.submit(market_id, order).result(timeout=TRADE_COMMIT_TIMEOUT)
+        except FutureTimeoutError:
+            # Still queued or in flight, so it may yet be applied
+            app.logger.error('Trade commit timed out after %ss', TRADE_COMMIT_TIMEOUT)
+            return jsonify({'error': 'Trade commit timed out; the order may still be applied, '
+                                     'check your predictions before retrying'}), 503
+        except NotDurableError as e:
+            body, status = e.result
+            if status == 201:
+                # The trade happened; only the batch's write failed
+                app.logger.error('Trade batch commit failed: %s', e.cause)
+                body, status = {**body, 'durable': False, 'warning': str(e)}, 202
+    else:
+        body, status = place_trade(market_id, *order)
+    return jsonify(body), status
 
 # --- LMSR API ---
 
@@ -431,6 +935,46 @@ def calculate_lmsr():
     breakdown = LMSRMarket.get_trade_breakdown(stake, probability, fee)
     return jsonify(breakdown)
 
+@app.route('/api/lmsr/calculate/batch', methods=['POST'])
+def calculate_lmsr_batch():
+    """
+    Calculate LMSR trade breakdowns for many stakes and probabilities at once
+    
+    Body: {stakes: [...], probabilities: [...], fee?, grid?}. Pairs are
+    matched element-wise (a single-element list is broadcast); with
+    grid=true every stake is priced against every probability. Results are
+    returned as flat, row-major columns alongside their shape.
+    """
+    data = request.get_json()
+    
+    stakes = data.get('stakes')
+    probabilities = data.get('probabilities')
+    fee = data.get('fee', LMSRMarket.PLATFORM_FEE)
+    grid = bool(data.get('grid', False))
+    
+    if not isinstance(stakes, list) or not isinstance(probabilities, list) or not stakes or not probabilities:
+        return jsonify({'error': 'stakes and probabilities must be non-empty arrays'}), 400
+    
+    cells = len(stakes) * len(probabilities) if grid else max(len(stakes), len(probabilities))
+    if cells > MAX_BATCH_QUOTES:
+        return jsonify({'error': f'Batch too large (max {MAX_BATCH_QUOTES} quotes)'}), 400
+    
+    try:
+        columns = LMSR.get_trade_breakdown_batch(stakes, probabilities, fee, grid)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'stakes and probabilities must be numeric and of matching length'}), 400
+    
+    result = {'shape': list(columns['stake'].shape), 'fee': fee}
+    for name, values in columns.items():
+        if name not in ('stake', 'probability', 'probability_percent'):
+            values = np.round(values, 2)
+        if name == 'risk_reward':
+            # No ratio when there is no win profit (JSON has no NaN)
+            values = np.where(np.isnan(values), None, values)
+        result[name] = values.ravel().tolist()
+    
+    return jsonify(result)
+
 @app.route('/api/lmsr/settle', methods=['POST'])
 def settle_lmsr():
     """Settle a trade using LMSR"""
@@ -447,10 +991,256 @@ def settle_lmsr():
 @app.route('/api/lmsr/market/<market_id>', methods=['GET'])
 def get_lmsr_market_state(market_id: str):
     """Get LMSR market state"""
-    if market_id not in lmsr_markets:
+    state = lmsr_manager.get_state(market_id)
+    if state is None:
         return jsonify({'error': 'LMSR market not found'}), 404
     
-    return jsonify(lmsr_markets[market_id].get_state())
+    return jsonify(state)
+
+# --- Risk ---
+
+@app.route('/api/risk/exposure', methods=['GET'])
+def get_risk_exposure():
+    """
+    Monte Carlo platform P&L across all open markets
+    
+    Query: scenarios (default 100000), correlation (0-1, within each group),
+    group_by (category | all; default category), seed, limit (markets in
+    the exposure breakdown, default 20).
+    """
+    scenarios = request.args.get('scenarios', 100000, type=int)
+    correlation = request.args.get('correlation', 0.0, type=float)
+    group_by = request.args.get('group_by', 'category')
+    limit = min(request.args.get('limit', 20, type=int) or 20, 500)
+    
+    if not 0 < scenarios <= MAX_RISK_SCENARIOS:
+        return jsonify({'error': f'scenarios must be between 1 and {MAX_RISK_SCENARIOS}'}), 400
+    if group_by not in ('category', 'all'):
+        return jsonify({'error': 'group_by must be category or all'}), 400
+    
+    # Only open markets with open positions carry any exposure
+    markets, predictions = [], []
+    for market in markets_store.all():
+        if market.get('status') != 'active':
+            continue
+        open_predictions = [p for p in predictions_store.find_by('market_id', market['id']) if p.get('status') == 'active']
+        if open_predictions:
+            markets.append(market)
+            predictions.extend(open_predictions)
+    
+    engine = RiskEngine(fee=LMSRMarket.PLATFORM_FEE)
+    states = lmsr_manager.get_states([m['id'] for m in markets])
+    engine.load(markets, [probabilities_from_state(m, states.get(m['id'])) for m in markets], predictions)
+    groups = [m.get('category') or '' for m in markets] if group_by == 'category' else None
+    
+    try:
+        report = engine.simulate(scenarios, correlation=correlation, groups=groups,
+                                 seed=request.args.get('seed', type=int), top=limit)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify(report)
+
+# --- Wallet / Users ---
+
+def get_or_create_user(user_id: str) -> dict:
+    """Get a user, creating a default record if none exists"""
+    user = users_store.get(user_id)
+    if user is None:
+        user = users_store.save({
+            'id': user_id,
+            'username': 'user',
+            'email': '',
+            'created_at': datetime.utcnow().isoformat() + 'Z'
+        })
+    return user
+
+@app.route('/api/users/<user_id>/balance', methods=['GET'])
+def get_user_balance(user_id: str):
+    """Get a user's balance from the materialized ledger"""
+    user = get_or_create_user(user_id)
+    account = wallet.account(user_id)
+    
+    return jsonify({
+        'balance': max(0, account.balance),
+        'total_deposited': account.deposits,
+        'total_withdrawn': account.withdrawals,
+        'active_stakes': account.active_stakes,
+        'user': user
+    })
+
+@app.route('/api/users/<user_id>/deposit', methods=['POST'])
+def deposit_funds(user_id: str):
+    """Deposit funds"""
+    data = request.get_json()
+    
+    get_or_create_user(user_id)
+    try:
+        transaction = wallet.deposit(user_id, data.get('amount'), data.get('payment_method', 'card'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({
+        'success': True,
+        'transaction': transaction,
+        'new_balance': wallet.balance(user_id)
+    }), 201
+
+@app.route('/api/users/<user_id>/withdraw', methods=['POST'])
+def withdraw_funds(user_id: str):
+    """Withdraw funds"""
+    data = request.get_json()
+    
+    get_or_create_user(user_id)
+    try:
+        transaction = wallet.withdraw(user_id, data.get('amount'), data.get('withdrawal_method', 'bank'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({
+        'success': True,
+        'transaction': transaction,
+        'new_balance': wallet.balance(user_id)
+    }), 201
+
+@app.route('/api/users/<user_id>/transactions', methods=['GET'])
+def get_user_transactions(user_id: str):
+    """Get a user's transaction history"""
+    return jsonify(wallet.transactions_for(user_id))
+
+@app.route('/api/users/<user_id>/portfolio', methods=['GET'])
+def get_user_portfolio(user_id: str):
+    """
+    Get a user's positions marked to the current LMSR prices
+    
+    Query params: status=open to leave out fully settled positions.
+    """
+    include_closed = request.args.get('status', 'all') != 'open'
+    
+    def prices(market_id: str) -> dict:
+        market = markets_store.get(market_id)
+        if market is None:
+            return {}
+        probabilities = market_probabilities(market)
+        total = sum(probabilities)
+        return {o['id']: (p / total if total > 0 else 0.0) for o, p in zip(market['outcomes'], probabilities)}
+    
+    portfolio = position_book.portfolio(user_id, prices, include_closed=include_closed)
+    totals = portfolio['totals']
+    balance = max(0, wallet.balance(user_id))
+    totals['cash_balance'] = round(balance, 2)
+    totals['equity'] = round(balance + totals['market_value'], 2)
+    return jsonify(portfolio)
+
+@app.route('/api/users/verify-balances', methods=['POST'])
+def verify_balances():
+    """
+    Re-derive every balance from the ledger and report drift
+    
+    Pass repair=true (query or body) to replace the materialized balances.
+    """
+    data = request.get_json(silent=True) or {}
+    repair = str(request.args.get('repair', data.get('repair', ''))).lower() in ('1', 'true', 'yes')
+    
+    mismatches = wallet.verify(repair=repair)
+    return jsonify({'ok': not mismatches, 'repaired': repair and bool(mismatches), 'mismatches': mismatches})
+
+# --- Metrics ---
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus text exposition of request, datastore and LMSR metrics"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/metrics/profiler', methods=['GET'])
+def get_profile():
+    """Sampling profiler results (format=folded for flame graph tools)"""
+    if request.args.get('format') == 'folded':
+        return Response(profiler.folded(), mimetype='text/plain')
+    return jsonify(profiler.top(request.args.get('limit', 25, type=int)))
+
+@app.route('/api/metrics/profiler', methods=['POST'])
+def toggle_profiler():
+    """
+    Start or stop the sampling profiler
+    
+    Body: {enabled: bool, interval?: seconds, reset?: bool}
+    """
+    data = request.get_json(silent=True) or {}
+    if 'enabled' not in data:
+        return jsonify({'error': 'enabled is required'}), 400
+    
+    interval = data.get('interval')
+    if interval is not None and (not isinstance(interval, (int, float)) or not 0.0005 <= interval <= 1):
+        return jsonify({'error': 'interval must be between 0.0005 and 1 seconds'}), 400
+    
+    if data['enabled']:
+        profiler.start(interval=interval, reset=data.get('reset', True))
+    else:
+        profiler.stop()
+    return jsonify({'running': profiler.running, 'interval': profiler.interval, 'samples': profiler.samples})
+
+# ============================================================================
+# ASGI
+# ============================================================================
+
+# Async serving mode: `uvicorn server:asgi_app` (or SAMSA_SERVER_MODE=asgi).
+# Reads and writes run on separate thread pools so market listings never
+# queue behind a slow resolve_market.
+asgi_app = ASGIApp(
+    app,
+    read_workers=int(os.environ.get('SAMSA_READ_WORKERS', 32)),
+    write_workers=int(os.environ.get('SAMSA_WRITE_WORKERS', 8))
+)
+
+@asgi_app.route('/api/stream/markets')
+async def stream_markets_async(scope, receive, send) -> None:
+    """
+    Native async version of /api/stream/markets
+    
+    Streams are long-lived, so under ASGI they are served on the event loop
+    rather than pinning a read worker thread each.
+    """
+    query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+    market_ids = parse_stream_market_ids(','.join(query.get('market_id', [])))
+    
+    loop = asyncio.get_running_loop()
+    ready = asyncio.Event()
+    subscription = price_broadcaster.subscribe(market_ids, wake=lambda: loop.call_soon_threadsafe(ready.set))
+    disconnected = asyncio.ensure_future(wait_for_disconnect(receive))
+    
+    async def emit(text: str) -> None:
+        await send({'type': 'http.response.body', 'body': text.encode('utf-8'), 'more_body': True})
+    
+    try:
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                (b'access-control-allow-origin', b'*')
+            ]
+        })
+        await emit('retry: 3000\n\n')
+        snapshot = stream_snapshot(market_ids)
+        if snapshot:
+            await emit(sse_event(snapshot))
+        
+        while not subscription.closed and not disconnected.done():
+            ready_wait = asyncio.ensure_future(ready.wait())
+            await asyncio.wait({ready_wait, disconnected}, timeout=STREAM_KEEPALIVE,
+                               return_when=asyncio.FIRST_COMPLETED)
+            ready_wait.cancel()
+            if disconnected.done():
+                break
+            ready.clear()
+            deltas = subscription.drain()
+            await emit(sse_event(deltas) if deltas else ': ping\n\n')
+        await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+    finally:
+        disconnected.cancel()
+        price_broadcaster.unsubscribe(subscription)
 
 # ============================================================================
 # MAIN
@@ -458,5 +1248,9 @@ def get_lmsr_market_state(market_id: str):
 
 if __name__ == '__main__':
     print(f"Samsa API (Python) listening on http://localhost:{PORT}")
-    app.run(host='0.0.0.0', port=PORT, debug=True)
+    if SERVER_MODE == 'asgi':
+        import uvicorn
+        uvicorn.run(asgi_app, host='0.0.0.0', port=PORT, timeout_keep_alive=30)
+    else:
+        app.run(host='0.0.0.0', port=PORT, debug=True, threaded=True)
 